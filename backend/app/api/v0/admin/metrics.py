@@ -0,0 +1,46 @@
+"""
+Admin Metrics API Endpoint
+
+This module exposes the in-process metrics registry to administrators.
+"""
+
+from fastapi import APIRouter, Depends
+
+from app.core.deps import get_current_admin_user
+from app.core.metrics import collect
+from app.services.principal_service import UserPrincipal
+from app.schemas.response import success_response
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics(
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+):
+    """
+    Get Process Metrics (Admin Only)
+
+    Returns the metrics of the worker process that served the request
+    (queue depths, pool usage, counters).
+
+    Args:
+        current_user: Authenticated admin user
+
+    Response Format:
+        {
+            "ret": 1,
+            "msg": "ok",
+            "data": {
+                "password_pool": {
+                    "workers": 2,
+                    "max_waiting": 64,
+                    "waiting": 0,
+                    "in_flight": 1,
+                    "completed": 1532,
+                    "rejected": 0
+                }
+            }
+        }
+    """
+    return success_response(msg="ok", data=collect())
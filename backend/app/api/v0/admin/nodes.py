@@ -8,9 +8,9 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
-from app.db.session import get_db
+from app.db.replica import get_read_db
 from app.core.deps import get_current_admin_user
-from app.models.user import User
+from app.services.principal_service import UserPrincipal
 from app.models.node import Node
 from app.schemas.admin import AdminNodeResponse, PaginatedResponse
 from app.schemas.response import success_response
@@ -25,8 +25,8 @@ router = APIRouter()
 
 @router.get("/nodes")
 async def get_nodes_list(
-    current_user: User = Depends(get_current_admin_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
 ):
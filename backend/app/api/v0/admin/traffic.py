@@ -0,0 +1,65 @@
+"""
+Admin Traffic Report API Endpoint
+
+This module serves per-node traffic reports from the hourly/daily rollup tables.
+"""
+
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_db
+from app.core.deps import get_current_admin_user
+from app.services.principal_service import UserPrincipal
+from app.services.traffic_rollup_service import TrafficRollupService, hour_bucket, day_bucket
+from app.core.config import get_settings
+from app.schemas.response import success_response, error_response
+
+settings = get_settings()
+router = APIRouter()
+
+
+@router.get("/traffic/nodes")
+async def get_node_traffic_report(
+    granularity: str = Query("daily", pattern="^(hourly|daily)$", description="hourly or daily"),
+    days: int = Query(7, ge=1, le=90, description="History length in days"),
+    node_id: Optional[int] = Query(None, description="Optional node filter"),
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get Node Traffic Report (Admin Only)
+
+    Returns traffic per node per hour or per day, summed across users.
+    Reads only the rollup tables, so the cost is O(nodes × buckets).
+
+    Response Format:
+        {
+            "ret": 1,
+            "msg": "ok",
+            "data": {
+                "granularity": "daily",
+                "history": [
+                    {"node_id": 1, "bucket": 1737820800, "u": 0, "d": 0, "charged": 0}
+                ]
+            }
+        }
+    """
+    if not settings.enable_traffic_rollup:
+        return error_response(msg="流量统计未启用")
+
+    since = int(time.time()) - days * 86400
+    since = hour_bucket(since) if granularity == "hourly" else day_bucket(since)
+
+    history = await TrafficRollupService.get_node_history(
+        db, granularity, since, node_id
+    )
+
+    return success_response(
+        msg="ok",
+        data={
+            "granularity": granularity,
+            "history": history
+        }
+    )
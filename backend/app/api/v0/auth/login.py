@@ -4,12 +4,13 @@ Login API Endpoint
 This module handles user login requests.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
 from app.db.redis import RedisClient, get_redis
 from app.services.auth_service import AuthService
+from app.services.auth_throttle import AuthThrottle, too_many_attempts
 from app.schemas.auth import LoginRequest, LoginResponse
 from app.schemas.response import success_response, error_response
 
@@ -19,6 +20,7 @@ router = APIRouter()
 @router.post("/login", response_model=LoginResponse)
 async def login(
     request: LoginRequest,
+    http_request: Request,
     db: AsyncSession = Depends(get_db),
     redis: RedisClient = Depends(get_redis)
 ):
@@ -29,6 +31,7 @@ async def login(
 
     Args:
         request: Login request containing email and password
+        http_request: Raw request (client IP for throttling)
         db: Database session
         redis: Redis client
 
@@ -36,8 +39,15 @@ async def login(
         Response containing JWT token and user information
 
     Raises:
-        HTTPException: If authentication fails (401) or account disabled (403)
+        HTTPException: If authentication fails (401), account disabled (403)
+            or too many attempts (429, see AuthThrottle)
     """
+    # Throttle before any DB lookup or bcrypt work
+    ip = http_request.client.host if http_request.client else ""
+    limit = await AuthThrottle.check("login", ip, request.email)
+    if not limit.allowed:
+        raise too_many_attempts(limit.retry_after)
+
     try:
         result = await AuthService.login(
             db=db,
@@ -4,11 +4,12 @@ Register API Endpoint
 This module handles user registration requests.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
 from app.services.auth_service import AuthService
+from app.services.auth_throttle import AuthThrottle, too_many_attempts
 from app.schemas.auth import RegisterRequest, RegisterResponse
 from app.schemas.response import success_response, error_response
 
@@ -18,6 +19,7 @@ router = APIRouter()
 @router.post("/register", response_model=RegisterResponse)
 async def register(
     request: RegisterRequest,
+    http_request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -27,6 +29,7 @@ async def register(
 
     Args:
         request: Registration request containing email, password, and optional fields
+        http_request: Raw request (client IP for throttling)
         db: Database session
 
     Returns:
@@ -34,7 +37,14 @@ async def register(
 
     Raises:
         HTTPException: If registration fails (e.g., email already exists)
+            or too many attempts (429, see AuthThrottle)
     """
+    # Throttle before any DB lookup or bcrypt work
+    ip = http_request.client.host if http_request.client else ""
+    limit = await AuthThrottle.check("register", ip)
+    if not limit.allowed:
+        raise too_many_attempts(limit.retry_after)
+
     try:
         # Create new user
         new_user = await AuthService.register(
@@ -4,23 +4,63 @@ Subscription Link API Endpoint
 This module handles subscription link generation for clients.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import Response
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request, BackgroundTasks
+from fastapi.responses import Response, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.replica import get_read_db, pin_if_recent
 from app.core.deps import get_current_user
 from app.models.user import User
 from app.services.subscribe_service import SubscriptionService
+from app.services.subscription_cache import SubscriptionCache, ENCODINGS, compress_body
+from app.services.sub_token_service import SubTokenService
+from app.services.sub_stats_service import SubStatsService
+from app.services.client_config import CLIENT_FORMATS
+from app.core.rate_limit import TokenBucket, consume, too_many_requests
+from app.utils.http_cache import (
+    make_etag, etag_matches, not_modified, cache_headers, subscription_cache_control,
+    negotiate_encoding
+)
+from app.core.config import get_settings
+
+settings = get_settings()
 
 router = APIRouter()
 
+# Bodies are served pre-compressed per Accept-Encoding (200 and 304 alike)
+SUBSCRIPTION_VARY = "Accept-Encoding"
+
+
+async def _resolve_token(db: AsyncSession, token: str) -> int:
+    """
+    Resolve a subscription token to a user ID
+
+    Raw numeric user IDs are only accepted when SUB_ALLOW_LEGACY_ID_TOKEN
+    is enabled (they are enumerable).
+
+    Raises:
+        HTTPException: 404 if the token is unknown
+    """
+    if settings.sub_allow_legacy_id_token and token.isdigit():
+        return int(token)
+
+    user_id = await SubTokenService.resolve(db, token)
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="Invalid token")
+    return user_id
+
 
 @router.get("/{token}")
 async def get_subscription(
     token: str,
-    db: AsyncSession = Depends(get_db),
-    subtype: str = Query("ss", description="Subscription type: ss, ssr, vmess, trojan, auto")
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_read_db),
+    subtype: str = Query("ss", description="Subscription type: ss, ssr, vmess, trojan, auto, clash, singbox"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
 ):
     """
     Get Subscription Link
@@ -29,29 +69,87 @@ async def get_subscription(
     Compatible with original SS-Panel subscription format.
 
     Args:
-        token: User's subscription token (can be user ID for now)
+        token: User's subscription token (see GET /user/subscribe)
+        request: Incoming request (client IP for access statistics)
+        background_tasks: Runs the access accounting after the response is sent
         db: Database session
         subtype: Subscription type (default: ss)
+        if_none_match: Conditional GET validator
+        accept_encoding: Content codings accepted by the client
 
     Returns:
-        Subscription content (Base64 encoded)
+        Subscription content (Base64 encoded link list), or a complete
+        client configuration for subtype=clash (YAML) / subtype=singbox (JSON)
 
-        Content-Type: text/plain
+        Content-Type: text/plain (text/yaml, application/json for client configs)
         Content-Disposition: attachment; filename="subscription"
+        ETag: derived from user / node-set versions (no body hashing)
+        Cache-Control: private, max-age=sub_update_time hours
+        Content-Encoding: br / gzip served pre-compressed from the cache
+
+        304 Not Modified (empty body) if If-None-Match matches.
+
+        Rate limited per client IP before the token is resolved (429 Too
+        Many Requests with Retry-After), so guessed tokens cannot load the
+        database or Redis; then per token: over that limit the last cached
+        body is served even if outdated, otherwise 429.
 
     Examples:
-        GET /link/123?subtype=ss
-        GET /link/123?subtype=vmess
-        GET /link/123?subtype=auto
+        GET /link/9f86d081884c7d659a2feaa0c55ad015?subtype=ss
+        GET /link/9f86d081884c7d659a2feaa0c55ad015?subtype=vmess
+        GET /link/9f86d081884c7d659a2feaa0c55ad015?subtype=auto
+        GET /link/9f86d081884c7d659a2feaa0c55ad015?subtype=clash
     """
-    # For now, use token as user_id
-    # TODO: Implement secure token generation in Phase 5
-    try:
-        user_id = int(token)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid token")
-
-    # Get user from database
+    if settings.enable_sub_rate_limit:
+        # Counted before resolving: invalid tokens cost a bucket check only
+        ip = request.client.host if request.client else ""
+        if ip:
+            limit = await consume([_ip_bucket(ip)])
+            if not limit.allowed:
+                return too_many_requests(limit.retry_after)
+
+    user_id = await _resolve_token(db, token)
+    encoding = negotiate_encoding(accept_encoding, ENCODINGS)
+    cache_control = subscription_cache_control(settings.sub_update_time)
+
+    if settings.enable_sub_rate_limit:
+        limit = await consume([_token_bucket(token)])
+        if not limit.allowed:
+            # Refresh loops get the last render (no SQL, no rendering) or a 429
+            stale = await SubscriptionCache.lookup_stale(user_id, subtype, encoding)
+            if stale is None or stale["expire_at"] < time.time():
+                return too_many_requests(limit.retry_after)
+            etag = make_etag(user_id, subtype, stale["version"], encoding)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag, cache_control, SUBSCRIPTION_VARY)
+            return _subscription_response(
+                user_id, subtype, stale["body"], encoding, stale["userinfo"], etag, cache_control
+            )
+
+    # Fast path: version-validated cached render (one Redis round trip, no SQL)
+    cached, version = await SubscriptionCache.lookup(user_id, subtype, encoding)
+    if not version:
+        # Nothing will be cached, so don't spend CPU compressing this response
+        encoding = "identity"
+
+    # Each coding is a different representation and needs its own strong ETag.
+    # lookup() seeds missing version keys, so an ETag never repeats after a
+    # Redis data loss (a client holding an old one cannot get a stale 304)
+    etag = make_etag(user_id, subtype, version, encoding) if version else None
+
+    if cached:
+        if cached["expire_at"] < time.time():
+            raise HTTPException(status_code=403, detail="Account expired")
+        _record_fetch(background_tasks, request, user_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, cache_control, SUBSCRIPTION_VARY)
+        return _subscription_response(
+            user_id, subtype, cached["body"], encoding, cached["userinfo"], etag, cache_control
+        )
+
+    # Get user from database; the render is cached under `version`, so
+    # read from the primary if the replica may not have that version yet
+    pin_if_recent(db, *(version.split(":") if version else ()))
     from sqlalchemy import select
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
@@ -67,26 +165,97 @@ async def get_subscription(
         raise HTTPException(status_code=403, detail="Account expired")
 
     # Generate subscription based on subtype
-    if subtype == "auto":
+    if subtype in CLIENT_FORMATS:
+        content = await SubscriptionService.generate_client_config(db, user, subtype)
+    elif subtype == "auto":
         content = await SubscriptionService.generate_auto_subscription(db, user)
     else:
         content = await SubscriptionService.generate_subscription(db, user, subtype)
 
-    # Return as plain text
+    userinfo = f"upload={user.u}; download={user.d}; total={user.transfer_enable}; expire={user.expire_in.isoformat() if user.expire_in else 0}"
+
+    _record_fetch(background_tasks, request, user_id)
+
+    body = content.encode()
+    if version:
+        # Compress once per version; later hits serve the stored bytes
+        bodies = compress_body(body)
+        await SubscriptionCache.store(
+            user_id,
+            subtype,
+            version,
+            bodies=bodies,
+            userinfo=userinfo,
+            expire_at=user.expire_in.timestamp() if user.expire_in else 0
+        )
+        body = bodies[encoding]
+
+    # The render refilled the cache; the client's copy may still be current
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control, SUBSCRIPTION_VARY)
+
+    return _subscription_response(user_id, subtype, body, encoding, userinfo, etag, cache_control)
+
+
+def _ip_bucket(ip: str) -> TokenBucket:
+    """Per client IP bucket (checked before the token is resolved)"""
+    return TokenBucket(
+        f"rl:sub:ip:{ip}",
+        settings.sub_rate_limit_ip_burst,
+        settings.sub_rate_limit_ip_per_minute
+    )
+
+
+def _token_bucket(token: str) -> TokenBucket:
+    """Per subscription token bucket"""
+    return TokenBucket(
+        f"rl:sub:token:{token}",
+        settings.sub_rate_limit_burst,
+        settings.sub_rate_limit_per_minute
+    )
+
+
+def _record_fetch(background_tasks: BackgroundTasks, request: Request, user_id: int) -> None:
+    """Count a served fetch (200 or 304) without delaying the response"""
+    if settings.enable_sub_stats:
+        ip = request.client.host if request.client else ""
+        background_tasks.add_task(SubStatsService.record, user_id, ip)
+
+
+def _subscription_response(
+    user_id: int,
+    subtype: str,
+    body: bytes,
+    encoding: str,
+    userinfo: str,
+    etag: Optional[str],
+    cache_control: str
+) -> Response:
+    """Build the subscription response (plain text, or the client config's media type)"""
+    headers = {
+        "Content-Disposition": f'attachment; filename="subscription_{user_id}"',
+        "Subscription-Userinfo": userinfo,
+        "Cache-Control": cache_control,
+        "Vary": SUBSCRIPTION_VARY,
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    if etag:
+        headers["ETag"] = etag
+
+    media_type = CLIENT_FORMATS[subtype][1] if subtype in CLIENT_FORMATS else "text/plain"
     return Response(
-        content=content,
-        media_type="text/plain",
-        headers={
-            "Content-Disposition": f'attachment; filename="subscription_{user_id}"',
-            "Subscription-Userinfo": f"upload={user.u}; download={user.d}; total={user.transfer_enable}; expire={user.expire_in.isoformat() if user.expire_in else 0}"
-        }
+        content=body,
+        media_type=media_type,
+        headers=headers
     )
 
 
 @router.get("/info/{token}")
 async def get_subscription_info(
     token: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Get Subscription Information
@@ -96,10 +265,13 @@ async def get_subscription_info(
     Args:
         token: User's subscription token
         db: Database session
+        if_none_match: Conditional GET validator
 
     Returns:
         Subscription information
 
+        ETag: derived from (u, d, transfer_enable); 304 if unchanged
+
     Response Format:
         {
             "ret": 1,
@@ -112,29 +284,37 @@ async def get_subscription_info(
             }
         }
     """
-    try:
-        user_id = int(token)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid token")
+    user_id = await _resolve_token(db, token)
 
+    # Narrow select: the three counters are both the ETag and the payload
     from sqlalchemy import select
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    result = await db.execute(
+        select(User.u, User.d, User.transfer_enable).where(User.id == user_id)
+    )
+    user = result.one_or_none()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    etag = make_etag(user_id, user.u, user.d, user.transfer_enable)
+    cache_control = subscription_cache_control(settings.sub_update_time)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
+
     # Calculate traffic
     total_used = user.u + user.d
     used_percent = round((total_used / user.transfer_enable * 100), 2) if user.transfer_enable > 0 else 0
 
     from app.schemas.response import success_response
-    return success_response(
-        msg="ok",
-        data={
-            "upload": user.u,
-            "download": user.d,
-            "total": user.transfer_enable,
-            "used_percent": used_percent
-        }
+    return JSONResponse(
+        content=success_response(
+            msg="ok",
+            data={
+                "upload": user.u,
+                "download": user.d,
+                "total": user.transfer_enable,
+                "used_percent": used_percent
+            }
+        ),
+        headers=cache_headers(etag, cache_control)
     )
@@ -11,17 +11,21 @@ All endpoints require Mu key authentication via the 'Key' header.
 """
 
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Header, HTTPException, status, Depends
+from fastapi import APIRouter, Header, HTTPException, status, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, and_, or_
 from datetime import datetime
 
 from app.db.session import get_db
+from app.db.replica import get_read_db, pin_if_recent
 from app.db.redis import redis_client
 from app.models.user import User
 from app.models.node import Node
 from app.schemas.response import success_response, error_response
 from app.core.security import verify_mu_key
+from app.services.node_index import mark_node_alive
+from app.services.version_service import VersionService
+from app.utils.http_cache import make_etag, etag_matches, not_modified, NODE_CACHE_CONTROL
 
 router = APIRouter()
 
@@ -49,9 +53,11 @@ async def verify_node_key(key: str = Header(..., alias="Key")):
 
 @router.get("/users")
 async def get_node_users(
+    response: Response,
     node_id: Optional[int] = None,
     key: str = Header(..., alias="Key"),
-    db: AsyncSession = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     GET /app/api/v0/node/users - Pull User List for Node
@@ -87,7 +93,23 @@ async def get_node_users(
 
     Performance Note:
         Only selects required fields, avoids SELECT * on 60+ field table
+
+    Conditional GET:
+        ETag is derived from the user-list and node-set versions, so an
+        unchanged list is answered with 304 before any query runs.
     """
+    versions = await VersionService.get_versions(
+        VersionService.USER_LIST_KEY, VersionService.NODES_KEY
+    )
+    etag = None
+    if versions:
+        etag = make_etag(*versions, node_id or "all")
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, NODE_CACHE_CONTROL)
+
+    # The list is served under these versions: don't read it from a lagging replica
+    pin_if_recent(db, *(versions or ()))
+
     # Build query with only essential fields
     query = select(
         User.id,
@@ -147,7 +169,7 @@ async def get_node_users(
             "protocol_param": user.protocol_param,
             "obfs": user.obfs,
             "obfs_param": user.obfs_param,
-            "t": user.t,
+            "t": user._mapping["t"],  # Row.t is the tuple accessor, not the column
             "u": user.u,
             "d": user.d,
             "transfer_enable": user.transfer_enable,
@@ -158,6 +180,10 @@ async def get_node_users(
         }
         user_list.append(user_dict)
 
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = NODE_CACHE_CONTROL
+
     return success_response(
         msg="ok",
         data={"users": user_list, "count": len(user_list)}
@@ -252,6 +278,8 @@ async def report_traffic(
 
     # Commit all atomic updates
     await db.commit()
+    await VersionService.bump_user_list()
+    await mark_node_alive(node_id)
 
     return success_response(
         msg="流量上报成功",
@@ -315,6 +343,7 @@ async def report_online(
         )
     )
     await db.commit()
+    await mark_node_alive(node_id)
 
     # Store online count in Redis for real-time stats
     redis_key = f"node:online:{node_id}"
@@ -381,6 +410,7 @@ async def node_heartbeat(
         .values(node_heartbeat=int(datetime.now().timestamp()))
     )
     await db.commit()
+    await mark_node_alive(node_id)
 
     # Store detailed stats in Redis if provided
     if heartbeat_data.get("cpu_load") or heartbeat_data.get("memory_usage"):
@@ -397,7 +427,9 @@ async def node_heartbeat(
 @router.get("/info/{node_id}")
 async def get_node_info(
     node_id: int,
+    response: Response,
     key: str = Header(..., alias="Key"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -410,7 +442,18 @@ async def get_node_info(
 
     Returns:
         Node configuration including server, method, speed limits, etc.
+
+    Conditional GET:
+        ETag is derived from the node-set version. Node rows edited directly
+        in the database must bump ver:nodes to be picked up.
     """
+    versions = await VersionService.get_versions(VersionService.NODES_KEY)
+    etag = None
+    if versions:
+        etag = make_etag(versions[0], node_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, NODE_CACHE_CONTROL)
+
     result = await db.execute(select(Node).where(Node.id == node_id))
     node = result.scalar_one_or_none()
 
@@ -434,6 +477,10 @@ async def get_node_info(
         "mu_only": node.mu_only
     }
 
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = NODE_CACHE_CONTROL
+
     return success_response(
         msg="ok",
         data=node_info
@@ -15,7 +15,9 @@ from datetime import datetime
 from decimal import Decimal
 
 from app.db.session import get_db
-from app.core.deps import get_current_user
+from app.db.replica import get_read_db
+from app.core.deps import get_current_user, get_current_principal
+from app.services.principal_service import UserPrincipal
 from app.models.user import User
 from app.models.paylist import Paylist
 from app.schemas.response import success_response, error_response
@@ -44,7 +46,7 @@ class PaymentOrderResponse(BaseModel):
 @router.post("/create")
 async def create_payment_order(
     request: CreatePaymentRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -336,8 +338,8 @@ async def debug_confirm_payment(
 @router.get("/orders")
 async def get_payment_orders(
     status: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     GET /app/api/v0/payment/orders - Get User's Payment Orders
@@ -397,7 +399,7 @@ async def get_payment_orders(
 @router.get("/status/{order_id}")
 async def get_payment_status(
     order_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -10,6 +10,8 @@ from app.api.v0.user.info import router as info_router
 from app.api.v0.user.nodes import router as nodes_router
 from app.api.v0.user.checkin import router as checkin_router
 from app.api.v0.user.shop import router as shop_router
+from app.api.v0.user.traffic import router as traffic_router
+from app.api.v0.user.subscribe import router as subscribe_router
 
 router = APIRouter()
 
@@ -18,6 +20,8 @@ router.include_router(info_router, tags=["User"])
 router.include_router(nodes_router, tags=["User"])
 router.include_router(checkin_router, tags=["User"])
 router.include_router(shop_router, tags=["User"])
+router.include_router(traffic_router, tags=["User"])
+router.include_router(subscribe_router, tags=["User"])
 
 # Export the main router
 __all__ = ["router"]
@@ -14,6 +14,7 @@ from app.db.session import get_db
 from app.core.deps import get_current_user
 from app.models.user import User
 from app.schemas.response import success_response, error_response
+from app.services.version_service import VersionService
 from app.core.config import get_settings
 
 settings = get_settings()
@@ -109,6 +110,7 @@ async def daily_checkin(
     )
 
     await db.commit()
+    await VersionService.bump_user_list()
 
     # Refresh user to get updated values
     await db.refresh(current_user)
@@ -6,14 +6,13 @@ This module handles node list queries for users.
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
 
-from app.db.session import get_db
-from app.core.deps import get_current_user
-from app.models.user import User
-from app.models.node import Node
+from app.db.replica import get_read_db
+from app.core.deps import get_current_principal
+from app.services.principal_service import UserPrincipal
 from app.schemas.user import NodeInfo, NodeListResponse
 from app.schemas.response import success_response
+from app.services.node_index import node_index
 from app.utils.node_utils import check_node_online, get_node_type_name, format_traffic_rate
 
 router = APIRouter()
@@ -21,8 +20,8 @@ router = APIRouter()
 
 @router.get("/nodes", response_model=NodeListResponse)
 async def get_user_nodes(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get Available Nodes for User
@@ -49,22 +48,13 @@ async def get_user_nodes(
             }
         }
     """
-    # Query nodes that:
+    # Nodes that:
     # 1. Are visible (type != 0)
     # 2. User level meets requirements (node_class <= user.class_level)
-    # 3. Node group matches or is 0 (all groups)
-    result = await db.execute(
-        select(Node).where(
-            and_(
-                Node.type != 0,  # Visible nodes only
-                Node.node_class <= current_user.class_level,  # User level check
-                # Node group check: either user's group is 0 or matches node's group
-                (current_user.node_group == 0) | (Node.node_group == current_user.node_group)
-            )
-        ).order_by(Node.node_sort)  # Sort by node_sort
-    )
-
-    nodes = result.scalars().all()
+    # 3. Node group matches or user's group is 0 (all groups)
+    # come precomputed and ordered by node_sort from the node index
+    snapshot = await node_index.get(db)
+    nodes = snapshot.visible(current_user.class_level, current_user.node_group)
 
     # Build response with node info
     node_list = []
@@ -13,7 +13,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.db.session import get_db
-from app.core.deps import get_current_user
+from app.db.replica import get_read_db
+from app.core.deps import get_current_user, get_current_principal
+from app.services.principal_service import UserPrincipal
 from app.models.user import User
 from app.models.shop import Shop, Bought
 from app.services.shop_service import ShopService
@@ -53,7 +55,7 @@ class BoughtItemResponse(BaseModel):
 
 @router.get("/shop")
 async def get_shop_packages(
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -183,8 +185,8 @@ async def purchase_package(
 @router.get("/bought")
 async def get_purchase_history(
     limit: int = 20,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     GET /app/api/v0/user/bought - Get Purchase History
@@ -0,0 +1,84 @@
+"""
+User Subscription Token API Endpoints
+
+This module lets users fetch and reset their subscription token.
+"""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_db
+from app.core.deps import get_current_principal
+from app.services.principal_service import UserPrincipal
+from app.schemas.response import success_response
+from app.services.sub_token_service import SubTokenService
+from app.core.config import get_settings
+
+settings = get_settings()
+
+router = APIRouter()
+
+
+def _subscription_url(token: str) -> str:
+    """Build the public subscription URL (SUB_URL, or the API's /link route)"""
+    base = settings.sub_url or f"{settings.base_url}/app/api/v0/link"
+    return f"{base.rstrip('/')}/{token}"
+
+
+@router.get("/subscribe")
+async def get_subscription_token(
+    current_user: UserPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get Subscription Token
+
+    Returns the user's subscription token and URL, issuing a token
+    on first use.
+
+    Args:
+        current_user: Authenticated user
+        db: Database session
+
+    Response Format:
+        {
+            "ret": 1,
+            "msg": "ok",
+            "data": {
+                "token": "9f86d081884c7d659a2feaa0c55ad015",
+                "url": "https://example.com/app/api/v0/link/9f86d081884c7d659a2feaa0c55ad015"
+            }
+        }
+    """
+    token = await SubTokenService.get_or_create(db, current_user.id)
+
+    return success_response(
+        msg="ok",
+        data={"token": token, "url": _subscription_url(token)}
+    )
+
+
+@router.post("/subscribe/reset")
+async def reset_subscription_token(
+    current_user: UserPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Reset Subscription Token
+
+    Revokes the current token on every worker and issues a new one.
+    Clients using the old URL stop receiving updates immediately.
+
+    Args:
+        current_user: Authenticated user
+        db: Database session
+
+    Returns:
+        New token and URL (same format as GET /subscribe)
+    """
+    token = await SubTokenService.reset(db, current_user.id)
+
+    return success_response(
+        msg="订阅链接已重置",
+        data={"token": token, "url": _subscription_url(token)}
+    )
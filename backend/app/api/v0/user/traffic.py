@@ -0,0 +1,67 @@
+"""
+User Traffic History API Endpoint
+
+This module serves per-user traffic charts from the hourly/daily rollup tables.
+"""
+
+import time
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_db
+from app.core.deps import get_current_principal
+from app.services.principal_service import UserPrincipal
+from app.services.traffic_rollup_service import TrafficRollupService, hour_bucket, day_bucket
+from app.core.config import get_settings
+from app.schemas.response import success_response, error_response
+
+settings = get_settings()
+router = APIRouter()
+
+
+@router.get("/traffic")
+async def get_traffic_history(
+    granularity: str = Query("daily", pattern="^(hourly|daily)$", description="hourly or daily"),
+    days: int = Query(7, ge=1, le=90, description="History length in days"),
+    current_user: UserPrincipal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    GET /app/api/v0/user/traffic - Get Traffic History
+
+    Returns the user's traffic per hour or per day, summed across nodes.
+    Reads only the rollup tables, so the cost is O(buckets).
+
+    Query Parameters:
+        granularity: hourly or daily (default: daily)
+        days: History length in days (default: 7, max: 90)
+
+    Response:
+    {
+        "ret": 1,
+        "msg": "ok",
+        "data": {
+            "granularity": "daily",
+            "history": [
+                {"bucket": 1737820800, "u": 1048576, "d": 2097152, "charged": 3145728}
+            ]
+        }
+    }
+    """
+    if not settings.enable_traffic_rollup:
+        return error_response(msg="流量统计未启用")
+
+    since = int(time.time()) - days * 86400
+    since = hour_bucket(since) if granularity == "hourly" else day_bucket(since)
+
+    history = await TrafficRollupService.get_user_history(
+        db, current_user.id, granularity, since
+    )
+
+    return success_response(
+        msg="ok",
+        data={
+            "granularity": granularity,
+            "history": history
+        }
+    )
@@ -36,6 +36,14 @@ class Settings(BaseSettings):
     jwt_secret_key: str = "your-jwt-secret-key-change-in-production"
     jwt_algorithm: str = "HS256"
     jwt_access_token_expire_minutes: int = 60 * 24 * 7  # 7 days
+    jwt_backend: str = "jose"  # JWT library: jose (python-jose) or pyjwt (PyJWT, if installed)
+    jwt_cache_size: int = 10000  # Verified token payloads kept per worker (0 = verify every request)
+    token_blacklist_resync_interval: int = 300  # seconds between full reloads of revoked token IDs
+    principal_lru_size: int = 10000  # In-process authenticated-user principals per worker
+    principal_cache_ttl: int = 3600  # seconds a principal is kept in Redis (version-validated)
+    principal_lru_max_age: int = 60  # seconds a principal is served from the in-process LRU
+    password_hash_workers: int = 2  # Concurrent bcrypt operations per worker (thread pool)
+    password_hash_max_waiting: int = 64  # Queued bcrypt operations before logins get 503
 
     # Mu Key for Node Communication (comma-separated for multiple keys)
     mu_key: str = "default-mu-key-please-change"
@@ -46,12 +54,35 @@ class Settings(BaseSettings):
     db_user: str = "root"
     db_password: str = ""
     db_name: str = "test-spanel-fastapi"  # MUST match the requirement
+    # Connection pool per process: keep processes x (size + overflow) below MySQL
+    # max_connections; set per role via the environment (e.g. smaller for scheduler-only)
+    db_pool_size: int = 10  # Persistent connections
+    db_max_overflow: int = 20  # Extra connections opened under load
+    db_pool_timeout: int = 30  # seconds to wait for a free connection before failing
+    db_pool_recycle: int = 3600  # seconds before a connection is replaced
+    db_replica_host: Optional[str] = None  # Read replica (same user/password/database); unset = primary only
+    db_replica_port: int = 3306
+    db_replica_pool_size: int = 10
+    db_replica_max_overflow: int = 20
+    db_replica_max_lag: int = 5  # seconds of replication lag before reads fall back to the primary
+    db_replica_check_interval: int = 10  # seconds between replication lag checks
+    db_read_your_writes_window: int = 5  # seconds a caller's reads stay on the primary after a write
+    enable_sql_trace: bool = True  # Per-request SQL stats (Server-Timing header) and slow query log
+    slow_query_threshold_ms: int = 200  # Statements (and per-request DB time) above this are logged
+    sql_trace_max_statements: int = 50  # Requests issuing more statements are logged (N+1 patterns)
 
     @property
     def database_url(self) -> str:
         """Generate async MySQL database URL"""
         return f"mysql+aiomysql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
 
+    @property
+    def replica_database_url(self) -> Optional[str]:
+        """Generate async MySQL URL of the read replica (None if not configured)"""
+        if not self.db_replica_host:
+            return None
+        return f"mysql+aiomysql://{self.db_user}:{self.db_password}@{self.db_replica_host}:{self.db_replica_port}/{self.db_name}"
+
     # ========== Redis Settings ==========
     redis_host: str = "127.0.0.1"
     redis_port: int = 6379
@@ -89,6 +120,8 @@ class Settings(BaseSettings):
     default_traffic: int = 100  # GB
     user_expire_in_default: int = 30  # days
     register_node_group: int = 0
+    port_range_min: int = 10000  # Lowest port assigned to new users
+    port_range_max: int = 65535  # Highest port assigned to new users
 
     # ========== Check-in Settings ==========
     enable_checkin_captcha: bool = False
@@ -100,6 +133,14 @@ class Settings(BaseSettings):
     enable_login_captcha: bool = False
     recaptcha_sitekey: Optional[str] = None
     recaptcha_secret: Optional[str] = None
+    enable_auth_rate_limit: bool = True  # Sliding-window limits on login / register (checked before bcrypt)
+    auth_rate_limit_window: int = 300  # seconds, per-IP and per-email windows
+    login_rate_limit_ip: int = 30  # Login attempts per window per client IP
+    login_rate_limit_email: int = 10  # Login attempts per window per email
+    register_rate_limit_ip: int = 5  # Registrations per window per client IP
+    auth_rate_limit_global: int = 200  # Login + register attempts per 10 seconds, all workers
+    auth_rate_limit_backoff: int = 30  # seconds blocked after exceeding a limit, doubled per repeat
+    auth_rate_limit_max_backoff: int = 3600  # Upper bound of the block
 
     # ========== Referral System Settings ==========
     ref_fee: float = 20.0  # Percentage
@@ -123,6 +164,10 @@ class Settings(BaseSettings):
     ios_account: Optional[str] = None
     ios_password: Optional[str] = None
 
+    # ========== Node Index Settings ==========
+    node_index_check_interval: float = 1.0  # seconds between node version checks
+    node_index_max_age: int = 60  # seconds before a forced rebuild (heartbeat freshness)
+
     # ========== Speed Test Duration ==========
     speedtest_duration: int = 24  # hours
 
@@ -147,6 +192,17 @@ class Settings(BaseSettings):
     # ========== Subscription Settings ==========
     sub_update_time: int = 1  # hours
     sub_limit: int = 16  # Default subscription node limit
+    enable_sub_cache: bool = True  # Cache rendered subscriptions in Redis (version-validated)
+    sub_cache_ttl: int = 600  # seconds (also bounds Subscription-Userinfo staleness)
+    sub_token_lru_size: int = 100000  # In-process token -> user_id entries per worker
+    sub_allow_legacy_id_token: bool = True  # Accept raw user IDs as /link tokens (enumerable!); migration window, see migrations/003
+    enable_sub_stats: bool = True  # Count fetches / distinct IPs in Redis (rss_* columns)
+    sub_stats_flush_interval: int = 60  # seconds between bulk flushes to the user table
+    enable_sub_rate_limit: bool = True  # Token buckets per subscription token and client IP
+    sub_rate_limit_burst: int = 10  # Back-to-back fetches allowed per token
+    sub_rate_limit_per_minute: float = 2  # Token refill rate per token
+    sub_rate_limit_ip_burst: int = 60  # Back-to-back fetches allowed per client IP (NAT-friendly)
+    sub_rate_limit_ip_per_minute: float = 30  # Token refill rate per client IP
 
     # ========== Auto Reset Traffic ==========
     auto_reset_bandwidth: int = 100  # GB
@@ -161,6 +217,22 @@ class Settings(BaseSettings):
     enable_scheduler: bool = True  # Enable APScheduler
     scheduler_timezone: str = "Asia/Shanghai"  # Scheduler timezone
 
+    # ========== DbClean Settings ==========
+    traffic_log_retention_days: int = 3  # Keep traffic logs for N days
+    traffic_log_purge_chunk_size: int = 5000  # Rows per DELETE chunk
+    traffic_log_purge_sleep: float = 0.5  # Seconds between chunks (replication lag)
+    traffic_log_partitioned: bool = False  # user_traffic_log is RANGE-partitioned by log_time
+
+    # ========== Expiry Queue Settings ==========
+    enable_expiry_queue: bool = True  # Fire class expirations from a Redis delay queue
+    expiry_poll_interval: int = 30  # seconds
+    expiry_batch_size: int = 500  # Users reset per UPDATE
+
+    # ========== Traffic Rollup Settings ==========
+    enable_traffic_rollup: bool = False  # Opt-in: apply migrations/001_traffic_rollup.sql first
+    traffic_rollup_batch_size: int = 20000  # Log rows per rollup batch
+    traffic_rollup_hourly_retention_days: int = 31  # Keep hourly rollups for N days
+
     # ========== Session Settings ==========
     session_expire: int = 7  # days
     session_key: str = "sspannel_session"
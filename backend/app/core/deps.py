@@ -15,66 +15,125 @@ from app.db.redis import RedisClient, get_redis
 from app.models.user import User
 from app.core.security import decode_access_token
 from app.services.auth_service import AuthService
+from app.services.principal_service import PrincipalService, UserPrincipal
 
 
-async def get_current_user(
+def _credentials_exception() -> HTTPException:
+    """401 raised for every authentication failure"""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail={"ret": 0, "msg": "未授权或 Token 无效", "data": None},
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _disabled_exception() -> HTTPException:
+    """403 raised for disabled accounts"""
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail={"ret": 0, "msg": "用户账户已被禁用", "data": None}
+    )
+
+
+async def _authenticate(redis: RedisClient, authorization: Optional[str]) -> int:
+    """
+    Validate the Bearer token and return the user ID it was issued for
+
+    Raises:
+        HTTPException: 401 if the header or token is invalid
+    """
+    # Extract token from Authorization header
+    if not authorization:
+        raise _credentials_exception()
+
+    if not authorization.startswith("Bearer "):
+        raise _credentials_exception()
+
+    token = authorization.split(" ")[1]
+
+    # Verify token and check blacklist
+    payload = await AuthService.verify_token(redis, token)
+
+    if payload is None:
+        raise _credentials_exception()
+
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise _credentials_exception()
+
+    return int(user_id)
+
+
+async def get_current_principal(
     db: AsyncSession = Depends(get_db),
     redis: RedisClient = Depends(get_redis),
     authorization: Optional[str] = Header(None)
-) -> User:
+) -> UserPrincipal:
     """
-    Dependency to get the current authenticated user
+    Dependency to get the current authenticated user as a cached principal
 
-    Extracts and validates JWT token from Authorization header.
+    Default for endpoints that only need the user's identity, level and
+    group: served from the version-validated principal cache, so it
+    usually costs no database query.
 
     Args:
-        db: Database session
+        db: Database session (only used on a cache miss)
         redis: Redis client
         authorization: Authorization header (format: "Bearer <token>")
 
     Returns:
-        The authenticated user object
+        Immutable UserPrincipal
 
     Raises:
         HTTPException: 401 if authentication fails, 403 if account disabled
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail={"ret": 0, "msg": "未授权或 Token 无效", "data": None},
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    user_id = await _authenticate(redis, authorization)
 
-    # Extract token from Authorization header
-    if not authorization:
-        raise credentials_exception
+    principal = await PrincipalService.get(db, user_id)
 
-    if not authorization.startswith("Bearer "):
-        raise credentials_exception
+    if principal is None:
+        raise _credentials_exception()
 
-    token = authorization.split(" ")[1]
+    if not principal.is_enabled:
+        raise _disabled_exception()
 
-    # Verify token and check blacklist
-    payload = await AuthService.verify_token(redis, token)
+    return principal
 
-    if payload is None:
-        raise credentials_exception
 
-    user_id: Optional[int] = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
+    redis: RedisClient = Depends(get_redis),
+    authorization: Optional[str] = Header(None)
+) -> User:
+    """
+    Dependency to get the current authenticated user (full row)
+
+    Loads the complete ORM object from the database. Use it only in
+    endpoints that read columns outside UserPrincipal or modify the user;
+    everything else should depend on get_current_principal.
+
+    Args:
+        db: Database session
+        redis: Redis client
+        authorization: Authorization header (format: "Bearer <token>")
+
+    Returns:
+        The authenticated user object
+
+    Raises:
+        HTTPException: 401 if authentication fails, 403 if account disabled
+    """
+    user_id = await _authenticate(redis, authorization)
 
     # Get user from database
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
 
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
     if not user.is_enabled:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={"ret": 0, "msg": "用户账户已被禁用", "data": None}
-        )
+        raise _disabled_exception()
 
     return user
 
@@ -103,18 +162,18 @@ async def get_current_active_user(
 
 
 async def get_current_admin_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: UserPrincipal = Depends(get_current_principal),
+) -> UserPrincipal:
     """
     Dependency to get the current admin user
 
     Verifies that the current user has admin privileges.
 
     Args:
-        current_user: The authenticated user
+        current_user: The authenticated user's principal
 
     Returns:
-        The admin user object
+        The admin user's principal
 
     Raises:
         HTTPException: 403 if user is not an admin
@@ -0,0 +1,44 @@
+"""
+Process Metrics
+
+This module is a minimal in-process metrics registry. Components register
+a collector (a function returning a dict of current values) under a name;
+GET /app/api/v0/admin/metrics returns every collector's output.
+
+Values are per worker process: with several workers, each reports its own.
+"""
+
+import logging
+from typing import Callable, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_collector(name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Register (or replace) a metrics collector
+
+    Args:
+        name: Section name in the metrics output
+        collector: Function returning the current values
+    """
+    _collectors[name] = collector
+
+
+def collect() -> Dict[str, Any]:
+    """
+    Collect every registered metric
+
+    Returns:
+        Mapping of section name to values (a failing collector reports its error)
+    """
+    metrics = {}
+    for name, collector in _collectors.items():
+        try:
+            metrics[name] = collector()
+        except Exception as e:
+            logger.error(f"Metrics collector {name} failed: {str(e)}")
+            metrics[name] = {"error": str(e)}
+    return metrics
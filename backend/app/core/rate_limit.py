@@ -0,0 +1,282 @@
+"""
+Rate Limiting
+
+This module implements Redis-backed rate limiting shared by all workers.
+
+Token bucket (one atomic Lua call for several buckets):
+- each bucket holds up to `burst` tokens and refills at `per_minute` tokens
+  per minute, computed lazily from the elapsed time (no background refill)
+- a request costs one token in EVERY bucket it is checked against; if any
+  bucket is empty nothing is consumed and the longest wait is returned
+- time comes from the Redis server (TIME), so worker clocks don't matter
+- buckets expire once they would have refilled completely
+
+Sliding window (one atomic Lua call for several windows):
+- each window allows `limit` requests per `window` seconds, estimated from
+  the current and previous fixed windows (count_prev weighted by the part
+  of it still inside the sliding window, plus count_cur): O(1) state per key
+- a request is counted in EVERY window only if all of them allow it
+- progressive backoff: a rejected request adds a strike to each window it
+  exceeded and blocks that key for backoff * 2^(strikes - 1) seconds (capped
+  at max_backoff); strikes are forgotten once the key expires (no requests
+  for two windows and no block pending)
+
+Limiting fails open: without Redis every request is allowed.
+"""
+
+import math
+import logging
+from typing import NamedTuple, Sequence
+
+from fastapi.responses import Response
+
+from app.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# KEYS: bucket keys; ARGV: burst_1, per_second_1, burst_2, per_second_2, ...
+# Returns {allowed (0/1), retry_after_seconds (string)}
+TOKEN_BUCKET_SCRIPT = """
+local now_t = redis.call('TIME')
+local now = tonumber(now_t[1]) + tonumber(now_t[2]) / 1000000
+local levels = {}
+local wait = 0
+
+for i = 1, #KEYS do
+    local burst = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+    levels[i] = tokens
+end
+
+local allowed = 0
+if wait == 0 then
+    allowed = 1
+end
+
+for i = 1, #KEYS do
+    local burst = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local tokens = levels[i] - allowed
+    redis.call('HSET', KEYS[i], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[i], math.ceil((burst - tokens) / rate) + 1)
+end
+
+return {allowed, tostring(wait)}
+"""
+
+# KEYS: window keys; ARGV: limit_1, window_1, backoff_1, max_backoff_1, limit_2, ...
+# Hash fields: w (current window index), c (current count), p (previous count),
+# s (strikes), b (blocked until, Unix time)
+# Returns {allowed (0/1), retry_after_seconds (string), strikes}
+SLIDING_WINDOW_SCRIPT = """
+local now_t = redis.call('TIME')
+local now = tonumber(now_t[1]) + tonumber(now_t[2]) / 1000000
+local states = {}
+local wait = 0
+local over = {}
+
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[4 * i - 3])
+    local window = tonumber(ARGV[4 * i - 2])
+    local state = redis.call('HMGET', KEYS[i], 'w', 'c', 'p', 's', 'b')
+    local index = math.floor(now / window)
+    local w = tonumber(state[1]) or index
+    local c = tonumber(state[2]) or 0
+    local p = tonumber(state[3]) or 0
+    if w == index - 1 then
+        p = c
+        c = 0
+    elseif w ~= index then
+        p = 0
+        c = 0
+    end
+    local st = {index = index, c = c, p = p, s = tonumber(state[4]) or 0, b = tonumber(state[5]) or 0}
+    states[i] = st
+
+    -- Earliest time the estimate leaves room for one more request
+    local need = 0
+    local elapsed = (now - index * window) / window
+    if p * (1 - elapsed) + c + 1 > limit then
+        local at
+        if c + 1 > limit then
+            at = (index + 1 + math.max(0, 1 - (limit - 1) / c)) * window
+        else
+            at = (index + 1 - (limit - c - 1) / p) * window
+        end
+        need = at - now
+    end
+
+    if st.b > now then
+        -- Blocked: no new strike until the block has run out
+        wait = math.max(wait, st.b - now, need)
+    elseif need > 0 then
+        wait = math.max(wait, need)
+        over[i] = true
+    end
+end
+
+local allowed = 0
+local strikes = 0
+if wait == 0 then
+    allowed = 1
+end
+
+for i = 1, #KEYS do
+    local window = tonumber(ARGV[4 * i - 2])
+    local backoff = tonumber(ARGV[4 * i - 1])
+    local max_backoff = tonumber(ARGV[4 * i])
+    local st = states[i]
+    if allowed == 1 then
+        st.c = st.c + 1
+    elseif over[i] and backoff > 0 then
+        st.s = st.s + 1
+        local penalty = math.min(max_backoff, backoff * 2 ^ (st.s - 1))
+        st.b = math.max(st.b, now + penalty)
+        wait = math.max(wait, penalty)
+    end
+    strikes = math.max(strikes, st.s)
+    redis.call('HSET', KEYS[i], 'w', st.index, 'c', st.c, 'p', st.p, 's', st.s, 'b', tostring(st.b))
+    redis.call('EXPIRE', KEYS[i], math.ceil(math.max(2 * window, st.b - now)) + 1)
+end
+
+return {allowed, tostring(wait), strikes}
+"""
+
+
+class TokenBucket(NamedTuple):
+    """
+    One bucket to check a request against
+
+    Attributes:
+        key: Redis key identifying the bucket (e.g. rl:sub:token:{token})
+        burst: Bucket capacity (requests allowed back to back)
+        per_minute: Refill rate in tokens per minute
+    """
+
+    key: str
+    burst: int
+    per_minute: float
+
+
+class RateLimitResult(NamedTuple):
+    """
+    Outcome of a rate limit check
+
+    Attributes:
+        allowed: True if the request may proceed
+        retry_after: Whole seconds until a token is available (0 if allowed)
+    """
+
+    allowed: bool
+    retry_after: int
+
+
+ALLOWED = RateLimitResult(True, 0)
+
+
+class SlidingWindow(NamedTuple):
+    """
+    One sliding window to check a request against
+
+    Attributes:
+        key: Redis key identifying the window (e.g. rl:auth:login:ip:{ip})
+        limit: Requests allowed per window
+        window: Window length in seconds
+        backoff: First block after exceeding the limit, in seconds
+            (doubled on every further violation, 0 = no backoff)
+        max_backoff: Upper bound of the block in seconds
+    """
+
+    key: str
+    limit: int
+    window: int
+    backoff: int = 0
+    max_backoff: int = 0
+
+
+async def consume(buckets: Sequence[TokenBucket]) -> RateLimitResult:
+    """
+    Take one token from every bucket, atomically
+
+    Args:
+        buckets: Buckets the request is counted against
+
+    Returns:
+        RateLimitResult (allowed if Redis is unavailable)
+    """
+    buckets = [bucket for bucket in buckets if bucket.burst > 0 and bucket.per_minute > 0]
+    if not buckets or not redis_client.redis:
+        return ALLOWED
+
+    args = []
+    for bucket in buckets:
+        args.extend((bucket.burst, bucket.per_minute / 60))
+
+    try:
+        allowed, wait = await redis_client.eval_script(
+            TOKEN_BUCKET_SCRIPT, [bucket.key for bucket in buckets], args
+        )
+    except Exception as e:
+        logger.error(f"Rate limit check failed: {str(e)}")
+        return ALLOWED
+
+    if int(allowed):
+        return ALLOWED
+    return RateLimitResult(False, max(1, math.ceil(float(wait))))
+
+
+async def hit(windows: Sequence[SlidingWindow]) -> RateLimitResult:
+    """
+    Count one request in every sliding window, atomically
+
+    Args:
+        windows: Windows the request is counted against
+
+    Returns:
+        RateLimitResult (allowed if Redis is unavailable). Rejections carry
+        the longest wait, including any progressive backoff block.
+    """
+    windows = [window for window in windows if window.limit > 0 and window.window > 0]
+    if not windows or not redis_client.redis:
+        return ALLOWED
+
+    args = []
+    for window in windows:
+        args.extend((window.limit, window.window, window.backoff, max(window.max_backoff, window.backoff)))
+
+    try:
+        allowed, wait, _ = await redis_client.eval_script(
+            SLIDING_WINDOW_SCRIPT, [window.key for window in windows], args
+        )
+    except Exception as e:
+        logger.error(f"Rate limit check failed: {str(e)}")
+        return ALLOWED
+
+    if int(allowed):
+        return ALLOWED
+    return RateLimitResult(False, max(1, math.ceil(float(wait))))
+
+
+def too_many_requests(retry_after: int) -> Response:
+    """
+    Build a 429 Too Many Requests response
+
+    Args:
+        retry_after: Seconds until the client may retry
+
+    Returns:
+        Response with a Retry-After header
+    """
+    return Response(
+        content="Too Many Requests",
+        status_code=429,
+        media_type="text/plain",
+        headers={"Retry-After": str(retry_after)}
+    )
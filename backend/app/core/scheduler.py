@@ -8,12 +8,20 @@ Tasks:
 - DailyJob: Daily at 02:00
 - HourlyJob: Every hour at minute 5
 - CheckJob: Every 10 minutes
+- DbClean: Weekly on Sunday at 04:00
+- TrafficRollup: Every 5 minutes
+- Expiry: Every expiry_poll_interval seconds (plus a one-off rebuild at startup)
+- SubTokenWarm: Once at startup
+- PortRebuild: Once at startup
+- SubStatsFlush: Every sub_stats_flush_interval seconds
 """
 
 import asyncio
 import logging
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.triggers.date import DateTrigger
 from apscheduler.executors.asyncio import AsyncIOExecutor
 from datetime import datetime
 
@@ -22,7 +30,13 @@ from app.services.tasks import (
     daily_job,
     hourly_job,
     check_job,
-    db_clean_job
+    db_clean_job,
+    traffic_rollup_job,
+    expiry_job,
+    expiry_rebuild_job,
+    sub_token_warm_job,
+    port_rebuild_job,
+    sub_stats_flush_job
 )
 
 settings = get_settings()
@@ -103,6 +117,66 @@ def start_scheduler():
     )
     logger.info("✓ Scheduled DbClean: Weekly on Sunday at 04:00")
 
+    # Schedule TrafficRollup - Every 5 minutes
+    if settings.enable_traffic_rollup:
+        scheduler.add_job(
+            traffic_rollup_job,
+            trigger=CronTrigger(minute='*/5'),
+            id='traffic_rollup_job',
+            name='Traffic Rollup Job',
+            replace_existing=True
+        )
+        logger.info("✓ Scheduled TrafficRollup: Every 5 minutes")
+
+    # Schedule Expiry - Rebuild once now, then poll the delay queue
+    if settings.enable_expiry_queue:
+        scheduler.add_job(
+            expiry_rebuild_job,
+            trigger=DateTrigger(),
+            id='expiry_rebuild_job',
+            name='Expiry Rebuild Job',
+            replace_existing=True
+        )
+        scheduler.add_job(
+            expiry_job,
+            trigger=IntervalTrigger(seconds=settings.expiry_poll_interval),
+            id='expiry_job',
+            name='Expiry Job',
+            replace_existing=True
+        )
+        logger.info(f"✓ Scheduled Expiry: Every {settings.expiry_poll_interval} seconds")
+
+    # Schedule SubTokenWarm - Once at startup
+    scheduler.add_job(
+        sub_token_warm_job,
+        trigger=DateTrigger(),
+        id='sub_token_warm_job',
+        name='Subscription Token Warm Job',
+        replace_existing=True
+    )
+    logger.info("✓ Scheduled SubTokenWarm: Once at startup")
+
+    # Schedule PortRebuild - Once at startup
+    scheduler.add_job(
+        port_rebuild_job,
+        trigger=DateTrigger(),
+        id='port_rebuild_job',
+        name='Port Bitmap Rebuild Job',
+        replace_existing=True
+    )
+    logger.info("✓ Scheduled PortRebuild: Once at startup")
+
+    # Schedule SubStatsFlush - Every sub_stats_flush_interval seconds
+    if settings.enable_sub_stats:
+        scheduler.add_job(
+            sub_stats_flush_job,
+            trigger=IntervalTrigger(seconds=settings.sub_stats_flush_interval),
+            id='sub_stats_flush_job',
+            name='Subscription Stats Flush Job',
+            replace_existing=True
+        )
+        logger.info(f"✓ Scheduled SubStatsFlush: Every {settings.sub_stats_flush_interval} seconds")
+
     # Start the scheduler
     scheduler.start()
     logger.info("✅ APScheduler started successfully")
@@ -5,13 +5,27 @@ This module provides security-related utilities including password hashing,
 JWT token management, and other security functions.
 """
 
+import time
+import asyncio
+import hashlib
+import logging
+import secrets
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import get_settings
+from app.core.metrics import register_collector
+
+try:
+    import jwt as pyjwt
+except ImportError:  # Optional dependency: python-jose only
+    pyjwt = None
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -44,6 +58,227 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordPoolBusy(Exception):
+    """Raised when more password operations are queued than allowed"""
+
+
+class PasswordPool:
+    """
+    Bounded thread pool for bcrypt work
+
+    bcrypt takes 100-300ms of CPU per call and releases the GIL, so running
+    it in threads keeps the event loop (node WebAPI, subscriptions) free.
+    At most `workers` operations run at once; up to `max_waiting` more
+    wait for a slot, beyond that PasswordPoolBusy is raised immediately,
+    so a login storm only slows down logins.
+    """
+
+    def __init__(self, workers: int, max_waiting: int):
+        self.workers = max(1, workers)
+        self.max_waiting = max_waiting
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = asyncio.Semaphore(self.workers)
+
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Run a blocking password function in the pool
+
+        Raises:
+            PasswordPoolBusy: If the wait queue is full
+        """
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise PasswordPoolBusy()
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Current queue depth and counters"""
+        return {
+            "workers": self.workers,
+            "max_waiting": self.max_waiting,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+password_pool = PasswordPool(settings.password_hash_workers, settings.password_hash_max_waiting)
+register_collector("password_pool", password_pool.stats)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password() off the event loop (see PasswordPool)
+
+    Raises:
+        PasswordPoolBusy: If too many password operations are queued
+    """
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    get_password_hash() off the event loop (see PasswordPool)
+
+    Raises:
+        PasswordPoolBusy: If too many password operations are queued
+    """
+    return await password_pool.run(get_password_hash, password)
+
+
+class JWTBackend:
+    """A JWT library behind one encode/decode interface"""
+
+    def __init__(self, name: str, encode: Callable, decode: Callable, error: type):
+        self.name = name
+        self.encode = encode  # encode(claims, key, algorithm=...) -> str
+        self.decode = decode  # decode(token, key, algorithms=[...]) -> dict
+        self.error = error  # raised for invalid or expired tokens
+
+
+# Available backends; both produce and accept the same tokens
+JWT_BACKENDS: Dict[str, JWTBackend] = {
+    "jose": JWTBackend("jose", jwt.encode, jwt.decode, JWTError),
+}
+if pyjwt is not None:
+    JWT_BACKENDS["pyjwt"] = JWTBackend("pyjwt", pyjwt.encode, pyjwt.decode, pyjwt.PyJWTError)
+
+
+def get_jwt_backend(name: str) -> JWTBackend:
+    """
+    Resolve a JWT backend by name, falling back to python-jose
+
+    Args:
+        name: Backend name (jose, pyjwt)
+
+    Returns:
+        The backend
+    """
+    backend = JWT_BACKENDS.get(name)
+    if backend is None:
+        logger.warning(f"JWT backend {name} is not available, using jose")
+        backend = JWT_BACKENDS["jose"]
+    return backend
+
+
+_jwt_backend = get_jwt_backend(settings.jwt_backend)
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified JWT payloads
+
+    Keyed by the SHA-256 digest of the token (tokens themselves are not
+    kept). Entries are only returned while the token's exp lies in the
+    future, and the whole cache is dropped when the signing key or
+    algorithm changes, so a cached payload is never more trusted than a
+    fresh verification would be. Revocation is checked separately on every
+    request (see TokenBlacklist).
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        # token digest -> (exp, payload), most recently used last
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._signing_key: Tuple[str, str] = (settings.jwt_secret_key, settings.jwt_algorithm)
+
+        self.hits = 0
+        self.misses = 0
+
+    def _check_key(self) -> None:
+        """Drop every entry after a signing key rotation"""
+        signing_key = (settings.jwt_secret_key, settings.jwt_algorithm)
+        if signing_key != self._signing_key:
+            self._entries.clear()
+            self._signing_key = signing_key
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the verified payload of a token
+
+        Args:
+            token: JWT token
+
+        Returns:
+            A copy of the payload, or None if not cached or expired
+        """
+        if self.size <= 0:
+            return None
+        self._check_key()
+
+        digest = hashlib.sha256(token.encode()).digest()
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry[0] <= time.time():
+            del self._entries[digest]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return dict(entry[1])
+
+    def put(self, token: str, payload: Dict[str, Any]) -> None:
+        """
+        Remember a verified payload (tokens without exp are not cached)
+
+        Args:
+            token: JWT token
+            payload: Payload returned by a successful verification
+        """
+        if self.size <= 0 or "exp" not in payload:
+            return
+
+        digest = hashlib.sha256(token.encode()).digest()
+        self._entries[digest] = (float(payload["exp"]), payload)
+        self._entries.move_to_end(digest)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit counters"""
+        return {
+            "backend": _jwt_backend.name,
+            "size": len(self._entries),
+            "max_size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+token_cache = TokenCache(settings.jwt_cache_size)
+register_collector("jwt_cache", token_cache.stats)
+
+
 def create_access_token(
     data: Dict[str, Any],
     expires_delta: Optional[timedelta] = None
@@ -67,8 +302,10 @@ def create_access_token(
             minutes=settings.jwt_access_token_expire_minutes
         )
 
+    # Short random token ID, the key for revocation (see TokenBlacklist)
+    to_encode.setdefault("jti", secrets.token_urlsafe(12))
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
+    encoded_jwt = _jwt_backend.encode(
         to_encode,
         settings.jwt_secret_key,
         algorithm=settings.jwt_algorithm
@@ -81,22 +318,31 @@ def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Decode and verify a JWT access token
 
+    Verified payloads are kept in an LRU (see TokenCache), so a token seen
+    before is only checked for expiry instead of being verified again.
+
     Args:
         token: The JWT token to decode
 
     Returns:
         Decoded token payload if valid, None otherwise
     """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
     try:
-        payload = jwt.decode(
+        payload = _jwt_backend.decode(
             token,
             settings.jwt_secret_key,
             algorithms=[settings.jwt_algorithm]
         )
-        return payload
-    except JWTError:
+    except _jwt_backend.error:
         return None
 
+    token_cache.put(token, payload)
+    return dict(payload)
+
 
 def verify_mu_key(token: str) -> bool:
     """
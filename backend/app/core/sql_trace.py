@@ -0,0 +1,171 @@
+"""
+SQL Tracing
+
+This module measures the SQL issued by every request and logs slow
+queries, using SQLAlchemy cursor events on every engine:
+
+- per request (SQLTraceMiddleware): statement count, total DB time and the
+  slowest statement, returned as a Server-Timing header
+  (db;dur=<ms>;desc="<n> queries") and logged when the request issued
+  more than sql_trace_max_statements statements (N+1 patterns) or spent
+  more than slow_query_threshold_ms in the database
+- per statement (requests and scheduler jobs alike): statements slower
+  than slow_query_threshold_ms are logged with their normalized SQL
+  (literals and parameter lists collapsed, whitespace squeezed)
+
+The request trace lives in a context variable; SQLAlchemy runs cursor
+events in the awaiting task's context, so statements are attributed to
+the request that issued them. Statements run after the response was
+sent (e.g. the commit in get_db's teardown) are not in the header.
+"""
+
+import re
+import time
+import logging
+from contextvars import ContextVar
+from typing import Optional, Dict, Any
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import register_collector
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s)\s*,)+\s*(?:\?|%s|%\(\w+\)s)\s*\)")
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Reduce a statement to its shape for logging and grouping
+
+    Args:
+        statement: SQL as sent to the driver
+
+    Returns:
+        Statement with literals replaced by ? and IN/VALUES lists collapsed
+    """
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    return _VALUE_LIST.sub("(...)", statement)
+
+
+class RequestTrace:
+    """SQL statistics of one request"""
+
+    __slots__ = ("statements", "duration", "slowest", "slowest_sql")
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = ""
+
+    def server_timing(self) -> str:
+        """Server-Timing header value"""
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.statements} queries"'
+
+
+_current: ContextVar[Optional[RequestTrace]] = ContextVar("sql_trace", default=None)
+
+# Process-wide counters for the metrics endpoint
+_totals: Dict[str, int] = {"statements": 0, "slow_statements": 0, "flagged_requests": 0}
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not settings.enable_sql_trace:
+        return
+    conn.info.setdefault("sql_trace_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("sql_trace_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    _totals["statements"] += 1
+
+    trace = _current.get()
+    if trace is not None:
+        trace.statements += 1
+        trace.duration += elapsed
+        if elapsed > trace.slowest:
+            trace.slowest = elapsed
+            trace.slowest_sql = statement
+
+    if elapsed * 1000 >= settings.slow_query_threshold_ms:
+        _totals["slow_statements"] += 1
+        logger.warning(f"Slow query ({elapsed * 1000:.1f} ms): {normalize_sql(statement)}")
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None:
+        started = connection.info.get("sql_trace_started")
+        if started:
+            started.pop()
+
+
+class SQLTraceMiddleware:
+    """
+    ASGI middleware tracing the SQL of each HTTP request
+
+    Adds a Server-Timing header and logs requests that issued too many
+    statements or spent too long in the database.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.enable_sql_trace:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _current.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _report(scope, trace)
+
+
+def _report(scope, trace: RequestTrace) -> None:
+    """Log a request whose SQL looks like an N+1 pattern or is slow overall"""
+    if (
+        trace.statements <= settings.sql_trace_max_statements
+        and trace.duration * 1000 < settings.slow_query_threshold_ms
+    ):
+        return
+    _totals["flagged_requests"] += 1
+    logger.warning(
+        f"SQL heavy request {scope.get('method')} {scope.get('path')}: "
+        f"{trace.statements} statements, {trace.duration * 1000:.1f} ms in DB, "
+        f"slowest {trace.slowest * 1000:.1f} ms: {normalize_sql(trace.slowest_sql)}"
+    )
+
+
+def stats() -> Dict[str, Any]:
+    """Statement and slow-query counters (this worker)"""
+    return dict(_totals, slow_query_threshold_ms=settings.slow_query_threshold_ms)
+
+
+register_collector("sql", stats)
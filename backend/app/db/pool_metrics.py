@@ -0,0 +1,158 @@
+"""
+Connection Pool Metrics
+
+This module instruments SQLAlchemy connection pools so their sizing can be
+based on observed pressure instead of guesses. Every engine gets a
+PoolMonitor, reported in the "db_pool" section of the admin metrics
+endpoint (per worker process):
+
+- checkout wait: time from requesting a connection until the pool hands
+  it out (queueing, new connections and pre-ping included), as a
+  histogram plus average / maximum
+- timeouts: checkouts that gave up after db_pool_timeout seconds
+- in use / idle / overflow: current pool state
+- hold time: how long connections stay checked out (average / maximum)
+- connection age: open connections and the age of the oldest one, opened
+  and closed totals (pool_recycle replaces old connections)
+
+Waits are measured by a QueuePool subclass (pool events have no hook
+before a checkout starts); everything else comes from pool events.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Dict, Any, List
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import register_collector
+
+# Upper bounds (milliseconds) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool reporting checkout waits to its PoolMonitor"""
+
+    monitor: "PoolMonitor" = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.monitor.timeouts += 1
+            raise
+        finally:
+            self.monitor.observe_wait(time.perf_counter() - started)
+
+
+class PoolMonitor:
+    """Checkout, hold and connection-age statistics of one engine's pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+
+        self.wait_buckets: List[int] = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+        self.checkouts = 0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+
+        # id(DBAPI connection) -> time.monotonic() it was opened
+        self._opened_at: Dict[int, float] = {}
+        self.opened = 0
+        self.closed = 0
+
+    def pool_class(self) -> type:
+        """Pool class to pass as poolclass= (reports to this monitor)"""
+        return type("InstrumentedQueuePool", (InstrumentedQueuePool,), {"monitor": self})
+
+    def attach(self, engine) -> None:
+        """
+        Listen to the engine's pool events
+
+        Args:
+            engine: AsyncEngine created with poolclass=self.pool_class()
+        """
+        self.engine = engine
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "connect", self._on_connect)
+        event.listen(sync_engine, "close", self._on_close)
+        event.listen(sync_engine, "close_detached", self._on_close_detached)
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "checkin", self._on_checkin)
+        _monitors[self.name] = self
+
+    def observe_wait(self, seconds: float) -> None:
+        """Record one checkout wait"""
+        self.wait_buckets[bisect_left(WAIT_BUCKETS_MS, seconds * 1000)] += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self._opened_at[id(dbapi_connection)] = time.monotonic()
+        self.opened += 1
+
+    def _on_close(self, dbapi_connection, connection_record):
+        self._opened_at.pop(id(dbapi_connection), None)
+        self.closed += 1
+
+    def _on_close_detached(self, dbapi_connection):
+        self._opened_at.pop(id(dbapi_connection), None)
+        self.closed += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.monotonic()
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            held = time.monotonic() - checked_out_at
+            self.hold_total += held
+            self.hold_max = max(self.hold_max, held)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current pool state and cumulative statistics"""
+        pool = self.engine.pool if self.engine is not None else None
+        waits = sum(self.wait_buckets)
+        now = time.monotonic()
+        oldest = min(self._opened_at.values(), default=None)
+
+        histogram = {f"le_{bound}ms": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)}
+        histogram["gt_5000ms"] = self.wait_buckets[-1]
+
+        return {
+            "size": pool.size() if pool is not None else 0,
+            "in_use": pool.checkedout() if pool is not None else 0,
+            "idle": pool.checkedin() if pool is not None else 0,
+            "overflow": pool.overflow() if pool is not None else 0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / waits * 1000, 2) if waits else 0,
+            "wait_max_ms": round(self.wait_max * 1000, 2),
+            "wait_histogram": histogram,
+            "hold_avg_ms": round(self.hold_total / self.checkouts * 1000, 2) if self.checkouts else 0,
+            "hold_max_ms": round(self.hold_max * 1000, 2),
+            "connections": len(self._opened_at),
+            "oldest_connection_age": int(now - oldest) if oldest is not None else 0,
+            "opened": self.opened,
+            "closed": self.closed,
+        }
+
+
+# name -> monitor of every instrumented engine
+_monitors: Dict[str, PoolMonitor] = {}
+
+
+def collect_pools() -> Dict[str, Any]:
+    """Stats of every instrumented pool"""
+    return {name: monitor.stats() for name, monitor in _monitors.items()}
+
+
+register_collector("db_pool", collect_pools)
@@ -6,11 +6,14 @@ providing async support using redis-py.
 """
 
 import json
+import asyncio
+import logging
 import redis.asyncio as aioredis
-from typing import Optional, Any
+from typing import Optional, Any, Callable, Awaitable, Dict, List
 from app.core.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 class RedisClient:
@@ -23,6 +26,9 @@ class RedisClient:
 
     def __init__(self):
         self.redis: Optional[aioredis.Redis] = None
+        # Same server without response decoding, for binary values (e.g. gzip bodies)
+        self.binary: Optional[aioredis.Redis] = None
+        self._scripts: dict = {}
 
     async def connect(self):
         """Establish Redis connection"""
@@ -32,6 +38,12 @@ class RedisClient:
             decode_responses=settings.redis_decode_responses,
             max_connections=50,
         )
+        self.binary = aioredis.from_url(
+            settings.redis_url,
+            decode_responses=False,
+            max_connections=50,
+        )
+        self._scripts = {}
         try:
             await self.redis.ping()
             print("✅ Redis connection successful!")
@@ -41,6 +53,8 @@ class RedisClient:
 
     async def close(self):
         """Close Redis connection"""
+        if self.binary:
+            await self.binary.close()
         if self.redis:
             await self.redis.close()
             print("✅ Redis connection closed!")
@@ -56,6 +70,7 @@ class RedisClient:
         key: str,
         value: str,
         ex: Optional[int] = None,
+        nx: bool = False,
     ) -> bool:
         """
         Set value in Redis
@@ -64,10 +79,29 @@ class RedisClient:
             key: Redis key
             value: Value to store
             ex: Expiration time in seconds
+            nx: Only set if the key does not exist (returns None if it did)
         """
         if not self.redis:
             return False
-        return await self.redis.set(key, value, ex=ex)
+        return await self.redis.set(key, value, ex=ex, nx=nx)
+
+    async def setex(self, key: str, seconds: int, value: str) -> bool:
+        """Set value with expiration time in seconds"""
+        if not self.redis:
+            return False
+        return await self.redis.setex(key, seconds, value)
+
+    async def mget(self, *keys: str) -> list:
+        """Get multiple values in one round trip (missing keys are None)"""
+        if not self.redis:
+            return [None] * len(keys)
+        return await self.redis.mget(keys)
+
+    async def mset(self, mapping: dict) -> bool:
+        """Set multiple values in one round trip"""
+        if not self.redis or not mapping:
+            return False
+        return await self.redis.mset(mapping)
 
     async def delete(self, key: str) -> int:
         """Delete key from Redis"""
@@ -171,6 +205,50 @@ class RedisClient:
             return False
         return await self.redis.ltrim(name, start, end)
 
+    async def zadd(self, name: str, mapping: dict) -> int:
+        """Add members with scores to sorted set (updates existing scores)"""
+        if not self.redis or not mapping:
+            return 0
+        return await self.redis.zadd(name, mapping)
+
+    async def zrem(self, name: str, *values: str) -> int:
+        """Remove members from sorted set"""
+        if not self.redis:
+            return 0
+        return await self.redis.zrem(name, *values)
+
+    async def zcard(self, name: str) -> int:
+        """Get number of members in sorted set"""
+        if not self.redis:
+            return 0
+        return await self.redis.zcard(name)
+
+    async def eval_script(self, script: str, keys: list, args: list) -> Any:
+        """
+        Run a Lua script atomically
+
+        Scripts are registered once and then invoked by SHA (EVALSHA),
+        falling back to EVAL transparently if Redis lost the script cache.
+
+        Args:
+            script: Lua source
+            keys: KEYS passed to the script
+            args: ARGV passed to the script
+        """
+        if not self.redis:
+            return None
+        compiled = self._scripts.get(script)
+        if compiled is None:
+            compiled = self.redis.register_script(script)
+            self._scripts[script] = compiled
+        return await compiled(keys=keys, args=args)
+
+    async def publish(self, channel: str, message: str) -> int:
+        """Publish a message to a pub/sub channel"""
+        if not self.redis:
+            return 0
+        return await self.redis.publish(channel, message)
+
     async def json_get(self, key: str) -> Optional[dict]:
         """Get JSON value from Redis"""
         value = await self.get(key)
@@ -233,17 +311,102 @@ class RedisClient:
         return await self.set(key, value, ex=ex)
 
 
+class PubSubListener:
+    """
+    Per-process Redis pub/sub dispatcher
+
+    Services register async handlers per channel (usually at import time);
+    one background task per process subscribes to all registered channels
+    and dispatches messages. Used to propagate invalidations (e.g. revoked
+    tokens) to the in-process caches of every worker.
+
+    Messages published while the subscriber is disconnected are lost, so
+    each channel may also register an on_resync callback that is called on
+    every (re)subscribe to rebuild or drop its local state.
+    """
+
+    def __init__(self, client: RedisClient):
+        self._client = client
+        self._handlers: Dict[str, List[Callable[[str], Awaitable[None]]]] = {}
+        self._resync: List[Callable[[], Awaitable[None]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def register(
+        self,
+        channel: str,
+        handler: Callable[[str], Awaitable[None]],
+        on_resync: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> None:
+        """
+        Register a handler for a channel
+
+        Args:
+            channel: Pub/sub channel name
+            handler: Async callable receiving the message payload
+            on_resync: Async callable run after every (re)subscribe
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+        if on_resync is not None:
+            self._resync.append(on_resync)
+
+    async def start(self) -> None:
+        """Start the subscriber task (no-op without Redis or handlers)"""
+        if self._task or not self._client.redis or not self._handlers:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the subscriber task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """Subscribe and dispatch forever, reconnecting on errors"""
+        while True:
+            pubsub = self._client.redis.pubsub()
+            try:
+                await pubsub.subscribe(*self._handlers)
+                for callback in self._resync:
+                    await callback()
+
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    for handler in self._handlers.get(message["channel"], ()):
+                        try:
+                            await handler(message["data"])
+                        except Exception as e:
+                            logger.error(f"Pub/sub handler failed on {message['channel']}: {str(e)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Pub/sub listener error, reconnecting: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
 # Global Redis client instance
 redis_client = RedisClient()
 
+# Global pub/sub dispatcher
+pubsub_listener = PubSubListener(redis_client)
+
 
 async def init_redis():
-    """Initialize Redis connection"""
+    """Initialize Redis connection and start the pub/sub listener"""
     await redis_client.connect()
+    await pubsub_listener.start()
 
 
 async def close_redis():
-    """Close Redis connection"""
+    """Stop the pub/sub listener and close Redis connection"""
+    await pubsub_listener.stop()
     await redis_client.close()
 
 
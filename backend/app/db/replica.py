@@ -0,0 +1,189 @@
+"""
+Read Replica Routing
+
+This module routes read-only endpoints to the read replica
+(DB_REPLICA_HOST) while keeping them consistent enough for the caller:
+
+- lag-aware: the replica's replication delay (SHOW REPLICA STATUS) is
+  checked every db_replica_check_interval seconds per worker; above
+  db_replica_max_lag, or if the check fails, reads go to the primary
+- read-your-writes: a caller whose request wrote to the primary is pinned
+  to the primary for db_read_your_writes_window seconds (see get_db)
+- version-aware: paths that fill version-keyed caches (subscription
+  renders, node user lists, the node index) call pin_if_recent() with the
+  versions they are about to cache. A version token is the time of the
+  write that bumped it, so a recent one means the replica may not have
+  the row yet and the read goes to the primary.
+
+Without a replica get_read_db() yields a plain primary session.
+"""
+
+import time
+import asyncio
+import logging
+from typing import AsyncGenerator, Optional, Dict, Any
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import replica_engine, ReadSessionLocal, AsyncSessionLocal, RECENT_WRITE_KEY, caller_id
+from app.db.redis import redis_client
+from app.core.metrics import register_collector
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# (statement, lag column): MySQL 8.0.22+ first, then the older names
+LAG_QUERIES = (
+    ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+    ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+)
+
+
+class ReplicaMonitor:
+    """Cached replication lag of the read replica"""
+
+    def __init__(self):
+        self.healthy = False
+        self.lag: Optional[int] = None
+        self._checked_at = 0.0  # time.monotonic() of the last check (0 = check now)
+        self._lock = asyncio.Lock()
+
+        self.read_sessions = 0
+        self.pinned_sessions = 0  # read sessions sent to the primary
+
+    async def is_usable(self) -> bool:
+        """
+        Check whether reads may go to the replica
+
+        Returns:
+            True if a replica is configured and within db_replica_max_lag
+        """
+        if replica_engine is None:
+            return False
+        if time.monotonic() - self._checked_at >= settings.db_replica_check_interval:
+            await self._check()
+        return self.healthy
+
+    async def _check(self) -> None:
+        """Measure the replication lag (at most once per interval)"""
+        async with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < settings.db_replica_check_interval:
+                return
+            # Also throttles retries while the replica is unreachable
+            self._checked_at = now
+            try:
+                async with replica_engine.connect() as conn:
+                    self.lag = await self._replication_lag(conn)
+            except Exception as e:
+                logger.error(f"Replica lag check failed: {str(e)}")
+                self.lag = None
+
+            healthy = self.lag is not None and self.lag <= settings.db_replica_max_lag
+            if healthy != self.healthy:
+                logger.warning(f"Read replica {'in' if healthy else 'out of'} service (lag: {self.lag})")
+            self.healthy = healthy
+
+    @staticmethod
+    async def _replication_lag(conn) -> Optional[int]:
+        """Seconds behind the primary (None if replication is broken)"""
+        for statement, column in LAG_QUERIES:
+            try:
+                result = await conn.execute(text(statement))
+            except Exception:
+                await conn.rollback()
+                continue
+            row = result.mappings().first()
+            if row is None:
+                # Not a replica (e.g. a proxy in front of the primary): no lag
+                return 0
+            return row[column]
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Replica state and read routing counters"""
+        return {
+            "configured": replica_engine is not None,
+            "healthy": self.healthy,
+            "lag": self.lag,
+            "read_sessions": self.read_sessions,
+            "pinned_sessions": self.pinned_sessions,
+        }
+
+
+replica_monitor = ReplicaMonitor()
+register_collector("db_replica", replica_monitor.stats)
+
+
+def pin_primary(db: AsyncSession) -> None:
+    """Send the session's remaining statements to the primary"""
+    info = db.sync_session.info
+    if not info.get("primary"):
+        info["primary"] = True
+        replica_monitor.pinned_sessions += 1
+
+
+def pin_if_recent(db: AsyncSession, *versions: str) -> None:
+    """
+    Pin the session to the primary if any version was bumped recently
+
+    Args:
+        db: Session from get_read_db (no effect on primary sessions)
+        versions: Version tokens (see VersionService), "0" for missing keys
+    """
+    if replica_engine is None or db.sync_session.info.get("primary"):
+        return
+    if not versions:
+        # Nothing to compare against: only the primary is safe
+        pin_primary(db)
+        return
+
+    horizon = time.time_ns() - settings.db_read_your_writes_window * 1_000_000_000
+    for version in versions:
+        try:
+            if int(version, 16) >= horizon:
+                pin_primary(db)
+                return
+        except ValueError:
+            pin_primary(db)
+            return
+
+
+async def _recently_wrote(request: Request) -> bool:
+    """Whether the caller wrote within db_read_your_writes_window seconds"""
+    user_id = caller_id(request)
+    if user_id is None:
+        return False
+    try:
+        return await redis_client.exists(RECENT_WRITE_KEY.format(user_id))
+    except Exception as e:
+        logger.error(f"Recent write check failed for user {user_id}: {str(e)}")
+        return True
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function to get a read-only database session
+
+    Reads go to the replica when it is configured, within the lag limit
+    and the caller has not written recently; otherwise to the primary.
+    Nothing is committed.
+
+    Args:
+        request: Current request (identifies the caller for read-your-writes)
+
+    Yields:
+        AsyncSession: SQLAlchemy async session
+    """
+    if replica_engine is None:
+        async with AsyncSessionLocal() as session:
+            yield session
+        return
+
+    async with ReadSessionLocal() as session:
+        replica_monitor.read_sessions += 1
+        if not await replica_monitor.is_usable() or await _recently_wrote(request):
+            pin_primary(session)
+        yield session
@@ -3,25 +3,57 @@ Database Session Management
 
 This module handles all database connection and session management,
 providing async support for MySQL using SQLAlchemy and aiomysql.
+
+If DB_REPLICA_HOST is set, a second engine serves read-only endpoints
+(see app.db.replica.get_read_db). Sessions from get_db record whether
+they wrote anything; after such a commit the caller's reads are pinned to
+the primary for db_read_your_writes_window seconds (db:recent:{user_id}).
 """
 
-from typing import AsyncGenerator
+import logging
+from typing import AsyncGenerator, Optional
+from fastapi import Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import declarative_base, Session
 from app.core.config import get_settings
+from app.core.security import decode_access_token
+from app.db.redis import redis_client
+from app.db.pool_metrics import PoolMonitor
 
 # Get settings
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-# Create async engine
+# Create async engine (pool instrumented, see app.db.pool_metrics)
+primary_pool = PoolMonitor("primary")
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
+    poolclass=primary_pool.pool_class(),
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    pool_recycle=3600,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
 )
+primary_pool.attach(engine)
+
+# Read replica engine (None if not configured)
+replica_engine = None
+if settings.replica_database_url:
+    replica_pool = PoolMonitor("replica")
+    replica_engine = create_async_engine(
+        settings.replica_database_url,
+        echo=settings.debug,
+        poolclass=replica_pool.pool_class(),
+        pool_pre_ping=True,
+        pool_size=settings.db_replica_pool_size,
+        max_overflow=settings.db_replica_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    replica_pool.attach(replica_engine)
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -32,17 +64,87 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+
+class RoutingSession(Session):
+    """
+    Session reading from the replica unless pinned to the primary
+
+    The bind is chosen per statement, so pin_primary() takes effect even
+    after earlier statements of the same session went to the replica.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if replica_engine is None or self.info.get("primary"):
+            return engine.sync_engine
+        return replica_engine.sync_engine
+
+
+# Session factory for read-only endpoints (see app.db.replica.get_read_db)
+ReadSessionLocal = async_sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
+RECENT_WRITE_KEY = "db:recent:{}"
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    """Record ORM unit-of-work writes"""
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_execute(orm_execute_state):
+    """Record INSERT / UPDATE / DELETE statements"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+def caller_id(request: Request) -> Optional[int]:
+    """
+    User ID of the request's Bearer token (None if absent or invalid)
+
+    Used for routing only; authentication is done by app.core.deps.
+    """
+    authorization = request.headers.get("authorization")
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    payload = decode_access_token(authorization[7:])
+    if not payload or not str(payload.get("sub", "")).isdigit():
+        return None
+    return int(payload["sub"])
+
+
+async def _mark_recent_write(request: Request) -> None:
+    """Pin the caller's reads to the primary while the replica may lag behind"""
+    user_id = caller_id(request)
+    if user_id is None:
+        return
+    try:
+        await redis_client.set(
+            RECENT_WRITE_KEY.format(user_id), "1", ex=settings.db_read_your_writes_window
+        )
+    except Exception as e:
+        logger.error(f"Failed to mark recent write for user {user_id}: {str(e)}")
+
 # Base class for models
 Base = declarative_base()
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency function to get database session
 
     This function is used as a FastAPI dependency to provide database sessions
     to endpoint functions. It ensures proper cleanup after use.
 
+    Args:
+        request: Current request (identifies the caller for read-your-writes)
+
     Yields:
         AsyncSession: SQLAlchemy async session
 
@@ -57,6 +159,8 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         try:
             yield session
             await session.commit()
+            if replica_engine is not None and session.info.get("wrote"):
+                await _mark_recent_write(request)
         except Exception:
             await session.rollback()
             raise
@@ -92,4 +196,6 @@ async def close_db():
     to properly close all database connections.
     """
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
     print("✅ Database connections closed!")
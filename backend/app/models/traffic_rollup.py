@@ -0,0 +1,80 @@
+"""
+Traffic Rollup Models
+
+This module defines the hourly/daily traffic summary tables built
+incrementally from user_traffic_log, plus the watermark table that
+records how far the rollup has progressed.
+
+These tables are NOT part of the original PHP schema.
+Create them with migrations/001_traffic_rollup.sql.
+"""
+
+from sqlalchemy import Column, Integer, BigInteger, String, Index
+from app.db.session import Base
+
+
+class UserTrafficHourly(Base):
+    """
+    Hourly Traffic Rollup Model
+
+    One row per (user, node, hour). bucket is the Unix timestamp of the hour start.
+    """
+
+    __tablename__ = "user_traffic_hourly"
+    __table_args__ = (
+        Index("idx_hourly_node_bucket", "node_id", "bucket"),
+        Index("idx_hourly_bucket", "bucket"),
+    )
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False, comment="User ID")
+    node_id = Column(Integer, primary_key=True, autoincrement=False, comment="Node ID")
+    bucket = Column(Integer, primary_key=True, autoincrement=False, comment="Hour Start (timestamp)")
+    u = Column(BigInteger, nullable=False, default=0, comment="Upload Traffic (bytes)")
+    d = Column(BigInteger, nullable=False, default=0, comment="Download Traffic (bytes)")
+    charged = Column(BigInteger, nullable=False, default=0, comment="Rate-adjusted Traffic (bytes)")
+
+    def __repr__(self):
+        return f"<UserTrafficHourly(user_id={self.user_id}, node_id={self.node_id}, bucket={self.bucket})>"
+
+
+class UserTrafficDaily(Base):
+    """
+    Daily Traffic Rollup Model
+
+    One row per (user, node, day). bucket is the Unix timestamp of the day start
+    in the scheduler timezone.
+    """
+
+    __tablename__ = "user_traffic_daily"
+    __table_args__ = (
+        Index("idx_daily_node_bucket", "node_id", "bucket"),
+        Index("idx_daily_bucket", "bucket"),
+    )
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False, comment="User ID")
+    node_id = Column(Integer, primary_key=True, autoincrement=False, comment="Node ID")
+    bucket = Column(Integer, primary_key=True, autoincrement=False, comment="Day Start (timestamp)")
+    u = Column(BigInteger, nullable=False, default=0, comment="Upload Traffic (bytes)")
+    d = Column(BigInteger, nullable=False, default=0, comment="Download Traffic (bytes)")
+    charged = Column(BigInteger, nullable=False, default=0, comment="Rate-adjusted Traffic (bytes)")
+
+    def __repr__(self):
+        return f"<UserTrafficDaily(user_id={self.user_id}, node_id={self.node_id}, bucket={self.bucket})>"
+
+
+class TrafficRollupWatermark(Base):
+    """
+    Traffic Rollup Watermark Model
+
+    Stores the last user_traffic_log.id folded into the rollup tables.
+    Updated in the same transaction as the rollup rows.
+    """
+
+    __tablename__ = "traffic_rollup_watermark"
+
+    name = Column(String(64), primary_key=True, comment="Rollup Name")
+    last_log_id = Column(BigInteger, nullable=False, default=0, comment="Last Processed Log ID")
+    updated_at = Column(Integer, nullable=False, default=0, comment="Last Update Time")
+
+    def __repr__(self):
+        return f"<TrafficRollupWatermark(name={self.name}, last_log_id={self.last_log_id})>"
@@ -12,13 +12,28 @@ from sqlalchemy import select
 from fastapi import HTTPException, status
 
 from app.models.user import User
-from app.core.security import verify_password, get_password_hash, create_access_token, decode_access_token
+from app.core.security import (
+    verify_password_async, get_password_hash_async, create_access_token, decode_access_token,
+    PasswordPoolBusy
+)
 from app.db.redis import RedisClient
+from app.services.version_service import VersionService
+from app.services.token_blacklist import TokenBlacklist
+from app.services.port_allocator import PortAllocator
 from app.core.config import get_settings
 
 settings = get_settings()
 
 
+def _password_pool_busy() -> HTTPException:
+    """503 returned while the password pool queue is full"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="登录请求过多，请稍后重试",
+        headers={"Retry-After": "1"}
+    )
+
+
 class AuthService:
     """
     Authentication Service
@@ -43,6 +58,9 @@ class AuthService:
 
         Returns:
             User object if authentication successful, None otherwise
+
+        Raises:
+            PasswordPoolBusy: If the password pool queue is full
         """
         result = await db.execute(
             select(User).where(User.email == email)
@@ -52,7 +70,7 @@ class AuthService:
         if not user:
             return None
 
-        if not verify_password(password, user.password_hash):
+        if not await verify_password_async(password, user.password_hash):
             return None
 
         return user
@@ -79,7 +97,10 @@ class AuthService:
         Raises:
             HTTPException: If authentication fails
         """
-        user = await AuthService.authenticate_user(db, email, password)
+        try:
+            user = await AuthService.authenticate_user(db, email, password)
+        except PasswordPoolBusy:
+            raise _password_pool_busy()
 
         if not user:
             raise HTTPException(
@@ -162,17 +183,25 @@ class AuthService:
             )
 
         # Hash password
-        hashed_password = get_password_hash(password)
+        try:
+            hashed_password = await get_password_hash_async(password)
+        except PasswordPoolBusy:
+            raise _password_pool_busy()
 
         # Generate username from email if not provided
         if not user_name:
             user_name = email.split("@")[0]
 
-        # Generate random port and SS password
+        # Reserve a unique port and generate SS password
         import random
         import string
 
-        port = random.randint(10000, 65535)
+        port = await PortAllocator.allocate(db)
+        if port is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="暂无可用端口，请联系管理员"
+            )
         ss_passwd = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
 
         # Calculate transfer enable (default traffic from config)
@@ -197,8 +226,14 @@ class AuthService:
         )
 
         db.add(new_user)
-        await db.commit()
+        try:
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            await PortAllocator.release(port)
+            raise
         await db.refresh(new_user)
+        await VersionService.bump_user_list()
 
         return new_user
 
@@ -219,13 +254,19 @@ class AuthService:
         Returns:
             True if successful
         """
-        # Add token to blacklist
-        # Key format: blacklist_token:{token}
-        await redis.set(
-            f"blacklist_token:{token}",
-            str(user_id),
-            ex=settings.jwt_access_token_expire_minutes * 60
-        )
+        payload = decode_access_token(token)
+
+        if payload and payload.get("jti"):
+            # Revoke by token ID until the token would expire anyway
+            await TokenBlacklist.revoke(payload["jti"], float(payload["exp"]))
+        else:
+            # Tokens issued before jti was added: blacklist the full token
+            # Key format: blacklist_token:{token}
+            await redis.set(
+                f"blacklist_token:{token}",
+                str(user_id),
+                ex=settings.jwt_access_token_expire_minutes * 60
+            )
 
         # Remove active token
         await redis.delete(f"auth_token:{user_id}")
@@ -235,18 +276,28 @@ class AuthService:
     @staticmethod
     async def is_token_blacklisted(
         redis: RedisClient,
-        token: str
+        token: str,
+        payload: Dict[str, Any]
     ) -> bool:
         """
         Check if token is blacklisted
 
+        Tokens with a jti are checked against the in-process mirror of the
+        blacklist (no Redis call in the common case).
+
         Args:
             redis: Redis client
             token: JWT token to check
+            payload: Decoded token payload
 
         Returns:
             True if token is blacklisted
         """
+        jti = payload.get("jti")
+        if jti:
+            return await TokenBlacklist.is_revoked(jti)
+
+        # Tokens issued before jti was added
         return await redis.exists(f"blacklist_token:{token}")
 
     @staticmethod
@@ -264,14 +315,14 @@ class AuthService:
         Returns:
             Token payload if valid, None otherwise
         """
-        # Check if token is blacklisted
-        if await AuthService.is_token_blacklisted(redis, token):
-            return None
-
-        # Decode token
+        # Decode token (signature and expiry)
         payload = decode_access_token(token)
 
         if not payload:
             return None
 
+        # Check if token is blacklisted
+        if await AuthService.is_token_blacklisted(redis, token, payload):
+            return None
+
         return payload
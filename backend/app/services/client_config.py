@@ -0,0 +1,266 @@
+"""
+Structured Client Configurations
+
+This module renders full client configurations (Clash YAML, sing-box JSON)
+natively, so users no longer need an external subconverter (SUBCON_URL).
+
+Pipeline:
+1. NodeProfile: normalized, protocol-independent view of a node (the IR),
+   built once per node-set version by NodeIndexSnapshot
+2. compile_clash / compile_singbox: render the whole document for one
+   (class, group) node list with every user credential left as a slot;
+   compiled lazily and cached on the snapshot
+3. ClientConfigTemplate.render: per request, join the literal fragments
+   with the user's pre-encoded credential values
+
+Slots are produced by serializing the document with sentinel strings
+("\\x00port\\x00") and splitting json.dumps() output on them, so every
+literal is exactly what the serializer would have produced. Credential
+values are JSON-encoded, which is also valid YAML flow syntax.
+"""
+
+import re
+import json
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+from app.models.node import Node
+from app.models.user import User
+from app.utils.node_utils import get_node_type_name
+
+# json.dumps() escapes \x00 as \u0000, so a quoted sentinel is unambiguous
+_SLOT_PATTERN = re.compile(r'"\\u0000(\w+)\\u0000"')
+
+PROXY_GROUP = "Proxy"
+
+
+def _slot(field: str) -> str:
+    """Placeholder for a per-user value inside a document prototype"""
+    return f"\x00{field}\x00"
+
+
+class NodeProfile:
+    """
+    Normalized node description shared by every client format
+
+    Attributes:
+        node_type: Protocol name (ss, ssr, vmess, vless, trojan)
+        name: Display name
+        server: Server address
+    """
+
+    __slots__ = ("node_type", "name", "server")
+
+    def __init__(self, node_type: str, name: str, server: str):
+        self.node_type = node_type
+        self.name = name
+        self.server = server
+
+
+def build_profile(node: Node) -> NodeProfile:
+    """
+    Build the client-independent description of a node
+
+    Args:
+        node: Node object
+
+    Returns:
+        NodeProfile
+    """
+    return NodeProfile(get_node_type_name(node.sort), node.name, node.server)
+
+
+class ClientConfigTemplate:
+    """
+    Compiled client document with per-user slots
+
+    Attributes:
+        literals: Fixed fragments (len(fields) + 1 entries)
+        fields: Slot names between consecutive literals
+    """
+
+    __slots__ = ("literals", "fields")
+
+    def __init__(self, document: str):
+        parts = _SLOT_PATTERN.split(document)
+        self.literals = tuple(parts[0::2])
+        self.fields = tuple(parts[1::2])
+
+    def render(self, values: Dict[str, str]) -> str:
+        """
+        Fill the slots with encoded user values
+
+        Args:
+            values: Output of user_values()
+
+        Returns:
+            Complete document
+        """
+        literals = self.literals
+        out = [literals[0]]
+        for index, field in enumerate(self.fields, start=1):
+            out.append(values[field])
+            out.append(literals[index])
+        return "".join(out)
+
+
+def user_values(user: User) -> Dict[str, str]:
+    """
+    Encode the user credentials once per render
+
+    NEVER exposes the login password (pass field); only passwd is used.
+
+    Args:
+        user: User object
+
+    Returns:
+        Slot name -> JSON-encoded value
+    """
+    return {
+        "port": json.dumps(int(user.port)),
+        "password": json.dumps(user.passwd),
+        "method": json.dumps(user.method),
+        "protocol": json.dumps(user.protocol if user.protocol else "origin"),
+        "protocol_param": json.dumps(user.protocol_param if user.protocol_param else ""),
+        "obfs": json.dumps(user.obfs if user.obfs else "plain"),
+        "obfs_param": json.dumps(user.obfs_param if user.obfs_param else ""),
+        # Users without a UUID get a random one (same as the VMess share link)
+        "uuid": json.dumps(user.v2ray_uuid if user.v2ray_uuid else str(uuid.uuid4())),
+    }
+
+
+def _unique_names(profiles: Sequence[NodeProfile]) -> List[str]:
+    """Clients key proxies by name, so duplicate node names get a suffix"""
+    seen: Dict[str, int] = {}
+    names = []
+    for profile in profiles:
+        count = seen.get(profile.name, 0) + 1
+        seen[profile.name] = count
+        names.append(profile.name if count == 1 else f"{profile.name} ({count})")
+    return names
+
+
+def _clash_proxy(profile: NodeProfile, name: str) -> Optional[dict]:
+    """Clash proxy entry for one node, or None if unsupported"""
+    common = {
+        "name": name,
+        "type": profile.node_type,
+        "server": profile.server,
+        "port": _slot("port"),
+    }
+
+    if profile.node_type == "ss":
+        return {**common, "cipher": _slot("method"), "password": _slot("password"), "udp": True}
+
+    if profile.node_type == "ssr":
+        return {
+            **common,
+            "cipher": _slot("method"),
+            "password": _slot("password"),
+            "protocol": _slot("protocol"),
+            "protocol-param": _slot("protocol_param"),
+            "obfs": _slot("obfs"),
+            "obfs-param": _slot("obfs_param"),
+            "udp": True,
+        }
+
+    if profile.node_type == "vmess":
+        return {**common, "uuid": _slot("uuid"), "alterId": 0, "cipher": "auto", "udp": True}
+
+    if profile.node_type == "trojan":
+        return {**common, "password": _slot("password"), "sni": profile.server, "udp": True}
+
+    # vless has no subscription link either
+    return None
+
+
+def compile_clash(profiles: Sequence[NodeProfile]) -> ClientConfigTemplate:
+    """
+    Compile a Clash configuration for an ordered node list
+
+    Every proxy is written as a YAML flow mapping (JSON syntax), so the
+    document needs no YAML library and no per-value escaping rules.
+
+    Args:
+        profiles: Visible nodes in display order
+
+    Returns:
+        ClientConfigTemplate
+    """
+    proxies = []
+    for profile, name in zip(profiles, _unique_names(profiles)):
+        proxy = _clash_proxy(profile, name)
+        if proxy is not None:
+            proxies.append(proxy)
+
+    lines = ["proxies:"] if proxies else ["proxies: []"]
+    lines.extend(f"  - {json.dumps(proxy, ensure_ascii=False)}" for proxy in proxies)
+
+    group = {
+        "name": PROXY_GROUP,
+        "type": "select",
+        "proxies": [proxy["name"] for proxy in proxies] + ["DIRECT"],
+    }
+    lines.append("proxy-groups:")
+    lines.append(f"  - {json.dumps(group, ensure_ascii=False)}")
+    lines.append("rules:")
+    lines.append(f"  - MATCH,{PROXY_GROUP}")
+
+    return ClientConfigTemplate("\n".join(lines) + "\n")
+
+
+def _singbox_outbound(profile: NodeProfile, tag: str) -> Optional[dict]:
+    """sing-box outbound for one node, or None if unsupported"""
+    common = {"tag": tag, "server": profile.server, "server_port": _slot("port")}
+
+    if profile.node_type == "ss":
+        return {"type": "shadowsocks", **common, "method": _slot("method"), "password": _slot("password")}
+
+    if profile.node_type == "vmess":
+        return {"type": "vmess", **common, "uuid": _slot("uuid"), "security": "auto", "alter_id": 0}
+
+    if profile.node_type == "trojan":
+        return {
+            "type": "trojan",
+            **common,
+            "password": _slot("password"),
+            "tls": {"enabled": True, "server_name": profile.server},
+        }
+
+    # sing-box has no ShadowsocksR support
+    return None
+
+
+def compile_singbox(profiles: Sequence[NodeProfile]) -> ClientConfigTemplate:
+    """
+    Compile a sing-box configuration for an ordered node list
+
+    Args:
+        profiles: Visible nodes in display order
+
+    Returns:
+        ClientConfigTemplate
+    """
+    outbounds = []
+    for profile, tag in zip(profiles, _unique_names(profiles)):
+        outbound = _singbox_outbound(profile, tag)
+        if outbound is not None:
+            outbounds.append(outbound)
+
+    selector = {
+        "type": "selector",
+        "tag": PROXY_GROUP,
+        "outbounds": [outbound["tag"] for outbound in outbounds] + ["direct"],
+    }
+    document = {
+        "outbounds": [selector, *outbounds, {"type": "direct", "tag": "direct"}],
+        "route": {"final": PROXY_GROUP},
+    }
+    return ClientConfigTemplate(json.dumps(document, ensure_ascii=False, indent=2))
+
+
+# Subtype -> (compiler, Content-Type)
+CLIENT_FORMATS = {
+    "clash": (compile_clash, "text/yaml; charset=utf-8"),
+    "singbox": (compile_singbox, "application/json"),
+}
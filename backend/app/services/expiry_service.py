@@ -0,0 +1,156 @@
+"""
+Expiry Service (Timer Wheel)
+
+This module fires user class expirations close to the exact moment they
+happen, without scanning the user table. It applies the same rule as the
+DailyJob scan it replaces (class_expire passed → class = 0); expire_in is
+not acted on.
+
+The queue is a Redis sorted set of user_id -> class_expire (score):
+expiry:class. Entries are (re)scheduled whenever class_expire changes
+(e.g. ShopService.purchase_package). A lightweight poller atomically claims
+only the due entries and applies them in batches. The database UPDATE
+re-checks the expiry column, so a renewal racing with the poller is safe.
+"""
+
+import time
+import logging
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple
+from sqlalchemy import select, update, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.redis import redis_client
+from app.models.user import User
+from app.services.version_service import VersionService
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Atomically claim up to ARGV[2] members with score <= ARGV[1]
+CLAIM_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+for i = 1, #due, 2 do
+    redis.call('ZREM', KEYS[1], due[i])
+end
+return due
+"""
+
+
+class ExpiryService:
+    """Redis sorted-set delay queue for class expirations"""
+
+    CLASS_QUEUE = "expiry:class"
+    # Queue of an earlier version (expire_in), deleted by rebuild()
+    LEGACY_ACCOUNT_QUEUE = "expiry:account"
+
+    @staticmethod
+    async def schedule(user_id: int, class_expire: Optional[datetime] = None) -> None:
+        """
+        Schedule (or reschedule) a user's class expiration
+
+        Args:
+            user_id: User ID
+            class_expire: New class expiration time
+        """
+        if class_expire is not None:
+            await redis_client.zadd(
+                ExpiryService.CLASS_QUEUE, {str(user_id): class_expire.timestamp()}
+            )
+
+    @staticmethod
+    async def _claim_due(queue: str, now: float, limit: int) -> List[Tuple[int, float]]:
+        """
+        Atomically pop due entries from a queue
+
+        Returns:
+            List of (user_id, expires_at) tuples
+        """
+        due = await redis_client.eval_script(CLAIM_DUE_SCRIPT, [queue], [now, limit]) or []
+        return [(int(due[i]), float(due[i + 1])) for i in range(0, len(due), 2)]
+
+    @staticmethod
+    async def process_due(db: AsyncSession, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Apply all due class expirations
+
+        Args:
+            db: Database session
+            batch_size: Entries claimed per batch (default from settings)
+
+        Returns:
+            Number of users reset ({"class": n})
+        """
+        batch_size = batch_size or settings.expiry_batch_size
+        stats = {"class": 0}
+        queue = ExpiryService.CLASS_QUEUE
+
+        while True:
+            now = time.time()
+            entries = await ExpiryService._claim_due(queue, now, batch_size)
+            if not entries:
+                break
+
+            user_ids = [user_id for user_id, _ in entries]
+            try:
+                # Re-check the column: a renewal may have moved the expiry forward
+                result = await db.execute(
+                    update(User)
+                    .where(
+                        and_(
+                            User.id.in_(user_ids),
+                            User.class_level > 0,
+                            User.class_expire <= datetime.fromtimestamp(now)
+                        )
+                    )
+                    .values(class_level=0)
+                )
+                await db.commit()
+            except Exception:
+                # Put the claimed entries back so the next poll retries them
+                await db.rollback()
+                await redis_client.zadd(queue, {str(uid): score for uid, score in entries})
+                raise
+
+            if result.rowcount:
+                await VersionService.bump_user(*user_ids)
+            stats["class"] += result.rowcount
+
+            if len(entries) < batch_size:
+                break
+
+        return stats
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, chunk_size: int = 1000) -> int:
+        """
+        Re-seed the queue from the user table
+
+        Run once at startup so entries lost with Redis data are restored.
+        Only users with class > 0 can expire into anything, so only they are scanned.
+
+        Args:
+            db: Database session
+            chunk_size: Users per ZADD batch
+
+        Returns:
+            Number of users scheduled
+        """
+        await redis_client.delete(ExpiryService.LEGACY_ACCOUNT_QUEUE)
+
+        result = await db.stream(
+            select(User.id, User.class_expire)
+            .where(User.class_level > 0)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        scheduled = 0
+        async for rows in result.partitions(chunk_size):
+            await redis_client.zadd(
+                ExpiryService.CLASS_QUEUE,
+                {str(row.id): row.class_expire.timestamp() for row in rows}
+            )
+            scheduled += len(rows)
+
+        return scheduled
@@ -0,0 +1,148 @@
+"""
+Subscription Link Templates
+
+This module precompiles the node-specific part of every subscription link
+once per node-set version (the NodeIndexSnapshot compiles all visible nodes
+when it is built). Rendering a link for a user then becomes fixed string
+concatenation plus one base64 encode.
+
+Output is byte-identical to the reference generators in SubscriptionService
+(generate_ss_link, generate_ssr_link, generate_vmess_link, generate_trojan_link),
+including the SSR "/?{params}" dict repr and VMess json.dumps() formatting.
+"""
+
+import json
+import uuid
+import base64
+from typing import Optional
+
+from app.models.node import Node
+from app.models.user import User
+from app.utils.node_utils import get_node_type_name
+
+# base64("SSPanel") without padding, constant for every SSR link
+SSR_GROUP = base64.b64encode("SSPanel".encode()).decode().rstrip("=")
+
+
+def _b64(value: str) -> str:
+    """URL-unsafe base64 without padding (same as the reference generators)"""
+    return base64.b64encode(value.encode()).decode().rstrip("=")
+
+
+class NodeLinkTemplate:
+    """
+    Pre-rendered node-specific fragments of a subscription link
+
+    Attributes:
+        node_type: Protocol name (ss, ssr, vmess, vless, trojan)
+        head: Fragment placed before the user port
+        tail: Fragment placed after the user-specific part
+    """
+
+    __slots__ = ("node_type", "head", "tail")
+
+    def __init__(self, node_type: str, head: str = "", tail: str = ""):
+        self.node_type = node_type
+        self.head = head
+        self.tail = tail
+
+
+class UserLinkParts:
+    """
+    User-specific link fragments, computed once per subscription render
+
+    NEVER exposes the login password (pass field); only passwd is used.
+    """
+
+    __slots__ = ("port", "ss_userinfo", "ssr_middle", "ssr_params", "vmess_port", "vmess_id", "passwd")
+
+    def __init__(self, user: User):
+        self.port = str(user.port)
+        self.passwd = user.passwd
+
+        # ss://base64(method:password@server:port)
+        self.ss_userinfo = f"{user.method}:{user.passwd}"
+
+        # ssr://base64(server:port:protocol:method:obfs:passwordbase64/?params)
+        protocol = user.protocol if user.protocol else "origin"
+        obfs = user.obfs if user.obfs else "plain"
+        self.ssr_middle = f":{protocol}:{user.method}:{obfs}:{_b64(user.passwd)}/?"
+        obfs_param = user.obfs_param if user.obfs_param else ""
+        protocol_param = user.protocol_param if user.protocol_param else ""
+        # Matches str(dict) of the reference generator, repr() picks the quoting
+        self.ssr_params = f"{{'obfsparam': {obfs_param!r}, 'protoparam': {protocol_param!r}"
+
+        # vmess://base64(json)
+        self.vmess_port = json.dumps(self.port)
+        self.vmess_id = json.dumps(user.v2ray_uuid) if user.v2ray_uuid else None
+
+
+def compile_node(node: Node) -> NodeLinkTemplate:
+    """
+    Pre-render the node-invariant fragments of a node's link
+
+    Args:
+        node: Node object
+
+    Returns:
+        NodeLinkTemplate for the node's protocol
+    """
+    node_type = get_node_type_name(node.sort)
+    server = node.server
+    name = node.name
+
+    if node_type == "ss":
+        return NodeLinkTemplate(node_type, head=f"@{server}:", tail=f"#{name}")
+
+    if node_type == "ssr":
+        remarks = _b64(name)
+        return NodeLinkTemplate(
+            node_type,
+            head=f"{server}:",
+            tail=f", 'remarks': {remarks!r}, 'group': {SSR_GROUP!r}}}"
+        )
+
+    if node_type == "vmess":
+        return NodeLinkTemplate(
+            node_type,
+            head=f'{{"v": "2", "ps": {json.dumps(name)}, "add": {json.dumps(server)}, "port": ',
+            tail=', "aid": "0", "net": "tcp", "type": "none", "host": "", "path": "", "tls": ""}'
+        )
+
+    if node_type == "trojan":
+        return NodeLinkTemplate(node_type, head=f"@{server}:", tail=f"?peer={server}#{name}")
+
+    # vless and unknown types have no share link
+    return NodeLinkTemplate(node_type)
+
+
+def render_link(template: NodeLinkTemplate, parts: UserLinkParts) -> Optional[str]:
+    """
+    Render one subscription link from a node template and user parts
+
+    Args:
+        template: Compiled node template
+        parts: Precomputed user fragments
+
+    Returns:
+        Link string, or None if the node type has no share link
+    """
+    node_type = template.node_type
+
+    if node_type == "ss":
+        return f"ss://{_b64(parts.ss_userinfo + template.head + parts.port)}{template.tail}"
+
+    if node_type == "ssr":
+        return "ssr://" + _b64(
+            template.head + parts.port + parts.ssr_middle + parts.ssr_params + template.tail
+        )
+
+    if node_type == "vmess":
+        # Users without a UUID get a random one per link (reference behaviour)
+        vmess_id = parts.vmess_id or json.dumps(str(uuid.uuid4()))
+        return "vmess://" + _b64(f'{template.head}{parts.vmess_port}, "id": {vmess_id}{template.tail}')
+
+    if node_type == "trojan":
+        return f"trojan://{parts.passwd}{template.head}{parts.port}{template.tail}"
+
+    return None
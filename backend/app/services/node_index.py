@@ -0,0 +1,233 @@
+"""
+Node Visibility Index
+
+This module keeps an in-process, precomputed index of visible nodes
+(type != 0, ordered by node_sort) for every (class_level, node_group) pair,
+so the user node list and subscription rendering never query ss_node
+on the request path.
+
+Visibility rules (same as the original query):
+- node.node_class <= user.class_level
+- user.node_group == 0 sees every group, otherwise node.node_group == user.node_group
+
+Freshness:
+- ver:nodes / ver:nodes:status are compared at most every
+  node_index_check_interval seconds (one MGET); a change triggers a rebuild
+- the index is also rebuilt when older than node_index_max_age seconds, which
+  bounds how stale the heartbeat snapshot used for "online" can get
+- a node's first heartbeat after being offline bumps ver:nodes:status
+  (see mark_node_alive), so nodes coming back show up immediately
+
+Each worker process holds its own index; rebuilding is a single query.
+"""
+
+import time
+import asyncio
+import logging
+from bisect import bisect_right
+from typing import Optional, Tuple, Dict, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.redis import redis_client
+from app.db.replica import pin_if_recent
+from app.models.node import Node
+from app.services.version_service import VersionService
+from app.services.link_templates import NodeLinkTemplate, compile_node
+from app.services.client_config import (
+    NodeProfile, ClientConfigTemplate, CLIENT_FORMATS, build_profile
+)
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Same threshold as check_node_online()
+NODE_ALIVE_TTL = 300
+
+
+class NodeIndexSnapshot:
+    """
+    Immutable view of the visible nodes at one point in time
+
+    Attributes:
+        nodes: All visible nodes ordered by node_sort (detached ORM objects)
+        templates: node.id -> precompiled subscription link template
+        profiles: node.id -> normalized node description for client configs
+        versions: (ver:nodes, ver:nodes:status) the snapshot was built for
+        built_at: time.monotonic() at build time
+    """
+
+    def __init__(self, nodes: List[Node], versions: Tuple[str, str]):
+        self.nodes = tuple(nodes)
+        self.versions = versions
+        self.built_at = time.monotonic()
+        self.templates: Dict[int, NodeLinkTemplate] = {
+            node.id: compile_node(node) for node in self.nodes
+        }
+        self.profiles: Dict[int, NodeProfile] = {
+            node.id: build_profile(node) for node in self.nodes
+        }
+        # (format, level index, group) -> compiled client document, filled lazily
+        self._client_configs: Dict[Tuple[str, int, int], ClientConfigTemplate] = {}
+
+        # Precompute every (class threshold, group) list; node lists only change
+        # at the distinct node_class values, so those are the only thresholds needed
+        self._levels = sorted({node.node_class for node in self.nodes})
+        groups = {node.node_group for node in self.nodes}
+
+        self._all: List[Tuple[Node, ...]] = []
+        self._by_group: Dict[Tuple[int, int], Tuple[Node, ...]] = {}
+        for index, level in enumerate(self._levels):
+            visible = tuple(node for node in self.nodes if node.node_class <= level)
+            self._all.append(visible)
+            for group in groups:
+                self._by_group[(index, group)] = tuple(
+                    node for node in visible if node.node_group == group
+                )
+
+    def visible(self, class_level: int, node_group: int) -> Tuple[Node, ...]:
+        """
+        Get the ordered visible nodes for a user class and group
+
+        Args:
+            class_level: User level
+            node_group: User node group (0 = all groups)
+
+        Returns:
+            Tuple of nodes ordered by node_sort
+        """
+        index = bisect_right(self._levels, class_level) - 1
+        if index < 0:
+            return ()
+        if node_group == 0:
+            return self._all[index]
+        return self._by_group.get((index, node_group), ())
+
+    def client_config(self, fmt: str, class_level: int, node_group: int) -> ClientConfigTemplate:
+        """
+        Get the compiled client document for a user class and group
+
+        Users whose class falls between the same two node_class levels see
+        the same nodes, so they share one compiled document.
+
+        Args:
+            fmt: Client format (key of CLIENT_FORMATS)
+            class_level: User level
+            node_group: User node group (0 = all groups)
+
+        Returns:
+            ClientConfigTemplate
+        """
+        index = bisect_right(self._levels, class_level) - 1
+        key = (fmt, index, node_group)
+        template = self._client_configs.get(key)
+        if template is None:
+            compiler = CLIENT_FORMATS[fmt][0]
+            nodes = self.visible(class_level, node_group)
+            template = compiler([self.profiles[node.id] for node in nodes])
+            self._client_configs[key] = template
+        return template
+
+
+class NodeIndex:
+    """Process-local holder of the current NodeIndexSnapshot"""
+
+    def __init__(self):
+        self._snapshot: Optional[NodeIndexSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self, now: float) -> bool:
+        snapshot = self._snapshot
+        return (
+            snapshot is not None
+            and now - self._checked_at < settings.node_index_check_interval
+            and now - snapshot.built_at < settings.node_index_max_age
+        )
+
+    async def get(self, db: AsyncSession) -> NodeIndexSnapshot:
+        """
+        Get the current snapshot, rebuilding it if stale
+
+        Args:
+            db: Database session (only used on rebuild)
+
+        Returns:
+            Current NodeIndexSnapshot
+        """
+        if self._is_fresh(time.monotonic()):
+            return self._snapshot
+
+        async with self._lock:
+            now = time.monotonic()
+            if self._is_fresh(now):
+                return self._snapshot
+
+            try:
+                values = await redis_client.mget(
+                    VersionService.NODES_KEY, VersionService.NODES_STATUS_KEY
+                )
+                versions = tuple(value or "0" for value in values)
+            except Exception as e:
+                # Without versions fall back to age-based rebuilds only
+                logger.error(f"Node index version check failed: {str(e)}")
+                versions = self._snapshot.versions if self._snapshot else ("0", "0")
+
+            snapshot = self._snapshot
+            if (
+                snapshot is None
+                or snapshot.versions != versions
+                or now - snapshot.built_at >= settings.node_index_max_age
+            ):
+                snapshot = await self._build(db, versions)
+                self._snapshot = snapshot
+
+            self._checked_at = now
+            return snapshot
+
+    @staticmethod
+    async def _build(db: AsyncSession, versions: Tuple[str, str]) -> NodeIndexSnapshot:
+        """Load all visible nodes and build a new snapshot"""
+        # The snapshot is tagged with `versions`: read them from the primary if just bumped
+        pin_if_recent(db, *versions)
+        result = await db.execute(
+            select(Node)
+            .where(Node.type != 0)  # Visible nodes only
+            .order_by(Node.node_sort)
+        )
+        nodes = result.scalars().all()
+
+        # Detach so the snapshot outlives the request session
+        for node in nodes:
+            db.expunge(node)
+
+        return NodeIndexSnapshot(nodes, versions)
+
+    def invalidate(self) -> None:
+        """Force a version check on the next access (same process only)"""
+        self._checked_at = 0.0
+
+
+async def mark_node_alive(node_id: int) -> None:
+    """
+    Record a node heartbeat; bump ver:nodes:status if the node was offline
+
+    Uses SET NX with the online threshold as TTL: the key only has to be
+    created again after the node went silent for NODE_ALIVE_TTL seconds.
+
+    Args:
+        node_id: Node ID
+    """
+    try:
+        created = await redis_client.set(f"node:alive:{node_id}", "1", ex=NODE_ALIVE_TTL, nx=True)
+        if created:
+            await VersionService.bump_node_status()
+        else:
+            await redis_client.expire(f"node:alive:{node_id}", NODE_ALIVE_TTL)
+    except Exception as e:
+        logger.error(f"Failed to record heartbeat for node {node_id}: {str(e)}")
+
+
+# Global node index instance
+node_index = NodeIndex()
@@ -0,0 +1,258 @@
+"""
+Port Allocator
+
+This module hands out unique user ports without collision checks against
+the database on the registration path.
+
+Storage:
+- ports:used (Redis bitmap): bit (port - port_range_min) is 1 if the port
+  is taken; the whole range is a fixed 7 KB string, so a scan costs the
+  same at 100 or 1,000,000 users
+- ports:ready: "<min>-<max>" once the bitmap was rebuilt for that range
+- ports:used:building: exists only while a rebuild runs and receives
+  every allocation made meanwhile
+- ports:rebuild:lock: SET NX EX lock, so only one worker rebuilds at a time
+
+Allocation is one Lua call: BITPOS for the first clear bit from a random
+byte offset (wrapping around once), then SETBIT. Random starting points
+keep ports spread over the range like the previous random.randint().
+
+The bitmap is rebuilt from the user table once at startup (scheduler, in
+every worker; workers that lose the lock skip it): ports are streamed into
+a local bitmap, which is then atomically OR-ed into ports:used together
+with the allocations made during the rebuild. Bits are never cleared by a
+rebuild, so a port handed out meanwhile cannot be lost. Only the first
+build for a range (or after a range change) replaces ports:used, which
+reclaims ports of users removed outside the application; code that deletes
+users should call release().
+
+Until the bitmap is ready (or without Redis), ports are picked at random
+and checked against the user table.
+"""
+
+import random
+import secrets
+import logging
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.redis import redis_client
+from app.models.user import User
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# KEYS: used bitmap, ready marker, building bitmap
+# ARGV: start byte, port count, range marker
+# Returns the bit offset, -1 if the range is exhausted, -2 if not ready
+ALLOCATE_SCRIPT = """
+if redis.call('GET', KEYS[2]) ~= ARGV[3] or redis.call('EXISTS', KEYS[1]) == 0 then
+    return -2
+end
+local bits = tonumber(ARGV[2])
+local last_byte = math.floor((bits - 1) / 8)
+local pos = redis.call('BITPOS', KEYS[1], 0, tonumber(ARGV[1]), last_byte)
+if pos < 0 or pos >= bits then
+    pos = redis.call('BITPOS', KEYS[1], 0, 0, last_byte)
+end
+if pos < 0 or pos >= bits then
+    return -1
+end
+redis.call('SETBIT', KEYS[1], pos, 1)
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('SETBIT', KEYS[3], pos, 1)
+end
+return pos
+"""
+
+# KEYS: used bitmap, building bitmap; ARGV: bit offset, value
+# Marks a port in the bitmap and in a running rebuild
+MARK_SCRIPT = """
+redis.call('SETBIT', KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[2]))
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('SETBIT', KEYS[2], tonumber(ARGV[1]), tonumber(ARGV[2]))
+end
+return 1
+"""
+
+# KEYS: used bitmap, rebuilt bitmap, building bitmap, ready marker
+# ARGV: range marker
+# Merges a rebuild into the bitmap; replaces it only if built for another range
+FINISH_SCRIPT = """
+if redis.call('GET', KEYS[4]) == ARGV[1] and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('BITOP', 'OR', KEYS[1], KEYS[1], KEYS[2], KEYS[3])
+else
+    redis.call('BITOP', 'OR', KEYS[1], KEYS[2], KEYS[3])
+end
+redis.call('DEL', KEYS[2], KEYS[3])
+redis.call('SET', KEYS[4], ARGV[1])
+return 1
+"""
+
+# KEYS: lock; ARGV: owner token
+# Releases the lock only if it is still ours (it may have expired meanwhile)
+UNLOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Random-pick attempts before giving up while the bitmap is not ready
+FALLBACK_ATTEMPTS = 20
+
+# Upper bound for one rebuild (seconds); the lock expires after it
+REBUILD_LOCK_TTL = 600
+
+
+class PortAllocator:
+    """Unique user port allocation backed by a Redis bitmap"""
+
+    USED_KEY = "ports:used"
+    READY_KEY = "ports:ready"
+    BUILDING_KEY = "ports:used:building"
+    LOCK_KEY = "ports:rebuild:lock"
+
+    @staticmethod
+    def _range() -> str:
+        """Ready-marker value for the configured range"""
+        return f"{settings.port_range_min}-{settings.port_range_max}"
+
+    @staticmethod
+    def _count() -> int:
+        """Number of ports in the configured range"""
+        return settings.port_range_max - settings.port_range_min + 1
+
+    @staticmethod
+    async def allocate(db: AsyncSession) -> Optional[int]:
+        """
+        Reserve a free port
+
+        The port is taken as soon as this returns; call release() if the
+        user is not created after all.
+
+        Args:
+            db: Database session (only used while the bitmap is not ready)
+
+        Returns:
+            Port number, or None if every port in the range is taken
+        """
+        count = PortAllocator._count()
+        if redis_client.redis:
+            try:
+                offset = await redis_client.eval_script(
+                    ALLOCATE_SCRIPT,
+                    [PortAllocator.USED_KEY, PortAllocator.READY_KEY, PortAllocator.BUILDING_KEY],
+                    [random.randrange((count + 7) // 8), count, PortAllocator._range()]
+                )
+                offset = int(offset)
+                if offset >= 0:
+                    return settings.port_range_min + offset
+                if offset == -1:
+                    return None
+            except Exception as e:
+                logger.error(f"Port allocation failed in Redis: {str(e)}")
+
+        # Bitmap not ready or Redis unavailable: random pick checked against the user table
+        for _ in range(FALLBACK_ATTEMPTS):
+            port = random.randint(settings.port_range_min, settings.port_range_max)
+            result = await db.execute(select(User.id).where(User.port == port).limit(1))
+            if result.scalar_one_or_none() is None:
+                await PortAllocator._mark(port, 1)
+                return port
+
+        logger.warning("Port allocation: no free port found by random probing")
+        return None
+
+    @staticmethod
+    async def release(port: int) -> None:
+        """
+        Return a port to the free pool
+
+        Args:
+            port: Port number
+        """
+        await PortAllocator._mark(port, 0)
+
+    @staticmethod
+    async def _mark(port: int, value: int) -> None:
+        """Set or clear a port's bit (best effort)"""
+        if not redis_client.redis:
+            return
+        if not settings.port_range_min <= port <= settings.port_range_max:
+            return
+        try:
+            await redis_client.eval_script(
+                MARK_SCRIPT,
+                [PortAllocator.USED_KEY, PortAllocator.BUILDING_KEY],
+                [port - settings.port_range_min, value]
+            )
+        except Exception as e:
+            logger.error(f"Failed to update port {port} in the bitmap: {str(e)}")
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, chunk_size: int = 10000) -> Optional[int]:
+        """
+        Rebuild the bitmap from the user table
+
+        Args:
+            db: Database session
+            chunk_size: Users per streamed chunk
+
+        Returns:
+            Number of ports marked as taken, or None if another worker
+            holds the rebuild lock
+        """
+        client = redis_client.binary
+        if client is None:
+            return 0
+
+        owner = secrets.token_hex(8)
+        if not await redis_client.set(PortAllocator.LOCK_KEY, owner, ex=REBUILD_LOCK_TTL, nx=True):
+            return None
+
+        try:
+            return await PortAllocator._rebuild(db, client, chunk_size)
+        finally:
+            try:
+                await redis_client.eval_script(UNLOCK_SCRIPT, [PortAllocator.LOCK_KEY], [owner])
+            except Exception as e:
+                logger.error(f"Failed to release the port rebuild lock: {str(e)}")
+
+    @staticmethod
+    async def _rebuild(db: AsyncSession, client, chunk_size: int) -> int:
+        """Stream the user table into a bitmap and merge it (caller holds the lock)"""
+        count = PortAllocator._count()
+        size = (count + 7) // 8
+        # Allocations from now on are also recorded in the building bitmap
+        await client.setbit(PortAllocator.BUILDING_KEY, size * 8 - 1, 0)
+
+        bitmap = bytearray(size)
+        # Padding bits past the range are never handed out
+        for offset in range(count, size * 8):
+            bitmap[offset >> 3] |= 0x80 >> (offset & 7)
+
+        taken = 0
+        result = await db.stream(
+            select(User.port)
+            .where(User.port.between(settings.port_range_min, settings.port_range_max))
+            .execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions(chunk_size):
+            for (port,) in rows:
+                # Redis bitmaps are big-endian within each byte
+                offset = port - settings.port_range_min
+                bitmap[offset >> 3] |= 0x80 >> (offset & 7)
+                taken += 1
+
+        tmp_key = PortAllocator.USED_KEY + ":tmp"
+        await client.set(tmp_key, bytes(bitmap))
+        await redis_client.eval_script(
+            FINISH_SCRIPT,
+            [PortAllocator.USED_KEY, tmp_key, PortAllocator.BUILDING_KEY, PortAllocator.READY_KEY],
+            [PortAllocator._range()]
+        )
+
+        return taken
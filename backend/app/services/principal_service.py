@@ -0,0 +1,198 @@
+"""
+Principal Service
+
+This module resolves an authenticated user ID to a slim, immutable
+UserPrincipal without querying the database on every request.
+
+Lookup order:
+1. in-process LRU (principal_lru_size entries per worker)
+2. Redis (principal:{user_id}, JSON, principal_cache_ttl seconds)
+3. database: one narrow SELECT of the principal columns
+
+Every entry carries the user version it was loaded under
+("<ver:user:{id}>:<ver:users>", see VersionService). Both version keys
+are read with one MGET per request and any mismatch is a miss, so a bump
+after a user row change invalidates the principal in every worker at once.
+Missing version keys are seeded with a fresh token, and LRU entries older
+than principal_lru_max_age are revalidated against Redis/the database, so
+a bump lost with Redis data cannot keep a stale principal alive forever.
+Without Redis nothing can be validated and every lookup reads the database.
+
+Endpoints that need columns outside the principal (traffic counters,
+balance, ...) or write to the row depend on get_current_user, which still
+loads the full ORM object.
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.redis import redis_client
+from app.models.user import User
+from app.services.version_service import VersionService
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """
+    Immutable snapshot of the fields needed to authorize a request
+
+    Mirrors the User attributes of the same name, so read-only endpoints
+    can use it wherever they only touch these fields.
+    """
+
+    id: int
+    email: str
+    user_name: str
+    is_admin: int
+    enable: int
+    class_level: int
+    node_group: int
+    expire_in: Optional[datetime]
+
+    @property
+    def is_enabled(self) -> bool:
+        """Check if user account is enabled"""
+        return self.enable == 1
+
+    @property
+    def is_admin_user(self) -> bool:
+        """Check if user is admin"""
+        return self.is_admin == 1
+
+    def to_dict(self) -> dict:
+        """JSON-serializable form (expire_in as ISO 8601)"""
+        data = asdict(self)
+        data["expire_in"] = self.expire_in.isoformat() if self.expire_in else None
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserPrincipal":
+        """Inverse of to_dict()"""
+        expire_in = data.get("expire_in")
+        return cls(**{**data, "expire_in": datetime.fromisoformat(expire_in) if expire_in else None})
+
+
+# Columns loaded for a principal (same order as the dataclass fields)
+PRINCIPAL_COLUMNS = (
+    User.id,
+    User.email,
+    User.user_name,
+    User.is_admin,
+    User.enable,
+    User.class_level,
+    User.node_group,
+    User.expire_in,
+)
+
+
+class PrincipalService:
+    """Cached user principals for authentication"""
+
+    KEY = "principal:{}"
+
+    # user_id -> (version, principal, time.monotonic() at insert), most recently used last
+    _lru: "OrderedDict[int, Tuple[str, UserPrincipal, float]]" = OrderedDict()
+
+    @staticmethod
+    def _remember(user_id: int, version: str, principal: UserPrincipal) -> None:
+        """Insert into the local LRU, evicting the least recently used entry"""
+        lru = PrincipalService._lru
+        lru[user_id] = (version, principal, time.monotonic())
+        lru.move_to_end(user_id)
+        if len(lru) > settings.principal_lru_size:
+            lru.popitem(last=False)
+
+    @staticmethod
+    async def _current_version(user_id: int) -> Optional[str]:
+        """Read "<user>:<users>" in one MGET (None if Redis is unavailable)"""
+        if not redis_client.redis:
+            return None
+        keys = (VersionService.USER_KEY.format(user_id), VersionService.USERS_KEY)
+        try:
+            values = await redis_client.mget(*keys)
+            if None in values:
+                values = await VersionService.seed_missing(keys, list(values))
+        except Exception as e:
+            logger.error(f"Failed to read principal version for user {user_id}: {str(e)}")
+            return None
+        return ":".join(values)
+
+    @staticmethod
+    async def load(db: AsyncSession, user_id: int) -> Optional[UserPrincipal]:
+        """
+        Load a principal from the database (no cache)
+
+        Args:
+            db: Database session
+            user_id: User ID
+
+        Returns:
+            UserPrincipal, or None if the user does not exist
+        """
+        result = await db.execute(select(*PRINCIPAL_COLUMNS).where(User.id == user_id))
+        row = result.one_or_none()
+        if row is None:
+            return None
+        return UserPrincipal(*row)
+
+    @staticmethod
+    async def get(db: AsyncSession, user_id: int) -> Optional[UserPrincipal]:
+        """
+        Get the principal for a user, using the version-validated caches
+
+        Args:
+            db: Database session
+            user_id: User ID
+
+        Returns:
+            UserPrincipal, or None if the user does not exist
+        """
+        version = await PrincipalService._current_version(user_id)
+        if version is None:
+            return await PrincipalService.load(db, user_id)
+
+        entry = PrincipalService._lru.get(user_id)
+        if (
+            entry is not None
+            and entry[0] == version
+            and time.monotonic() - entry[2] < settings.principal_lru_max_age
+        ):
+            PrincipalService._lru.move_to_end(user_id)
+            return entry[1]
+
+        key = PrincipalService.KEY.format(user_id)
+        try:
+            cached = await redis_client.json_get(key)
+        except Exception as e:
+            logger.error(f"Principal cache lookup failed for user {user_id}: {str(e)}")
+            cached = None
+        if cached is not None and cached.get("v") == version:
+            principal = UserPrincipal.from_dict(cached["p"])
+            PrincipalService._remember(user_id, version, principal)
+            return principal
+
+        # The version was read BEFORE loading: a change committed meanwhile
+        # bumps it again, so the entry stored here can only be too old, never
+        # stay valid with stale data
+        principal = await PrincipalService.load(db, user_id)
+        if principal is None:
+            return None
+
+        PrincipalService._remember(user_id, version, principal)
+        try:
+            await redis_client.json_set(
+                key, {"v": version, "p": principal.to_dict()}, ex=settings.principal_cache_ttl
+            )
+        except Exception as e:
+            logger.error(f"Principal cache store failed for user {user_id}: {str(e)}")
+        return principal
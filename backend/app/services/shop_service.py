@@ -10,6 +10,7 @@ Handles business logic for shop-related operations including:
 """
 
 import json
+import logging
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -19,6 +20,10 @@ from decimal import Decimal
 from app.models.user import User
 from app.models.shop import Shop, Bought
 from app.schemas.response import error_response
+from app.services.expiry_service import ExpiryService
+from app.services.version_service import VersionService
+
+logger = logging.getLogger(__name__)
 
 
 class ShopService:
@@ -224,6 +229,16 @@ class ShopService:
             # Commit transaction
             await db.commit()
 
+            # Class / expiry changed: invalidate cached subscriptions
+            await VersionService.bump_user(user.id)
+
+            # Reschedule the class expiration (best effort: the startup
+            # rebuild re-seeds the queue from the user table)
+            try:
+                await ExpiryService.schedule(user.id, class_expire=new_class_expire)
+            except Exception as e:
+                logger.error(f"Failed to schedule expiry for user {user.id}: {str(e)}")
+
             # Prepare result data
             result = {
                 "user_id": user.id,
@@ -0,0 +1,193 @@
+"""
+Subscription Access Statistics Service
+
+This module records subscription fetches in Redis at near-zero per-request
+cost and flushes them to the user table in bulk.
+
+Per fetch (one pipelined round trip, after the response is sent):
+- HINCRBY sub:stats:count {uid} 1          fetches since the last flush
+- PFADD   sub:stats:ips:{day}:{uid} {ip}   distinct IPs per stats day (HyperLogLog)
+- HSET    sub:stats:lastip {uid} {ip}      most recent source IP
+- HSET    sub:stats:day {uid} {day}        stats day of the most recent fetch
+- SADD    sub:stats:dirty {uid}            users to flush
+
+Flush (every sub_stats_flush_interval seconds):
+- the pending hashes/set are atomically renamed to *:flushing
+- PFCOUNT per dirty user of the stats day its fetches were recorded in
+  (pipelined), so a flush after the rollover still counts the closed day
+- one UPDATE ... SET rss_count = rss_count + CASE id ..., rss_ips_count = CASE id ...,
+  rss_ip = CASE id ... WHERE id IN (...) per chunk
+- on database failure the counts are merged back into the pending keys
+
+Column semantics: rss_count is cumulative, rss_ips_count is the distinct IP
+estimate (HLL, ~0.8% error) of the current stats day, rss_ip is the last
+source IP. A stats day starts at the DailyJob rollover (02:00 local), which
+copies the counters into rss_count_lastday / rss_ips_lastday.
+
+Delivery is at-least-once: a crash between the UPDATE and the cleanup
+re-applies that batch on the next flush.
+"""
+
+import time
+import logging
+from typing import Dict, Any, List
+from sqlalchemy import update, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.redis import redis_client
+from app.models.user import User
+from app.services.traffic_rollup_service import day_bucket
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+COUNT_KEY = "sub:stats:count"
+LASTIP_KEY = "sub:stats:lastip"
+DIRTY_KEY = "sub:stats:dirty"
+DAY_KEY = "sub:stats:day"
+IPS_KEY = "sub:stats:ips:{}:{}"
+FLUSHING = ":flushing"
+
+# DailyJob runs at 02:00 (see app/core/scheduler.py); stats days start there
+ROLLOVER_HOUR = 2
+
+# Move the pending keys aside; leftovers from an interrupted flush are kept
+TAKE_PENDING_SCRIPT = """
+if redis.call('EXISTS', KEYS[4]) == 1 then
+    return 1
+end
+if redis.call('EXISTS', KEYS[3]) == 0 then
+    return 0
+end
+redis.call('RENAME', KEYS[3], KEYS[4])
+if redis.call('EXISTS', KEYS[1]) == 1 then redis.call('RENAME', KEYS[1], KEYS[5]) end
+if redis.call('EXISTS', KEYS[2]) == 1 then redis.call('RENAME', KEYS[2], KEYS[6]) end
+if redis.call('EXISTS', KEYS[7]) == 1 then redis.call('RENAME', KEYS[7], KEYS[8]) end
+return 1
+"""
+
+
+def stats_day(timestamp: int) -> int:
+    """Return the start of the stats day (local ROLLOVER_HOUR) containing timestamp"""
+    return day_bucket(timestamp - ROLLOVER_HOUR * 3600)
+
+
+class SubStatsService:
+    """Buffered subscription access accounting"""
+
+    @staticmethod
+    async def record(user_id: int, ip: str) -> None:
+        """
+        Record one subscription fetch (best effort)
+
+        Args:
+            user_id: User ID
+            ip: Client IP address
+        """
+        if not redis_client.redis or not settings.enable_sub_stats:
+            return
+
+        day = stats_day(int(time.time()))
+        ips_key = IPS_KEY.format(day, user_id)
+        try:
+            pipe = redis_client.redis.pipeline(transaction=False)
+            pipe.hincrby(COUNT_KEY, user_id, 1)
+            if ip:
+                pipe.pfadd(ips_key, ip)
+                pipe.expire(ips_key, 2 * 86400)
+                pipe.hset(LASTIP_KEY, user_id, ip[:64])
+                pipe.hset(DAY_KEY, user_id, day)
+            pipe.sadd(DIRTY_KEY, user_id)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to record subscription fetch for user {user_id}: {str(e)}")
+
+    @staticmethod
+    async def flush(db: AsyncSession, chunk_size: int = 1000) -> Dict[str, Any]:
+        """
+        Write buffered statistics to the user table
+
+        Args:
+            db: Database session
+            chunk_size: Users per UPDATE statement
+
+        Returns:
+            Flush statistics (users, fetches)
+        """
+        stats = {"users": 0, "fetches": 0}
+        if not redis_client.redis:
+            return stats
+
+        keys = [
+            COUNT_KEY, LASTIP_KEY, DIRTY_KEY,
+            DIRTY_KEY + FLUSHING, COUNT_KEY + FLUSHING, LASTIP_KEY + FLUSHING,
+            DAY_KEY, DAY_KEY + FLUSHING
+        ]
+        if not await redis_client.eval_script(TAKE_PENDING_SCRIPT, keys, []):
+            return stats
+
+        pipe = redis_client.redis.pipeline(transaction=False)
+        pipe.smembers(DIRTY_KEY + FLUSHING)
+        pipe.hgetall(COUNT_KEY + FLUSHING)
+        pipe.hgetall(LASTIP_KEY + FLUSHING)
+        pipe.hgetall(DAY_KEY + FLUSHING)
+        dirty, counts, last_ips, days = await pipe.execute()
+
+        user_ids = sorted(int(uid) for uid in dirty)
+        # Count IPs of the day the fetches were recorded in, not the flush day
+        today = stats_day(int(time.time()))
+
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+
+            pipe = redis_client.redis.pipeline(transaction=False)
+            for uid in chunk:
+                pipe.pfcount(IPS_KEY.format(days.get(str(uid), today), uid))
+            ip_counts = dict(zip(chunk, await pipe.execute()))
+            chunk_counts = {uid: int(counts.get(str(uid), 0)) for uid in chunk}
+
+            values = {
+                "rss_count": User.rss_count + case(chunk_counts, value=User.id, else_=0),
+                "rss_ips_count": case(ip_counts, value=User.id, else_=User.rss_ips_count),
+            }
+            chunk_ips = {uid: last_ips[str(uid)] for uid in chunk if str(uid) in last_ips}
+            if chunk_ips:
+                values["rss_ip"] = case(chunk_ips, value=User.id, else_=User.rss_ip)
+
+            try:
+                await db.execute(update(User).where(User.id.in_(chunk)).values(**values))
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                await SubStatsService._restore(user_ids[start:], counts, last_ips, days)
+                raise
+
+            stats["users"] += len(chunk)
+            stats["fetches"] += sum(chunk_counts.values())
+
+        await redis_client.redis.delete(
+            DIRTY_KEY + FLUSHING, COUNT_KEY + FLUSHING, LASTIP_KEY + FLUSHING, DAY_KEY + FLUSHING
+        )
+        return stats
+
+    @staticmethod
+    async def _restore(
+        user_ids: List[int],
+        counts: Dict[str, str],
+        last_ips: Dict[str, str],
+        days: Dict[str, str]
+    ) -> None:
+        """Merge unflushed entries back into the pending keys"""
+        pipe = redis_client.redis.pipeline(transaction=False)
+        for uid in user_ids:
+            key = str(uid)
+            if key in counts:
+                pipe.hincrby(COUNT_KEY, key, int(counts[key]))
+            if key in last_ips:
+                pipe.hsetnx(LASTIP_KEY, key, last_ips[key])
+            if key in days:
+                pipe.hsetnx(DAY_KEY, key, days[key])
+            pipe.sadd(DIRTY_KEY, key)
+        pipe.delete(DIRTY_KEY + FLUSHING, COUNT_KEY + FLUSHING, LASTIP_KEY + FLUSHING, DAY_KEY + FLUSHING)
+        await pipe.execute()
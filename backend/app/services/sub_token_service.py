@@ -0,0 +1,285 @@
+"""
+Subscription Token Service
+
+This module issues random subscription tokens and resolves them to users
+in O(1) without touching the database on the request path.
+
+Storage:
+- link table (type = 11): durable token -> userid rows (one per user)
+- sub:tokens (Redis hash): token -> user_id, bulk-warmed at startup
+- in-process LRU: token -> user_id, bounded by sub_token_lru_size
+
+Once the warm-up finished (sub:tokens:ready exists), the Redis hash is
+authoritative: an unknown token is rejected without a database query, so
+guessing tokens cannot be used to load the database. A failed index write
+drops sub:tokens:ready (lookups fall back to the link table until the next
+warm-up), and GET /user/subscribe re-indexes the user's token.
+
+Requires migrations/003_subscription_tokens.sql (link token index and a
+token backfill for existing users).
+
+Resetting a token deletes the old row, removes it from Redis and publishes
+it on sub:tokens:revoked; every worker drops it from its LRU. Issuing and
+resetting lock the user row, so a user never ends up with two tokens.
+"""
+
+import secrets
+import logging
+from collections import OrderedDict
+from typing import List, Optional
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.redis import redis_client, pubsub_listener
+from app.models.link import Link
+from app.models.user import User
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class SubTokenService:
+    """Subscription token issue, resolve and revoke"""
+
+    LINK_TYPE = 11  # Subscription link type (same as the original SS-Panel)
+    TOKEN_HASH = "sub:tokens"
+    READY_KEY = "sub:tokens:ready"
+    REVOKE_CHANNEL = "sub:tokens:revoked"
+
+    # token -> user_id, most recently used last
+    _lru: "OrderedDict[str, int]" = OrderedDict()
+
+    @staticmethod
+    def generate_token() -> str:
+        """Generate a random, non-enumerable token (128 bits)"""
+        return secrets.token_hex(16)
+
+    @staticmethod
+    def _remember(token: str, user_id: int) -> None:
+        """Insert into the local LRU, evicting the least recently used entry"""
+        lru = SubTokenService._lru
+        lru[token] = user_id
+        lru.move_to_end(token)
+        if len(lru) > settings.sub_token_lru_size:
+            lru.popitem(last=False)
+
+    @staticmethod
+    async def _index(token: str, user_id: int) -> None:
+        """Add a token to the Redis hash (best effort)"""
+        try:
+            await redis_client.hset(SubTokenService.TOKEN_HASH, token, str(user_id))
+        except Exception as e:
+            logger.error(f"Failed to index subscription token for user {user_id}: {str(e)}")
+            # The hash is no longer complete: stop treating a miss as final
+            try:
+                await redis_client.delete(SubTokenService.READY_KEY)
+            except Exception as e:
+                logger.error(f"Failed to clear the subscription token ready marker: {str(e)}")
+
+    @staticmethod
+    async def _revoke(tokens: List[str]) -> None:
+        """Drop tokens from the local LRU, the Redis hash and every worker's LRU"""
+        for token in tokens:
+            SubTokenService._lru.pop(token, None)
+
+        try:
+            await redis_client.hdel(SubTokenService.TOKEN_HASH, *tokens)
+        except Exception as e:
+            logger.error(f"Failed to remove revoked subscription tokens from Redis: {str(e)}")
+
+        for token in tokens:
+            try:
+                await redis_client.publish(SubTokenService.REVOKE_CHANNEL, token)
+            except Exception as e:
+                logger.error(f"Failed to publish subscription token revocation: {str(e)}")
+
+    @staticmethod
+    async def _lock_user(db: AsyncSession, user_id: int) -> None:
+        """Lock the user row to serialize token issue/reset for this user"""
+        await db.execute(select(User.id).where(User.id == user_id).with_for_update())
+
+    @staticmethod
+    async def _select_tokens(db: AsyncSession, user_id: int) -> List[str]:
+        """Get the user's current subscription tokens"""
+        result = await db.execute(
+            select(Link.token)
+            .where(Link.userid == user_id, Link.type == SubTokenService.LINK_TYPE)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_or_create(db: AsyncSession, user_id: int) -> str:
+        """
+        Get the user's subscription token, creating one if needed
+
+        Args:
+            db: Database session
+            user_id: User ID
+
+        Returns:
+            Subscription token
+        """
+        tokens = await SubTokenService._select_tokens(db, user_id)
+        if tokens:
+            # Idempotent: repairs an index write that failed earlier
+            await SubTokenService._index(tokens[0], user_id)
+            return tokens[0]
+
+        # Re-check under the user row lock: a concurrent call may have won
+        await SubTokenService._lock_user(db, user_id)
+        tokens = await SubTokenService._select_tokens(db, user_id)
+        if tokens:
+            await db.commit()  # Release the lock
+            return tokens[0]
+
+        token = SubTokenService.generate_token()
+        db.add(Link(
+            type=SubTokenService.LINK_TYPE,
+            address="",
+            port=0,
+            token=token,
+            ios=0,
+            userid=user_id
+        ))
+        await db.commit()
+
+        await SubTokenService._index(token, user_id)
+        return token
+
+    @staticmethod
+    async def reset(db: AsyncSession, user_id: int) -> str:
+        """
+        Revoke the user's current token(s) and issue a new one
+
+        Args:
+            db: Database session
+            user_id: User ID
+
+        Returns:
+            New subscription token
+        """
+        await SubTokenService._lock_user(db, user_id)
+        old_tokens = await SubTokenService._select_tokens(db, user_id)
+
+        token = SubTokenService.generate_token()
+        await db.execute(
+            delete(Link)
+            .where(Link.userid == user_id, Link.type == SubTokenService.LINK_TYPE)
+        )
+        db.add(Link(
+            type=SubTokenService.LINK_TYPE,
+            address="",
+            port=0,
+            token=token,
+            ios=0,
+            userid=user_id
+        ))
+        await db.commit()
+
+        # Revoke first: a failing index write must not keep old tokens alive
+        if old_tokens:
+            await SubTokenService._revoke(old_tokens)
+        await SubTokenService._index(token, user_id)
+
+        return token
+
+    @staticmethod
+    async def resolve(db: AsyncSession, token: str) -> Optional[int]:
+        """
+        Resolve a subscription token to a user ID
+
+        Lookup order: local LRU, Redis hash, database (only while the
+        Redis index is not warm).
+
+        Args:
+            db: Database session
+            token: Subscription token
+
+        Returns:
+            User ID, or None if the token is unknown
+        """
+        user_id = SubTokenService._lru.get(token)
+        if user_id is not None:
+            SubTokenService._lru.move_to_end(token)
+            return user_id
+
+        try:
+            if redis_client.redis:
+                pipe = redis_client.redis.pipeline(transaction=False)
+                pipe.hget(SubTokenService.TOKEN_HASH, token)
+                pipe.exists(SubTokenService.READY_KEY)
+                cached, ready = await pipe.execute()
+                if cached is not None:
+                    SubTokenService._remember(token, int(cached))
+                    return int(cached)
+                if ready:
+                    return None
+        except Exception as e:
+            logger.error(f"Subscription token lookup failed in Redis: {str(e)}")
+
+        # Redis unavailable or not warmed yet: fall back to the link table
+        result = await db.execute(
+            select(Link.userid)
+            .where(Link.token == token, Link.type == SubTokenService.LINK_TYPE)
+            .limit(1)
+        )
+        user_id = result.scalar_one_or_none()
+        if user_id is None:
+            return None
+
+        user_id = int(user_id)
+        SubTokenService._remember(token, user_id)
+        await SubTokenService._index(token, user_id)
+        return user_id
+
+    @staticmethod
+    async def warm(db: AsyncSession, chunk_size: int = 5000) -> int:
+        """
+        Load every subscription token into the Redis hash
+
+        Streams the link table in chunks and writes each chunk with one
+        HSET, then marks the index as authoritative.
+
+        Args:
+            db: Database session
+            chunk_size: Rows per chunk
+
+        Returns:
+            Number of tokens loaded
+        """
+        if not redis_client.redis:
+            return 0
+
+        loaded = 0
+        result = await db.stream(
+            select(Link.token, Link.userid)
+            .where(Link.type == SubTokenService.LINK_TYPE)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions(chunk_size):
+            await redis_client.redis.hset(
+                SubTokenService.TOKEN_HASH,
+                mapping={token: str(userid) for token, userid in rows}
+            )
+            loaded += len(rows)
+
+        await redis_client.set(SubTokenService.READY_KEY, "1")
+        return loaded
+
+    @staticmethod
+    async def _on_revoked(token: str) -> None:
+        """Pub/sub handler: drop a revoked token from the local LRU"""
+        SubTokenService._lru.pop(token, None)
+
+    @staticmethod
+    async def _on_resync() -> None:
+        """Revocations may have been missed while disconnected: start cold"""
+        SubTokenService._lru.clear()
+
+
+pubsub_listener.register(
+    SubTokenService.REVOKE_CHANNEL,
+    SubTokenService._on_revoked,
+    on_resync=SubTokenService._on_resync
+)
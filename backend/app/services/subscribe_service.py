@@ -5,25 +5,36 @@ This module handles subscription link generation for different protocols.
 Compatible with original SS-Panel subscription format.
 """
 
+import json
 import base64
 import uuid
-from typing import List
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
 from app.models.user import User
 from app.models.node import Node
-from app.utils.node_utils import get_node_type_name, check_node_online
+from app.services.node_index import node_index
+from app.services.link_templates import UserLinkParts, render_link
+from app.services.client_config import user_values
+from app.utils.node_utils import check_node_online
 
 
 class SubscriptionService:
     """
     Subscription Link Generation Service
 
-    Generates subscription content for different client protocols:
+    Generates subscription content for different client protocols.
+    Subscriptions are rendered from precompiled per-node templates
+    (app.services.link_templates); the generate_*_link methods below are
+    the reference implementations those templates must match byte for byte.
+
+    Protocols:
     - SS (Shadowsocks)
     - SSR (ShadowsocksR)
     - VMess (V2Ray)
     - Trojan
+
+    Structured client configurations (Clash, sing-box) are rendered from
+    compiled per-(class, group) documents (app.services.client_config).
     """
 
     @staticmethod
@@ -34,6 +45,9 @@ class SubscriptionService:
         """
         Get available nodes for user based on level and group
 
+        Served from the in-process node index; ss_node is only queried
+        when the index is rebuilt.
+
         Args:
             db: Database session
             user: User object
@@ -41,16 +55,8 @@ class SubscriptionService:
         Returns:
             List of available nodes
         """
-        result = await db.execute(
-            select(Node).where(
-                and_(
-                    Node.type != 0,  # Visible nodes only
-                    Node.node_class <= user.class_level,
-                    (user.node_group == 0) | (Node.node_group == user.node_group)
-                )
-            ).order_by(Node.node_sort)
-        )
-        return result.scalars().all()
+        snapshot = await node_index.get(db)
+        return list(snapshot.visible(user.class_level, user.node_group))
 
     @staticmethod
     def generate_ss_link(node: Node, user: User) -> str:
@@ -132,8 +138,6 @@ class SubscriptionService:
         Returns:
             VMess link string
         """
-        import json
-
         config = {
             "v": "2",
             "ps": node.name,
@@ -176,6 +180,37 @@ class SubscriptionService:
         link = f"trojan://{password}@{server}:{port}?peer={server}#{name}"
         return link
 
+    @staticmethod
+    async def _render_links(
+        db: AsyncSession,
+        user: User,
+        subtype: Optional[str] = None
+    ) -> List[str]:
+        """
+        Render links for the user's visible nodes from precompiled templates
+
+        Args:
+            db: Database session
+            user: User object
+            subtype: Only render nodes of this type (None = all types)
+
+        Returns:
+            List of link strings in node_sort order
+        """
+        snapshot = await node_index.get(db)
+        parts = UserLinkParts(user)
+        links = []
+
+        for node in snapshot.visible(user.class_level, user.node_group):
+            template = snapshot.templates[node.id]
+            if subtype is not None and template.node_type != subtype:
+                continue
+            link = render_link(template, parts)
+            if link is not None:
+                links.append(link)
+
+        return links
+
     @staticmethod
     async def generate_subscription(
         db: AsyncSession,
@@ -193,21 +228,8 @@ class SubscriptionService:
         Returns:
             Subscription content (Base64 encoded or plain text)
         """
-        nodes = await SubscriptionService.get_user_nodes(db, user)
-        links = []
-
-        for node in nodes:
-            node_type = get_node_type_name(node.sort)
-
-            # Match node type with requested subscription type
-            if subtype == "ss" and node_type == "ss":
-                links.append(SubscriptionService.generate_ss_link(node, user))
-            elif subtype == "ssr" and node_type == "ssr":
-                links.append(SubscriptionService.generate_ssr_link(node, user))
-            elif subtype == "vmess" and node_type == "vmess":
-                links.append(SubscriptionService.generate_vmess_link(node, user))
-            elif subtype == "trojan" and node_type == "trojan":
-                links.append(SubscriptionService.generate_trojan_link(node, user))
+        # Match node type with requested subscription type
+        links = await SubscriptionService._render_links(db, user, subtype)
 
         # Join links with newlines and Base64 encode
         content = "\n".join(links)
@@ -230,24 +252,31 @@ class SubscriptionService:
         Returns:
             Subscription content with all supported protocols
         """
-        nodes = await SubscriptionService.get_user_nodes(db, user)
-        links = []
-
-        for node in nodes:
-            node_type = get_node_type_name(node.sort)
-
-            # Generate appropriate link based on node type
-            if node_type == "ss":
-                links.append(SubscriptionService.generate_ss_link(node, user))
-            elif node_type == "ssr":
-                links.append(SubscriptionService.generate_ssr_link(node, user))
-            elif node_type == "vmess":
-                links.append(SubscriptionService.generate_vmess_link(node, user))
-            elif node_type == "trojan":
-                links.append(SubscriptionService.generate_trojan_link(node, user))
+        links = await SubscriptionService._render_links(db, user)
 
         # Join and encode
         content = "\n".join(links)
         encoded_content = base64.b64encode(content.encode()).decode()
 
         return encoded_content
+
+    @staticmethod
+    async def generate_client_config(
+        db: AsyncSession,
+        user: User,
+        fmt: str
+    ) -> str:
+        """
+        Generate a structured client configuration
+
+        Args:
+            db: Database session
+            user: User object
+            fmt: Client format (clash, singbox)
+
+        Returns:
+            Configuration document (YAML or JSON)
+        """
+        snapshot = await node_index.get(db)
+        template = snapshot.client_config(fmt, user.class_level, user.node_group)
+        return template.render(user_values(user))
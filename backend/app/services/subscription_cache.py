@@ -0,0 +1,212 @@
+"""
+Subscription Cache
+
+This module caches the final rendered subscription body per (user, subtype)
+in Redis, validated by content versions (see VersionService), stored
+pre-compressed so hits are served without any per-request compression:
+
+    sub:cache:{user_id}:{subtype} (hash)
+        v          "<user>:<users>:<nodes>" versions the body was rendered for
+        userinfo   Subscription-Userinfo header value
+        expire_at  account expiration (Unix timestamp), re-checked on every hit
+        identity   raw body
+        gzip       gzip-compressed body
+        br         brotli-compressed body (only if the brotli package is installed)
+
+A lookup is one pipelined round trip: MGET of the three version keys plus
+HMGET of the metadata and the ONE body variant the client accepts. An entry
+is served only if its stored versions match the current ones; any bump of
+the user's version, the global user epoch or the node-set version makes it
+a miss. Bodies are binary, so the cache uses redis_client.binary.
+
+The Subscription-Userinfo header (traffic counters) is cached with the body,
+so it may lag behind by up to sub_cache_ttl seconds.
+"""
+
+import gzip
+import logging
+from typing import Optional, Dict, Any, Tuple
+
+from app.db.redis import redis_client
+from app.services.version_service import VersionService
+from app.core.config import get_settings
+
+try:
+    import brotli
+except ImportError:  # Declared in pyproject.toml; serve gzip only if it is missing
+    brotli = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Only these subtypes are cached (arbitrary query values must not create keys)
+CACHEABLE_SUBTYPES = frozenset({"ss", "ssr", "vmess", "trojan", "auto", "clash", "singbox"})
+
+# Content codings stored next to the raw body, in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Bodies are compressed once per version, so favour ratio over speed
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+
+def compress_body(body: bytes) -> Dict[str, bytes]:
+    """
+    Encode a body in every stored content coding
+
+    Args:
+        body: Raw body
+
+    Returns:
+        Mapping of coding name (identity, gzip, br) to bytes
+    """
+    # mtime=0 keeps the gzip output deterministic for identical bodies
+    bodies = {
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+    }
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return bodies
+
+
+class SubscriptionCache:
+    """Version-validated, pre-compressed cache of rendered subscription bodies"""
+
+    KEY = "sub:cache:{}:{}"
+
+    @staticmethod
+    async def lookup(
+        user_id: int,
+        subtype: str,
+        encoding: str = "identity"
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Look up a cached subscription render
+
+        Args:
+            user_id: User ID
+            subtype: Subscription type
+            encoding: Content coding to fetch (identity, gzip, br)
+
+        Returns:
+            Tuple of (cached entry or None if missing/stale, current version string).
+            The entry has body (bytes in the requested coding), userinfo and expire_at.
+            Pass the version string to store() after rendering on a miss.
+        """
+        client = redis_client.binary
+        if not settings.enable_sub_cache or subtype not in CACHEABLE_SUBTYPES or client is None:
+            return None, ""
+
+        version_keys = (
+            VersionService.USER_KEY.format(user_id),
+            VersionService.USERS_KEY,
+            VersionService.NODES_KEY,
+        )
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.mget(*version_keys)
+            pipe.hmget(SubscriptionCache.KEY.format(user_id, subtype), "v", "userinfo", "expire_at", encoding)
+            versions, (stored_version, userinfo, expire_at, body) = await pipe.execute()
+
+            versions = [value.decode() if value is not None else None for value in versions]
+            if None in versions:
+                # Never derive a version from a constant: it would repeat after data loss
+                versions = await VersionService.seed_missing(version_keys, versions)
+        except Exception as e:
+            logger.error(f"Subscription cache lookup failed for user {user_id}: {str(e)}")
+            return None, ""
+
+        version = ":".join(versions)
+        if stored_version is None or stored_version.decode() != version or body is None:
+            return None, version
+
+        entry = {
+            "body": body,
+            "userinfo": userinfo.decode(),
+            "expire_at": float(expire_at),
+        }
+        return entry, version
+
+    @staticmethod
+    async def lookup_stale(
+        user_id: int,
+        subtype: str,
+        encoding: str = "identity"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the last stored render, even if its versions are outdated
+
+        Used to answer rate-limited clients without rendering.
+
+        Args:
+            user_id: User ID
+            subtype: Subscription type
+            encoding: Content coding to fetch (identity, gzip, br)
+
+        Returns:
+            Entry with body, userinfo, expire_at and the version it was
+            rendered for, or None if nothing is stored
+        """
+        client = redis_client.binary
+        if subtype not in CACHEABLE_SUBTYPES or client is None:
+            return None
+
+        try:
+            stored_version, userinfo, expire_at, body = await client.hmget(
+                SubscriptionCache.KEY.format(user_id, subtype), "v", "userinfo", "expire_at", encoding
+            )
+        except Exception as e:
+            logger.error(f"Subscription cache stale lookup failed for user {user_id}: {str(e)}")
+            return None
+
+        if stored_version is None or body is None:
+            return None
+
+        return {
+            "body": body,
+            "userinfo": userinfo.decode(),
+            "expire_at": float(expire_at),
+            "version": stored_version.decode(),
+        }
+
+    @staticmethod
+    async def store(
+        user_id: int,
+        subtype: str,
+        version: str,
+        bodies: Dict[str, bytes],
+        userinfo: str,
+        expire_at: float
+    ) -> None:
+        """
+        Store a rendered subscription in every content coding
+
+        Args:
+            user_id: User ID
+            subtype: Subscription type
+            version: Version string returned by lookup() BEFORE rendering
+            bodies: Output of compress_body()
+            userinfo: Subscription-Userinfo header value
+            expire_at: Account expiration (Unix timestamp), re-checked on every hit
+        """
+        client = redis_client.binary
+        if not version or client is None:
+            return
+
+        key = SubscriptionCache.KEY.format(user_id, subtype)
+        mapping = {
+            "v": version,
+            "userinfo": userinfo,
+            "expire_at": str(expire_at),
+            **bodies,
+        }
+        try:
+            pipe = client.pipeline(transaction=True)
+            # Replace the whole hash so stale codings never survive a re-render
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, settings.sub_cache_ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Subscription cache store failed for user {user_id}: {str(e)}")
@@ -6,6 +6,11 @@ This module contains all scheduled task implementations:
 - HourlyJob: Hourly checks
 - CheckJob: Periodic validations
 - DbClean: Database cleanup
+- TrafficRollup: Incremental hourly/daily traffic summaries
+- Expiry: Near-real-time class expirations
+- SubTokenWarm: Subscription token index warm-up at startup
+- PortRebuild: Free-port bitmap rebuild at startup
+- SubStatsFlush: Buffered subscription access statistics
 
 All tasks follow these principles:
 1. Atomic database operations
@@ -19,15 +24,22 @@ import logging
 from typing import Optional
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete, and_, or_, func
+from sqlalchemy import select, update, delete, and_, or_, func, case
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.db.session import get_db
+from app.db.session import AsyncSessionLocal
 from app.db.redis import redis_client
 from app.models.user import User
 from app.models.node import Node
 from app.models.paylist import Paylist, Payback, Code
 from app.models.traffic_log import TrafficLog
+from app.services.traffic_purge_service import TrafficLogPurger
+from app.services.traffic_rollup_service import TrafficRollupService
+from app.services.expiry_service import ExpiryService
+from app.services.version_service import VersionService
+from app.services.sub_token_service import SubTokenService
+from app.services.sub_stats_service import SubStatsService
+from app.services.port_allocator import PortAllocator
 from app.core.config import get_settings
 
 settings = get_settings()
@@ -55,7 +67,7 @@ async def daily_job():
     logger.info("=" * 60)
 
     try:
-        async with get_db() as db:
+        async with AsyncSessionLocal() as db:
             # Task 1: Traffic reset for expired renew_time
             await _daily_traffic_reset(db)
             logger.info("✓ Traffic reset completed")
@@ -77,8 +89,11 @@ async def daily_job():
             logger.info("✓ Daily statistics reset completed")
 
             # Task 6: Reset expired user class
-            await _reset_expired_user_class(db)
-            logger.info("✓ Expired user class reset completed")
+            # The expiry queue handles this in near-real-time; the full scan
+            # is only a fallback when the queue is disabled
+            if not settings.enable_expiry_queue:
+                await _reset_expired_user_class(db)
+                logger.info("✓ Expired user class reset completed")
 
         logger.info("=" * 60)
         logger.info("DailyJob completed successfully")
@@ -136,6 +151,8 @@ async def _daily_traffic_reset(db: AsyncSession):
         reset_count += 1
 
     await db.commit()
+    if reset_count:
+        await VersionService.bump_user_list()
     logger.info(f"Reset traffic for {reset_count} users")
 
 
@@ -161,6 +178,9 @@ async def _check_node_heartbeat(db: AsyncSession):
     affected_rows = result.rowcount
     await db.commit()
 
+    if affected_rows:
+        await VersionService.bump_nodes()
+
     logger.info(f"Marked {affected_rows} nodes as faulty (no heartbeat)")
 
 
@@ -175,6 +195,7 @@ async def _disable_daily_overused_users(db: AsyncSession):
     traffic_limit = 32 * 1024**3  # 32GB
 
     disabled_count = 0
+    disabled_ids = []
 
     # Check groups 2-5
     for group in range(2, 6):
@@ -216,6 +237,7 @@ async def _disable_daily_overused_users(db: AsyncSession):
                         )
                     )
                     disabled_count += 1
+                    disabled_ids.append(user.id)
                     logger.warning(f"Disabled user {user.id} for daily traffic overuse: "
                                  f"{today_usage / 1024**3:.2f}GB")
 
@@ -227,6 +249,7 @@ async def _disable_daily_overused_users(db: AsyncSession):
             )
 
     await db.commit()
+    await VersionService.bump_user(*disabled_ids)
     logger.info(f"Disabled {disabled_count} users for daily traffic overuse")
 
 
@@ -263,54 +286,50 @@ async def _disable_unused_users(db: AsyncSession):
     affected_rows = result.rowcount
     await db.commit()
 
+    if affected_rows:
+        await VersionService.bump_all_users()
+
     logger.info(f"Disabled {affected_rows} unused users (32+ days)")
 
 
 async def _reset_daily_statistics(db: AsyncSession):
     """
-    Reset daily statistics for all active users
+    Reset daily statistics for all active users (one set-based UPDATE)
 
     - last_day_t = d (only download traffic)
     - rss_count_lastday = rss_count
-    - rss_ips_lastday = rss_ips_count
+    - rss_ips_lastday = rss_ips_count, then rss_ips_count = 0 (new stats day)
     """
     check_time = int(time.time()) - 48 * 3600  # 48 hours ago
-    total_processed = 0
 
-    # Process by node_group to reduce memory usage
-    for group in range(1, 9):
-        result = await db.execute(
-            select(User)
-            .where(
-                and_(
-                    User.enable > 0,
-                    User.class_level > 0,
-                    User.t > check_time,
-                    User.node_group == group
-                )
-            )
-        )
-        users = result.scalars().all()
+    # Pending subscription fetches belong to the day being closed
+    if settings.enable_sub_stats:
+        try:
+            await SubStatsService.flush(db)
+        except Exception as e:
+            logger.error(f"Subscription stats flush before reset failed: {str(e)}")
 
-        group_count = 0
-        for user in users:
-            # Update statistics
-            await db.execute(
-                update(User)
-                .where(User.id == user.id)
-                .values(
-                    last_day_t=user.d,  # Only record d, not u
-                    rss_count_lastday=user.rss_count,
-                    rss_ips_lastday=user.rss_ips_count
-                )
+    # SET expressions read the pre-update row values, so the copies are consistent
+    result = await db.execute(
+        update(User)
+        .where(
+            and_(
+                User.enable > 0,
+                User.class_level > 0,
+                User.t > check_time,
+                User.node_group.between(1, 8)
             )
-            group_count += 1
-            total_processed += 1
-
-        await db.commit()
-        logger.info(f"  Group {group}: processed {group_count} users")
+        )
+        .values(
+            last_day_t=User.d,  # Only record d, not u
+            rss_count_lastday=User.rss_count,
+            rss_ips_lastday=User.rss_ips_count,
+            rss_ips_count=0
+        )
+    )
+    await db.commit()
 
-    logger.info(f"Total statistics reset: {total_processed} users")
+    logger.info(f"Total statistics reset: {result.rowcount} users")
 
 
 async def _reset_expired_user_class(db: AsyncSession):
@@ -333,6 +352,9 @@ async def _reset_expired_user_class(db: AsyncSession):
     affected_rows = result.rowcount
     await db.commit()
 
+    if affected_rows:
+        await VersionService.bump_all_users()
+
     logger.info(f"Reset class for {affected_rows} expired users")
 
 
@@ -351,7 +373,7 @@ async def hourly_job():
     logger.info("HourlyJob started")
 
     try:
-        async with get_db() as db:
+        async with AsyncSessionLocal() as db:
             # Task 1: Disable hourly overused users
             await _disable_hourly_overused_users(db)
             logger.info("✓ Hourly overused users check completed")
@@ -377,6 +399,7 @@ async def _disable_hourly_overused_users(db: AsyncSession):
     time_window = int(time.time()) - 3600  # 1 hour ago
 
     disabled_count = 0
+    disabled_ids = []
 
     # Check groups 2-3
     for group in [2, 3]:
@@ -416,6 +439,7 @@ async def _disable_hourly_overused_users(db: AsyncSession):
                         )
                     )
                     disabled_count += 1
+                    disabled_ids.append(user.id)
                     logger.warning(f"Disabled user {user.id} for hourly traffic overuse: "
                                  f"{hour_usage / 1024**3:.2f}GB")
 
@@ -427,6 +451,7 @@ async def _disable_hourly_overused_users(db: AsyncSession):
             )
 
     await db.commit()
+    await VersionService.bump_user(*disabled_ids)
     logger.info(f"Disabled {disabled_count} users for hourly traffic overuse")
 
 
@@ -470,7 +495,7 @@ async def check_job():
     logger.info("CheckJob started")
 
     try:
-        async with get_db() as db:
+        async with AsyncSessionLocal() as db:
             # Task 1: Clean expired IP records
             await _clean_expired_ips(db)
             logger.info("✓ Expired IP cleanup completed")
@@ -501,6 +526,32 @@ async def _clean_expired_ips(db: AsyncSession):
     logger.info("IP cleanup: Placeholder (models not implemented yet)")
 
 
+async def _iter_user_id_chunks(db: AsyncSession, criteria, chunk_size: int = 1000):
+    """
+    Stream ids of users matching criteria in fixed-size chunks
+
+    Used for logging only: rows are not locked, the following set-based
+    UPDATE repeats the criteria itself. Memory use stays constant
+    regardless of how many users match.
+
+    Args:
+        db: Database session
+        criteria: SQLAlchemy boolean expression
+        chunk_size: Number of ids per yielded chunk
+
+    Yields:
+        Lists of user ids
+    """
+    result = await db.stream_scalars(
+        select(User.id)
+        .where(criteria)
+        .order_by(User.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    async for chunk in result.partitions(chunk_size):
+        yield chunk
+
+
 async def _delete_expired_users(db: AsyncSession):
     """
     Delete expired users based on 4 conditions
@@ -509,43 +560,40 @@ async def _delete_expired_users(db: AsyncSession):
     Condition 2: Class 0 + no checkin for 32 days
     Condition 3: Class 0 + no usage for 7 days
     Condition 4: Never used (t=0,u=0,d=0) + 14 days + class=0 + money<=1
-    """
-    deleted_count = 0
 
+    Implemented as a set-based sweep: affected ids are streamed for logging,
+    then a single predicate UPDATE disables them.
+    """
     # Condition 4: Never used users
     reg_threshold = datetime.now() - timedelta(days=14)
 
-    result = await db.execute(
-        select(User)
-        .where(
-            and_(
-                User.t == 0,
-                User.u == 0,
-                User.d == 0,
-                User.reg_date < reg_threshold,
-                User.class_level == 0,
-                User.money <= 1
-            )
-        )
+    criteria = and_(
+        User.enable == 1,
+        User.t == 0,
+        User.u == 0,
+        User.d == 0,
+        User.reg_date < reg_threshold,
+        User.class_level == 0,
+        User.money <= 1
     )
-    users = result.scalars().all()
 
-    for user in users:
-        # TODO: Implement referral commission recovery
-        # For now, just log
-        logger.warning(f"Would delete never-used user {user.id}")
+    # TODO: Implement referral commission recovery
+    # Note: We don't actually delete users in this implementation
+    # Instead, we disable them
+    async for user_ids in _iter_user_id_chunks(db, criteria):
+        logger.warning(f"Would delete never-used users: {user_ids}")
 
-        # Note: We don't actually delete users in this implementation
-        # Instead, we disable them
-        await db.execute(
-            update(User)
-            .where(User.id == user.id)
-            .values(enable=0)
-        )
-        deleted_count += 1
+    result = await db.execute(
+        update(User)
+        .where(criteria)
+        .values(enable=0)
+    )
 
+    disabled_count = result.rowcount
     await db.commit()
-    logger.info(f"Disabled {deleted_count} never-used users")
+    if disabled_count:
+        await VersionService.bump_all_users()
+    logger.info(f"Disabled {disabled_count} never-used users")
 
 
 async def _disable_negative_balance_users(db: AsyncSession):
@@ -557,43 +605,39 @@ async def _disable_negative_balance_users(db: AsyncSession):
     - ban_times += class
     - node_group -= 1 (if > 1)
     - score -= 1
+
+    Implemented as a single set-based UPDATE; affected ids are
+    streamed beforehand for logging.
     """
-    result = await db.execute(
-        select(User)
-        .where(
-            and_(
-                User.money < 0,
-                User.enable == 1
-            )
-        )
+    criteria = and_(
+        User.money < 0,
+        User.enable == 1
     )
-    users = result.scalars().all()
 
-    disabled_count = 0
-    for user in users:
-        await db.execute(
-            update(User)
-            .where(User.id == user.id)
-            .values(
-                enable=0,
-                warming=f'{datetime.now().strftime("%Y%m%d %H:%M:%S")} '
-                       f'账号余额异常，系统启用账号保护。请检查您的余额',
-                ban_times=User.ban_times + User.class_level,
-                score=User.score - 1
-            )
-        )
+    async for user_ids in _iter_user_id_chunks(db, criteria):
+        logger.warning(f"Disabling negative balance users: {user_ids}")
 
-        # Downgrade node group if > 1
-        if user.node_group > 1:
-            await db.execute(
-                update(User)
-                .where(User.id == user.id)
-                .values(node_group=User.node_group - 1)
+    result = await db.execute(
+        update(User)
+        .where(criteria)
+        .values(
+            enable=0,
+            warming=f'{datetime.now().strftime("%Y%m%d %H:%M:%S")} '
+                   f'账号余额异常，系统启用账号保护。请检查您的余额',
+            ban_times=User.ban_times + User.class_level,
+            score=User.score - 1,
+            # Downgrade node group if > 1
+            node_group=case(
+                (User.node_group > 1, User.node_group - 1),
+                else_=User.node_group
             )
+        )
+    )
 
-        disabled_count += 1
-
+    disabled_count = result.rowcount
     await db.commit()
+    if disabled_count:
+        await VersionService.bump_all_users()
     logger.info(f"Disabled {disabled_count} negative balance users")
 
 
@@ -606,21 +650,172 @@ async def db_clean_job():
     Database Clean Job - Executed weekly on Sunday at 04:00
 
     Tasks:
-    1. Clean traffic logs older than 3 days
-    2. Clean node online logs older than 3 days
+    1. Clean traffic logs older than traffic_log_retention_days (chunked purge)
+    2. Clean hourly traffic rollups older than traffic_rollup_hourly_retention_days
+    3. Clean node online logs older than 3 days
     """
     logger.info("DbClean started")
 
     try:
-        async with get_db() as db:
-            # Clean traffic logs older than 3 days
-            threshold = int(time.time()) - 3 * 86400  # 3 days ago
+        async with AsyncSessionLocal() as db:
+            # Task 1: Chunked purge of expired traffic logs
+            threshold = int(time.time()) - settings.traffic_log_retention_days * 86400
+
+            # Never purge logs that have not been folded into the rollups yet
+            max_id = None
+            if settings.enable_traffic_rollup:
+                max_id = await TrafficRollupService.get_watermark(db)
+
+            stats = await TrafficLogPurger(db).purge(before=threshold, max_id=max_id)
+            logger.info(
+                f"✓ Traffic log purge: {stats['rows_deleted']} rows in {stats['chunks']} chunks, "
+                f"{stats['partitions_dropped']} partitions dropped, "
+                f"{'completed' if stats['completed'] else 'interrupted'} at id {stats['last_id']}"
+            )
+
+            # Task 2: Prune old hourly rollups (daily rollups are kept)
+            if settings.enable_traffic_rollup:
+                hourly_threshold = int(time.time()) - settings.traffic_rollup_hourly_retention_days * 86400
+                pruned = await TrafficRollupService.prune_hourly(db, hourly_threshold)
+                logger.info(f"✓ Pruned {pruned} hourly traffic rollup rows")
 
-            # Note: TrafficLog, NodeOnlineLog models may not exist yet
+            # Note: NodeOnlineLog model may not exist yet
             # This is a placeholder
-            logger.info("DbClean: Placeholder (log models not implemented yet)")
+            logger.info("DbClean: Node online log cleanup placeholder (model not implemented yet)")
 
         logger.info("DbClean completed successfully")
 
     except Exception as e:
         logger.error(f"DbClean failed: {str(e)}", exc_info=True)
+
+
+# ============================================================================
+# TrafficRollup - Every 5 minutes
+# ============================================================================
+
+async def traffic_rollup_job():
+    """
+    Traffic Rollup Job - Executed every 5 minutes
+
+    Folds new user_traffic_log rows (id > watermark) into the
+    user_traffic_hourly and user_traffic_daily summary tables.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            stats = await TrafficRollupService.run(db)
+
+        if stats["batches"]:
+            logger.info(
+                f"TrafficRollup: folded logs {stats['start_id']} → {stats['last_id']} "
+                f"in {stats['batches']} batches"
+            )
+
+    except Exception as e:
+        logger.error(f"TrafficRollup failed: {str(e)}", exc_info=True)
+
+
+# ============================================================================
+# Expiry - Every expiry_poll_interval seconds
+# ============================================================================
+
+async def expiry_job():
+    """
+    Expiry Job - Executed every expiry_poll_interval seconds
+
+    Pops only the due entries from the class expiry queue and resets
+    those users' class in batches.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            stats = await ExpiryService.process_due(db)
+
+        if stats["class"]:
+            logger.info(f"Expiry: reset class for {stats['class']} class-expired users")
+
+    except Exception as e:
+        logger.error(f"Expiry job failed: {str(e)}", exc_info=True)
+
+
+async def expiry_rebuild_job():
+    """
+    Expiry Rebuild Job - Executed once at startup
+
+    Re-seeds the class expiry queue from the user table.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            scheduled = await ExpiryService.rebuild(db)
+
+        logger.info(f"Expiry: rebuilt queue for {scheduled} users")
+
+    except Exception as e:
+        logger.error(f"Expiry rebuild failed: {str(e)}", exc_info=True)
+
+
+# ============================================================================
+# SubTokenWarm - Once at startup
+# ============================================================================
+
+async def sub_token_warm_job():
+    """
+    Subscription Token Warm Job - Executed once at startup
+
+    Loads every subscription token from the link table into the
+    Redis token index so lookups never fall back to the database.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            loaded = await SubTokenService.warm(db)
+
+        logger.info(f"SubTokenWarm: loaded {loaded} subscription tokens")
+
+    except Exception as e:
+        logger.error(f"SubTokenWarm failed: {str(e)}", exc_info=True)
+
+
+# ============================================================================
+# PortRebuild - Once at startup
+# ============================================================================
+
+async def port_rebuild_job():
+    """
+    Port Bitmap Rebuild Job - Executed once at startup
+
+    Rebuilds the free-port bitmap used for registration from the
+    user table (see PortAllocator).
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            taken = await PortAllocator.rebuild(db)
+
+        if taken is None:
+            logger.info("PortRebuild: skipped, another worker is rebuilding")
+        else:
+            logger.info(f"PortRebuild: {taken} ports in use")
+
+    except Exception as e:
+        logger.error(f"PortRebuild failed: {str(e)}", exc_info=True)
+
+
+# ============================================================================
+# SubStatsFlush - Every sub_stats_flush_interval seconds
+# ============================================================================
+
+async def sub_stats_flush_job():
+    """
+    Subscription Statistics Flush Job
+
+    Writes the buffered fetch counters and distinct-IP estimates from
+    Redis to the user table (rss_count, rss_ips_count, rss_ip).
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            stats = await SubStatsService.flush(db)
+
+        if stats["users"]:
+            logger.info(
+                f"SubStatsFlush: {stats['fetches']} fetches for {stats['users']} users"
+            )
+
+    except Exception as e:
+        logger.error(f"SubStatsFlush failed: {str(e)}", exc_info=True)
@@ -0,0 +1,142 @@
+"""
+Token Blacklist
+
+This module keeps revoked JWT IDs (jti) in Redis and mirrors them into
+every worker's memory, so checking a token that is NOT revoked (the
+common case) needs no Redis round trip.
+
+Storage:
+- auth:revoked (Redis sorted set): jti -> token expiry (Unix timestamp);
+  entries past their expiry are trimmed on every revoke
+- in-process dict: jti -> expiry, per worker
+
+Propagation:
+- revoke() adds to Redis, publishes the jti on auth:revoked and updates
+  the local set immediately
+- other workers add it when the pub/sub message arrives
+- the local set is reloaded from Redis every token_blacklist_resync_interval
+  seconds and after every pub/sub (re)subscribe, which covers messages lost
+  while disconnected
+
+Until the first load succeeded, checks that miss the local set go to Redis
+(the local set is not known to be complete yet).
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict
+
+from app.db.redis import redis_client, pubsub_listener
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class TokenBlacklist:
+    """Revoked token IDs, mirrored in process memory"""
+
+    KEY = "auth:revoked"
+    CHANNEL = "auth:revoked"
+
+    # jti -> token expiry (Unix timestamp)
+    _revoked: Dict[str, float] = {}
+    _loaded = False  # True once a full load succeeded
+    _checked_at = 0.0  # time.monotonic() of the last load attempt (0 = reload now)
+    _lock = asyncio.Lock()
+
+    @staticmethod
+    async def revoke(jti: str, expires_at: float) -> None:
+        """
+        Revoke a token ID until the token expires
+
+        Args:
+            jti: Token ID (jti claim)
+            expires_at: Token expiry (exp claim, Unix timestamp)
+        """
+        TokenBlacklist._revoked[jti] = expires_at
+
+        if not redis_client.redis:
+            return
+        try:
+            pipe = redis_client.redis.pipeline(transaction=False)
+            pipe.zadd(TokenBlacklist.KEY, {jti: expires_at})
+            pipe.zremrangebyscore(TokenBlacklist.KEY, "-inf", time.time())
+            pipe.publish(TokenBlacklist.CHANNEL, f"{jti}:{expires_at}")
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to revoke token {jti}: {str(e)}")
+
+    @staticmethod
+    async def is_revoked(jti: str) -> bool:
+        """
+        Check whether a token ID has been revoked
+
+        Args:
+            jti: Token ID (jti claim)
+
+        Returns:
+            True if revoked
+        """
+        if time.monotonic() - TokenBlacklist._checked_at >= settings.token_blacklist_resync_interval:
+            await TokenBlacklist.resync()
+
+        if jti in TokenBlacklist._revoked:
+            return True
+
+        if not TokenBlacklist._loaded and redis_client.redis:
+            # Local set incomplete (never loaded): ask Redis directly
+            try:
+                return await redis_client.redis.zscore(TokenBlacklist.KEY, jti) is not None
+            except Exception as e:
+                logger.error(f"Token blacklist lookup failed: {str(e)}")
+        return False
+
+    @staticmethod
+    async def resync() -> None:
+        """Reload the local set from Redis (unexpired entries only)"""
+        async with TokenBlacklist._lock:
+            now = time.monotonic()
+            if now - TokenBlacklist._checked_at < settings.token_blacklist_resync_interval:
+                return
+            if not redis_client.redis:
+                return
+            # Also throttles retries while Redis is unreachable
+            TokenBlacklist._checked_at = now
+            try:
+                entries = await redis_client.redis.zrangebyscore(
+                    TokenBlacklist.KEY, time.time(), "+inf", withscores=True
+                )
+            except Exception as e:
+                logger.error(f"Token blacklist resync failed: {str(e)}")
+                return
+
+            # Merge instead of replace: a revocation received over pub/sub while
+            # the load was in flight must not be lost. Expired entries are dropped.
+            current = time.time()
+            revoked = {
+                jti: expires_at for jti, expires_at in TokenBlacklist._revoked.items()
+                if expires_at > current
+            }
+            revoked.update(entries)
+            TokenBlacklist._revoked = revoked
+            TokenBlacklist._loaded = True
+
+    @staticmethod
+    async def _on_revoked(message: str) -> None:
+        """Pub/sub handler: add a token revoked by another worker"""
+        jti, _, expires_at = message.rpartition(":")
+        TokenBlacklist._revoked[jti] = float(expires_at)
+
+    @staticmethod
+    async def _on_resync() -> None:
+        """Messages may have been missed while disconnected: reload on next check"""
+        TokenBlacklist._checked_at = 0.0
+
+
+pubsub_listener.register(
+    TokenBlacklist.CHANNEL,
+    TokenBlacklist._on_revoked,
+    on_resync=TokenBlacklist._on_resync
+)
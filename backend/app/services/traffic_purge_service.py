@@ -0,0 +1,202 @@
+"""
+Traffic Log Purge Service
+
+This module removes expired rows from the user_traffic_log table without
+holding long table locks.
+
+Strategy:
+1. (Optional) Drop whole daily RANGE partitions on log_time that are entirely
+   older than the retention threshold - an O(1) metadata operation.
+2. Delete the remaining expired rows in primary-key-bounded chunks
+   (id > last_id ... LIMIT chunk_size), committing and sleeping between
+   chunks so replicas can keep up.
+
+Progress is checkpointed in Redis after every chunk, so an interrupted run
+resumes from the last processed id with the same threshold.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.redis import redis_client
+from app.models.traffic_log import TrafficLog
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class TrafficLogPurger:
+    """
+    Chunked purge engine for user_traffic_log
+
+    Usage:
+        purger = TrafficLogPurger(db)
+        stats = await purger.purge(before=int(time.time()) - 3 * 86400)
+    """
+
+    CHECKPOINT_KEY = "db_clean:traffic_log:checkpoint"
+    CHECKPOINT_TTL = 7 * 86400  # Keep an interrupted run resumable for a week
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        chunk_size: Optional[int] = None,
+        sleep_seconds: Optional[float] = None,
+        max_chunks: Optional[int] = None
+    ):
+        self.db = db
+        self.table = TrafficLog.__tablename__
+        self.chunk_size = chunk_size or settings.traffic_log_purge_chunk_size
+        self.sleep_seconds = (
+            settings.traffic_log_purge_sleep if sleep_seconds is None else sleep_seconds
+        )
+        self.max_chunks = max_chunks
+
+    async def purge(self, before: int, max_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Purge traffic logs with log_time < before
+
+        Args:
+            before: Unix timestamp threshold
+            max_id: Never delete rows above this id (e.g. the traffic rollup watermark)
+
+        Returns:
+            Progress statistics (partitions dropped, rows deleted, chunks, last id)
+        """
+        stats = {
+            "before": before,
+            "partitions_dropped": 0,
+            "rows_deleted": 0,
+            "chunks": 0,
+            "last_id": 0,
+            "resumed": False,
+            "completed": False,
+        }
+
+        # Resume an interrupted run with its original threshold
+        checkpoint = await redis_client.json_get(self.CHECKPOINT_KEY)
+        if checkpoint:
+            before = int(checkpoint.get("before", before))
+            stats["before"] = before
+            stats["last_id"] = int(checkpoint.get("last_id", 0))
+            stats["rows_deleted"] = int(checkpoint.get("rows_deleted", 0))
+            stats["resumed"] = True
+            logger.info(
+                f"Resuming traffic log purge from id {stats['last_id']} "
+                f"(before={before}, deleted so far={stats['rows_deleted']})"
+            )
+
+        if settings.traffic_log_partitioned and not stats["resumed"]:
+            stats["partitions_dropped"] = await self.drop_expired_partitions(before)
+
+        started = time.monotonic()
+
+        while self.max_chunks is None or stats["chunks"] < self.max_chunks:
+            # Bound the next chunk by primary key
+            bounds = await self.db.execute(
+                text(
+                    f"SELECT MAX(id) AS upper_id, MIN(log_time) AS oldest "
+                    f"FROM (SELECT id, log_time FROM {self.table} "
+                    f"WHERE id > :last_id ORDER BY id LIMIT :chunk) AS c"
+                ),
+                {"last_id": stats["last_id"], "chunk": self.chunk_size}
+            )
+            upper_id, oldest = bounds.one()
+
+            # No rows left, or reached the region newer than the threshold
+            if upper_id is None or oldest >= before:
+                stats["completed"] = True
+                break
+
+            if max_id is not None and upper_id > max_id:
+                if stats["last_id"] >= max_id:
+                    stats["completed"] = True
+                    break
+                upper_id = max_id
+
+            result = await self.db.execute(
+                text(
+                    f"DELETE FROM {self.table} "
+                    f"WHERE id > :last_id AND id <= :upper_id AND log_time < :before"
+                ),
+                {"last_id": stats["last_id"], "upper_id": upper_id, "before": before}
+            )
+            await self.db.commit()
+
+            stats["chunks"] += 1
+            stats["rows_deleted"] += result.rowcount
+            stats["last_id"] = int(upper_id)
+
+            await redis_client.json_set(
+                self.CHECKPOINT_KEY,
+                {
+                    "before": before,
+                    "last_id": stats["last_id"],
+                    "rows_deleted": stats["rows_deleted"],
+                },
+                ex=self.CHECKPOINT_TTL
+            )
+
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"  Purge chunk {stats['chunks']}: deleted {result.rowcount} rows "
+                f"(total {stats['rows_deleted']}, last id {stats['last_id']}, "
+                f"{stats['rows_deleted'] / elapsed if elapsed > 0 else 0:.0f} rows/s)"
+            )
+
+            # Give replicas time to apply the chunk
+            if self.sleep_seconds > 0:
+                await asyncio.sleep(self.sleep_seconds)
+
+        if stats["completed"]:
+            await redis_client.delete(self.CHECKPOINT_KEY)
+
+        return stats
+
+    async def drop_expired_partitions(self, before: int) -> int:
+        """
+        Drop RANGE partitions on log_time that only hold rows older than `before`
+
+        Expects the table to be partitioned like:
+            PARTITION BY RANGE (log_time) (
+                PARTITION p20250101 VALUES LESS THAN (1735747200), ...
+            )
+
+        Args:
+            before: Unix timestamp threshold
+
+        Returns:
+            Number of partitions dropped
+        """
+        result = await self.db.execute(
+            text(
+                "SELECT PARTITION_NAME, PARTITION_DESCRIPTION "
+                "FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+                "AND PARTITION_NAME IS NOT NULL "
+                "ORDER BY PARTITION_ORDINAL_POSITION"
+            ),
+            {"table": self.table}
+        )
+
+        expired = []
+        for name, description in result.all():
+            # Upper bound is exclusive; MAXVALUE partitions are never dropped
+            if description and description.isdigit() and int(description) <= before:
+                expired.append(name)
+
+        if not expired:
+            return 0
+
+        await self.db.execute(
+            text(f"ALTER TABLE {self.table} DROP PARTITION {', '.join(expired)}")
+        )
+        await self.db.commit()
+
+        logger.info(f"Dropped {len(expired)} expired traffic log partitions: {', '.join(expired)}")
+        return len(expired)
@@ -0,0 +1,344 @@
+"""
+Traffic Rollup Service
+
+This module folds raw user_traffic_log rows into hourly and daily summary
+tables keyed by (user_id, node_id, bucket).
+
+The rollup is watermark-driven: each run aggregates only log rows with
+id > watermark, in id-bounded batches, using
+INSERT ... SELECT ... GROUP BY ... ON DUPLICATE KEY UPDATE.
+The watermark advances in the same transaction as the rollup rows,
+so a batch is never counted twice.
+
+History queries read from the rollup tables and cost O(buckets)
+instead of O(raw log rows).
+"""
+
+import time
+import logging
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from typing import Dict, Any, List, Optional
+from sqlalchemy import select, update, func, and_, delete, case, literal
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.traffic_log import TrafficLog
+from app.models.traffic_rollup import UserTrafficHourly, UserTrafficDaily, TrafficRollupWatermark
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Scheduler timezone, used to align daily buckets to local midnight
+TZ = ZoneInfo(settings.scheduler_timezone)
+
+
+def utc_offset(timestamp: int) -> int:
+    """Return the scheduler timezone's UTC offset (seconds) at timestamp"""
+    return int(datetime.fromtimestamp(timestamp, TZ).utcoffset().total_seconds())
+
+
+def hour_bucket(timestamp: int) -> int:
+    """Return the start of the hour containing timestamp"""
+    return timestamp - timestamp % 3600
+
+
+def day_bucket(timestamp: int) -> int:
+    """Return the start of the local day containing timestamp (DST-aware)"""
+    local = datetime.fromtimestamp(timestamp, TZ)
+    return int(local.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+
+
+def day_bucket_expr(column, start: int, end: int):
+    """
+    Build a SQL expression computing day_bucket(column) for start <= column <= end
+
+    Days with a fixed 86400s length share one arithmetic branch per UTC
+    offset; DST transition days (23h/25h) map to their literal midnight.
+    Without transitions in the range this is a single arithmetic expression.
+
+    Args:
+        column: Timestamp column
+        start: Smallest timestamp the expression must handle
+        end: Largest timestamp the expression must handle
+    """
+    # (upper bound exclusive, expression) per run of days
+    segments = []
+    midnight = day_bucket(start)
+    while midnight <= end:
+        # Local days are 23-25h long, so +25h always lands in the next day
+        next_midnight = day_bucket(midnight + 90000)
+        if next_midnight - midnight == 86400:
+            offset = utc_offset(midnight)
+            expr = ("offset", offset)
+        else:
+            expr = ("midnight", midnight)
+
+        if segments and segments[-1][1] == expr and expr[0] == "offset":
+            segments[-1] = (next_midnight, expr)
+        else:
+            segments.append((next_midnight, expr))
+        midnight = next_midnight
+
+    def to_sql(expr):
+        kind, value = expr
+        if kind == "offset":
+            return column - (column + value) % 86400
+        return literal(value)
+
+    if len(segments) == 1:
+        return to_sql(segments[0][1])
+    return case(
+        *[(column < upper, to_sql(expr)) for upper, expr in segments[:-1]],
+        else_=to_sql(segments[-1][1]),
+    )
+
+
+class TrafficRollupService:
+    """Service for building and querying traffic rollups"""
+
+    WATERMARK_NAME = "user_traffic_log"
+
+    @staticmethod
+    async def get_watermark(db: AsyncSession, for_update: bool = False) -> int:
+        """
+        Get the last traffic log id folded into the rollups
+
+        Args:
+            db: Database session
+            for_update: Lock the watermark row (serializes concurrent rollups)
+
+        Returns:
+            Last processed log id (0 if the rollup never ran)
+        """
+        if for_update:
+            # Make sure the row exists so there is something to lock
+            await db.execute(
+                insert(TrafficRollupWatermark)
+                .prefix_with("IGNORE")
+                .values(name=TrafficRollupService.WATERMARK_NAME, last_log_id=0, updated_at=0)
+            )
+
+        query = select(TrafficRollupWatermark.last_log_id).where(
+            TrafficRollupWatermark.name == TrafficRollupService.WATERMARK_NAME
+        )
+        if for_update:
+            query = query.with_for_update()
+
+        result = await db.execute(query)
+        return result.scalar_one_or_none() or 0
+
+    @staticmethod
+    def _rollup_statement(model, bucket_expr, lower_id: int, upper_id: int):
+        """
+        Build INSERT ... SELECT ... ON DUPLICATE KEY UPDATE for one rollup table
+
+        Args:
+            model: Rollup model (UserTrafficHourly or UserTrafficDaily)
+            bucket_expr: SQL expression computing the bucket from log_time
+            lower_id: Exclusive lower log id bound
+            upper_id: Inclusive upper log id bound
+        """
+        bucket = bucket_expr.label("bucket")
+        source = (
+            select(
+                TrafficLog.user_id,
+                TrafficLog.node_id,
+                bucket,
+                func.sum(TrafficLog.u),
+                func.sum(TrafficLog.d),
+                func.sum(func.floor((TrafficLog.u + TrafficLog.d) * TrafficLog.rate)),
+            )
+            .where(and_(TrafficLog.id > lower_id, TrafficLog.id <= upper_id))
+            .group_by(TrafficLog.user_id, TrafficLog.node_id, bucket)
+        )
+
+        stmt = insert(model).from_select(
+            ["user_id", "node_id", "bucket", "u", "d", "charged"],
+            source
+        )
+        return stmt.on_duplicate_key_update(
+            u=model.u + stmt.inserted.u,
+            d=model.d + stmt.inserted.d,
+            charged=model.charged + stmt.inserted.charged,
+        )
+
+    @staticmethod
+    async def run(
+        db: AsyncSession,
+        batch_size: Optional[int] = None,
+        max_batches: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Fold new traffic log rows into the hourly and daily rollups
+
+        Args:
+            db: Database session
+            batch_size: Log rows per batch (default from settings)
+            max_batches: Optional cap on batches for this run
+
+        Returns:
+            Statistics (batches, start/end watermark)
+        """
+        batch_size = batch_size or settings.traffic_rollup_batch_size
+        stats = {"batches": 0, "start_id": None, "last_id": None}
+
+        while max_batches is None or stats["batches"] < max_batches:
+            last_id = await TrafficRollupService.get_watermark(db, for_update=True)
+            if stats["start_id"] is None:
+                stats["start_id"] = last_id
+            stats["last_id"] = last_id
+
+            # Bound the batch by primary key
+            window = (
+                select(TrafficLog.id)
+                .where(TrafficLog.id > last_id)
+                .order_by(TrafficLog.id)
+                .limit(batch_size)
+                .subquery()
+            )
+            result = await db.execute(select(func.max(window.c.id)))
+            upper_id = result.scalar()
+
+            if upper_id is None:
+                await db.commit()  # Release the watermark lock
+                break
+
+            # Day buckets depend on the UTC offset, which can change inside the batch
+            result = await db.execute(
+                select(func.min(TrafficLog.log_time), func.max(TrafficLog.log_time))
+                .where(and_(TrafficLog.id > last_id, TrafficLog.id <= upper_id))
+            )
+            min_time, max_time = result.one()
+
+            hourly = TrafficLog.log_time - TrafficLog.log_time % 3600
+            daily = day_bucket_expr(TrafficLog.log_time, min_time, max_time)
+
+            await db.execute(
+                TrafficRollupService._rollup_statement(UserTrafficHourly, hourly, last_id, upper_id)
+            )
+            await db.execute(
+                TrafficRollupService._rollup_statement(UserTrafficDaily, daily, last_id, upper_id)
+            )
+            await db.execute(
+                update(TrafficRollupWatermark)
+                .where(TrafficRollupWatermark.name == TrafficRollupService.WATERMARK_NAME)
+                .values(last_log_id=upper_id, updated_at=int(time.time()))
+            )
+
+            # Rollup rows and watermark commit together
+            await db.commit()
+
+            stats["batches"] += 1
+            stats["last_id"] = upper_id
+
+        return stats
+
+    @staticmethod
+    async def prune_hourly(db: AsyncSession, before: int) -> int:
+        """
+        Delete hourly rollup rows older than before
+
+        Args:
+            db: Database session
+            before: Unix timestamp threshold
+
+        Returns:
+            Number of rows deleted
+        """
+        result = await db.execute(
+            delete(UserTrafficHourly).where(UserTrafficHourly.bucket < before)
+        )
+        await db.commit()
+        return result.rowcount
+
+    @staticmethod
+    async def get_user_history(
+        db: AsyncSession,
+        user_id: int,
+        granularity: str = "daily",
+        since: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a user's traffic history summed across nodes
+
+        Args:
+            db: Database session
+            user_id: User ID
+            granularity: "hourly" or "daily"
+            since: Unix timestamp lower bound (inclusive)
+
+        Returns:
+            List of {bucket, u, d, charged} ordered by bucket
+        """
+        model = UserTrafficHourly if granularity == "hourly" else UserTrafficDaily
+
+        query = (
+            select(
+                model.bucket,
+                func.sum(model.u).label("u"),
+                func.sum(model.d).label("d"),
+                func.sum(model.charged).label("charged"),
+            )
+            .where(model.user_id == user_id)
+            .group_by(model.bucket)
+            .order_by(model.bucket)
+        )
+        if since is not None:
+            query = query.where(model.bucket >= since)
+
+        result = await db.execute(query)
+        return [
+            {"bucket": row.bucket, "u": int(row.u), "d": int(row.d), "charged": int(row.charged)}
+            for row in result.all()
+        ]
+
+    @staticmethod
+    async def get_node_history(
+        db: AsyncSession,
+        granularity: str = "daily",
+        since: Optional[int] = None,
+        node_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get per-node traffic history summed across users
+
+        Args:
+            db: Database session
+            granularity: "hourly" or "daily"
+            since: Unix timestamp lower bound (inclusive)
+            node_id: Optional node filter
+
+        Returns:
+            List of {node_id, bucket, u, d, charged} ordered by node and bucket
+        """
+        model = UserTrafficHourly if granularity == "hourly" else UserTrafficDaily
+
+        query = (
+            select(
+                model.node_id,
+                model.bucket,
+                func.sum(model.u).label("u"),
+                func.sum(model.d).label("d"),
+                func.sum(model.charged).label("charged"),
+            )
+            .group_by(model.node_id, model.bucket)
+            .order_by(model.node_id, model.bucket)
+        )
+        if since is not None:
+            query = query.where(model.bucket >= since)
+        if node_id is not None:
+            query = query.where(model.node_id == node_id)
+
+        result = await db.execute(query)
+        return [
+            {
+                "node_id": row.node_id,
+                "bucket": row.bucket,
+                "u": int(row.u),
+                "d": int(row.d),
+                "charged": int(row.charged),
+            }
+            for row in result.all()
+        ]
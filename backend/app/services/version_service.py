@@ -0,0 +1,170 @@
+"""
+Version Service
+
+This module keeps content versions in Redis so caches can be validated
+with a single MGET instead of re-reading the database.
+
+Versions:
+- ver:user:{id}  bumped when a user's subscription-relevant fields change
+                 (passwd, port, method, uuid, class, group, enable, expire_in);
+                 also validates the cached UserPrincipal (see PrincipalService)
+- ver:users      bumped by set-based sweeps that change many users at once
+                 without tracking their ids
+- ver:users:list bumped by ANY change to user rows served to nodes, including
+                 traffic counters (bump_user / bump_all_users imply it)
+- ver:nodes      bumped when the visible node set changes
+- ver:nodes:status  bumped when a node's heartbeat state flips (online/offline);
+                 does not affect subscription bodies
+
+A version is an opaque token (nanosecond timestamp in hex), never a counter,
+so a version key lost to eviction or a Redis restart can never be mistaken
+for an older value. Every reader seeds a missing key with a fresh token
+(SET NX, see seed_missing()) instead of substituting a constant, so no
+version string derived from these keys can repeat.
+
+Bumps are best effort and must happen AFTER the database commit: a cache
+filled between bump and commit would otherwise store old rows under the new
+version.
+"""
+
+import time
+import logging
+from typing import List, Tuple, Optional, Sequence
+
+from app.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class VersionService:
+    """Content version tokens for cache validation"""
+
+    USER_KEY = "ver:user:{}"
+    USERS_KEY = "ver:users"
+    USER_LIST_KEY = "ver:users:list"
+    NODES_KEY = "ver:nodes"
+    NODES_STATUS_KEY = "ver:nodes:status"
+
+    @staticmethod
+    def _new_version() -> str:
+        """Generate a new unique version token"""
+        return f"{time.time_ns():x}"
+
+    @staticmethod
+    async def bump_user(*user_ids: int) -> None:
+        """
+        Bump the versions of one or more users
+
+        Args:
+            user_ids: User IDs whose cached content is now stale
+        """
+        if not user_ids:
+            return
+        version = VersionService._new_version()
+        mapping = {VersionService.USER_KEY.format(uid): version for uid in user_ids}
+        mapping[VersionService.USER_LIST_KEY] = version
+        try:
+            await redis_client.mset(mapping)
+        except Exception as e:
+            logger.error(f"Failed to bump user versions {list(user_ids)[:10]}: {str(e)}")
+
+    @staticmethod
+    async def bump_all_users() -> None:
+        """Bump the global user epoch (invalidates every per-user cache)"""
+        version = VersionService._new_version()
+        try:
+            await redis_client.mset({
+                VersionService.USERS_KEY: version,
+                VersionService.USER_LIST_KEY: version,
+            })
+        except Exception as e:
+            logger.error(f"Failed to bump global user version: {str(e)}")
+
+    @staticmethod
+    async def bump_user_list() -> None:
+        """Bump the node user-list version (e.g. after traffic counters changed)"""
+        try:
+            await redis_client.set(VersionService.USER_LIST_KEY, VersionService._new_version())
+        except Exception as e:
+            logger.error(f"Failed to bump user list version: {str(e)}")
+
+    @staticmethod
+    async def bump_nodes() -> None:
+        """Bump the node-set version"""
+        try:
+            await redis_client.set(VersionService.NODES_KEY, VersionService._new_version())
+        except Exception as e:
+            logger.error(f"Failed to bump node version: {str(e)}")
+
+    @staticmethod
+    async def bump_node_status() -> None:
+        """Bump the node heartbeat-state version"""
+        try:
+            await redis_client.set(VersionService.NODES_STATUS_KEY, VersionService._new_version())
+        except Exception as e:
+            logger.error(f"Failed to bump node status version: {str(e)}")
+
+    @staticmethod
+    async def seed_missing(keys: Sequence[str], values: List[Optional[str]]) -> List[str]:
+        """
+        Replace missing version values with freshly seeded tokens
+
+        A missing key is initialised with a fresh token (SET NX), so a key
+        lost after a Redis restart never repeats a token a client or cache
+        may hold. Concurrent seeders agree on the winner's token.
+
+        Args:
+            keys: Version keys
+            values: Values read for keys (None for missing), updated in place
+
+        Returns:
+            values, without None entries
+        """
+        for index, value in enumerate(values):
+            if value is None:
+                version = VersionService._new_version()
+                if await redis_client.set(keys[index], version, nx=True):
+                    values[index] = version
+                else:
+                    values[index] = await redis_client.get(keys[index]) or version
+        return values
+
+    @staticmethod
+    async def get_user_versions(user_id: int) -> Tuple[str, str, str]:
+        """
+        Get (user, global users, nodes) versions in one round trip
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Tuple of version tokens (missing keys are seeded)
+        """
+        keys = (
+            VersionService.USER_KEY.format(user_id),
+            VersionService.USERS_KEY,
+            VersionService.NODES_KEY,
+        )
+        values = await redis_client.mget(*keys)
+        return tuple(await VersionService.seed_missing(keys, list(values)))
+
+    @staticmethod
+    async def get_versions(*keys: str) -> Optional[Tuple[str, ...]]:
+        """
+        Get version tokens for ETags, seeding missing keys
+
+        Args:
+            keys: Version keys
+
+        Returns:
+            Tuple of version tokens, or None if Redis is unavailable
+            (callers must then skip conditional GET)
+        """
+        if not redis_client.redis:
+            return None
+        try:
+            values = await redis_client.mget(*keys)
+            return tuple(await VersionService.seed_missing(keys, list(values)))
+        except Exception as e:
+            logger.error(f"Failed to read versions {keys}: {str(e)}")
+            return None
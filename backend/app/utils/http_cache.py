@@ -0,0 +1,129 @@
+"""
+HTTP Cache Utility Functions
+
+This module contains helpers for conditional GET (ETag / If-None-Match)
+and Cache-Control headers.
+
+ETags are built from content versions (see VersionService) instead of
+hashing the response body, so an unchanged resource can be answered with
+304 Not Modified before anything is queried or rendered.
+"""
+
+from typing import Optional, Dict, Sequence
+from fastapi.responses import Response
+
+# Nodes poll constantly and must see changes immediately: always revalidate
+NODE_CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong ETag from version parts
+
+    Args:
+        parts: Values identifying the exact content version
+
+    Returns:
+        Quoted ETag string, e.g. "12-auto-18c2f..."
+    """
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag
+
+    Handles lists ("a", "b"), the "*" wildcard and weak validators (W/"a"),
+    which If-None-Match compares weakly per RFC 9110.
+
+    Args:
+        if_none_match: Raw If-None-Match header value
+        etag: Current ETag
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def subscription_cache_control(update_hours: int) -> str:
+    """
+    Cache-Control for subscription responses
+
+    Subscriptions embed credentials, so they are private to the client.
+
+    Args:
+        update_hours: Subscription update interval (settings.sub_update_time)
+    """
+    return f"private, max-age={max(update_hours, 0) * 3600}"
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Sequence[str]) -> str:
+    """
+    Pick a content coding from an Accept-Encoding header
+
+    Args:
+        accept_encoding: Raw Accept-Encoding header value
+        available: Supported codings in order of preference (e.g. ["br", "gzip"])
+
+    Returns:
+        The accepted coding with the highest q-value (ties go to the earlier
+        entry in available), or "identity"
+    """
+    if not accept_encoding:
+        return "identity"
+
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if coding:
+            weights[coding] = weight
+
+    best, best_weight = "identity", 0.0
+    for coding in available:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def cache_headers(etag: str, cache_control: str) -> Dict[str, str]:
+    """Build ETag and Cache-Control response headers"""
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, cache_control: str, vary: Optional[str] = None) -> Response:
+    """
+    Build an empty 304 Not Modified response
+
+    Args:
+        etag: Current ETag
+        cache_control: Cache-Control value
+        vary: Vary value of the matching 200 response (must be repeated on 304)
+
+    Returns:
+        Response with status 304 and no body
+    """
+    headers = cache_headers(etag, cache_control)
+    if vary:
+        headers["Vary"] = vary
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,16 @@
+"""
+Benchmarks
+
+Reproducible performance harnesses. Install the stand-in dependencies
+(aiosqlite, fakeredis, httpx, PyYAML, pyinstrument) with the bench extra:
+
+    uv sync --extra bench        # or: pip install -e ".[bench]"
+
+Then run from the backend directory, e.g.:
+
+    python -m benchmarks.bench_tasks --users 10000
+    python -m benchmarks.bench_links --nodes 200 --users 10000
+    python -m benchmarks.bench_subscription --e2e-requests 500
+    python -m benchmarks.bench_jwt --tokens 1000
+    python -m benchmarks.explain_queries --users 5000
+"""
@@ -0,0 +1,120 @@
+"""
+JWT Verification Microbenchmark
+
+Issues a set of access tokens shaped like the ones AuthService.login
+creates and measures, for every available JWT backend (python-jose, and
+PyJWT if installed):
+
+- encode: tokens signed per second
+- decode: full verifications per second (signature, JSON, exp)
+- cached: decode_access_token() with the verified-token LRU warm, i.e.
+  the path taken by every request after a token's first use
+
+Each backend must accept the other's tokens; the check result is reported
+as "interoperable". No database or Redis is needed.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_jwt                      # 1000 tokens x 20 rounds
+    python -m benchmarks.bench_jwt --tokens 5000 --rounds 5
+"""
+
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+
+from app.core import security
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def make_claims(count: int) -> List[Dict[str, Any]]:
+    """Claims like AuthService.login issues (sub, email, is_admin, jti, exp)"""
+    expire = datetime.utcnow() + timedelta(minutes=settings.jwt_access_token_expire_minutes)
+    return [
+        {
+            "sub": str(index),
+            "email": f"user{index}@example.com",
+            "is_admin": 0,
+            "jti": f"bench{index:011d}",
+            "exp": expire,
+        }
+        for index in range(1, count + 1)
+    ]
+
+
+def timed(func, items: List[Any], rounds: int) -> Dict[str, Any]:
+    """Call func on every item `rounds` times and report the best round"""
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {
+        "operations": len(items),
+        "seconds": round(best, 4),
+        "per_second": int(len(items) / best) if best else 0,
+    }
+
+
+def bench_backend(backend: security.JWTBackend, claims: List[Dict[str, Any]], rounds: int) -> Dict[str, Any]:
+    """Encode and uncached decode throughput of one backend"""
+    key, algorithm = settings.jwt_secret_key, settings.jwt_algorithm
+    tokens = [backend.encode(claim, key, algorithm=algorithm) for claim in claims]
+
+    return {
+        "encode": timed(lambda claim: backend.encode(claim, key, algorithm=algorithm), claims, rounds),
+        "decode": timed(lambda token: backend.decode(token, key, algorithms=[algorithm]), tokens, rounds),
+    }
+
+
+def check_interop(claims: List[Dict[str, Any]]) -> bool:
+    """Every backend decodes every other backend's tokens to the same payload"""
+    key, algorithm = settings.jwt_secret_key, settings.jwt_algorithm
+    payloads = []
+    for producer in security.JWT_BACKENDS.values():
+        token = producer.encode(claims[0], key, algorithm=algorithm)
+        for consumer in security.JWT_BACKENDS.values():
+            payloads.append(consumer.decode(token, key, algorithms=[algorithm]))
+    return all(payload == payloads[0] for payload in payloads)
+
+
+def bench_cached(claims: List[Dict[str, Any]], rounds: int) -> Dict[str, Any]:
+    """decode_access_token() with every token already in the LRU"""
+    security.token_cache.size = max(security.token_cache.size, len(claims))
+    tokens = [security.create_access_token(claim) for claim in claims]
+    for token in tokens:
+        if security.decode_access_token(token) is None:
+            raise SystemExit("cached: freshly issued token failed to verify")
+
+    result = timed(security.decode_access_token, tokens, rounds)
+    result["backend"] = security.token_cache.stats()["backend"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JWT verification")
+    parser.add_argument("--tokens", type=int, default=1000, help="Number of distinct tokens")
+    parser.add_argument("--rounds", type=int, default=20, help="Timed rounds (best is reported)")
+    args = parser.parse_args()
+
+    claims = make_claims(args.tokens)
+    report: Dict[str, Any] = {"tokens": args.tokens, "algorithm": settings.jwt_algorithm}
+
+    for name, backend in security.JWT_BACKENDS.items():
+        report[name] = bench_backend(backend, claims, args.rounds)
+
+    report["interoperable"] = check_interop(claims)
+    report["cached"] = bench_cached(claims, args.rounds)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
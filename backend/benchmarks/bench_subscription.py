@@ -0,0 +1,288 @@
+"""
+Subscription Generation Benchmark
+
+Measures the subscription render hot path for every subtype (ss, ssr,
+vmess, trojan, auto, clash, singbox) on synthetic nodes and users, without
+a database or Redis:
+
+- render: SubscriptionService.generate_* per user, reporting subscriptions
+  and links per second
+- alloc: tracemalloc peak bytes per subscription (transient allocations
+  of one render, averaged over a sample of users)
+- e2e (optional): GET /app/api/v0/link/{token} through FastAPI's TestClient
+  with a stubbed database session, so routing, dependency injection and
+  response building are included (the subscription cache is bypassed
+  because there is no Redis)
+
+The node index is pinned to a snapshot built from the synthetic nodes.
+Results are printed as JSON; --profile writes a cProfile (.prof) or
+pyinstrument (.html) dump of the render phase.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_subscription                    # 200 nodes x 2000 users
+    python -m benchmarks.bench_subscription --e2e-requests 500
+    python -m benchmarks.bench_subscription --subtypes ss,clash --profile cprofile --profile-out sub.prof
+
+The e2e phase (httpx) and --profile pyinstrument need the bench extra
+(uv sync --extra bench).
+"""
+
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from app.models.node import Node
+from app.models.user import User
+from app.services.node_index import node_index, NodeIndexSnapshot
+from app.services.subscribe_service import SubscriptionService
+from app.services.client_config import CLIENT_FORMATS
+from benchmarks.bench_links import make_nodes, make_users
+
+SUBTYPES = ["ss", "ssr", "vmess", "trojan", "auto", "clash", "singbox"]
+
+
+def build_dataset(rng: random.Random, node_count: int, user_count: int):
+    """Synthetic nodes and users with class/group visibility filled in"""
+    nodes = make_nodes(rng, node_count)
+    for node in nodes:
+        node.type = 1
+        node.node_sort = node.id
+        node.node_class = rng.choice([0, 0, 1, 2])
+        node.node_group = rng.choice([0, 1, 2])
+
+    users = make_users(rng, user_count)
+    expire_in = datetime.now() + timedelta(days=365)
+    for user in users:
+        user.enable = 1
+        user.class_level = rng.choice([0, 1, 2, 3])
+        user.node_group = rng.choice([0, 0, 1, 2])
+        user.expire_in = expire_in
+        user.u, user.d, user.transfer_enable = 0, 0, 100 * 1024 ** 3
+
+    return nodes, users
+
+
+def pin_node_index(nodes: List[Node]) -> NodeIndexSnapshot:
+    """Serve a fixed snapshot from the global node index (no DB, no Redis)"""
+    snapshot = NodeIndexSnapshot(nodes, ("0", "0"))
+
+    async def pinned(db):
+        return snapshot
+
+    node_index.get = pinned
+    return snapshot
+
+
+async def render(user: User, subtype: str) -> str:
+    """Render one subscription exactly like the /link endpoint does"""
+    if subtype in CLIENT_FORMATS:
+        return await SubscriptionService.generate_client_config(None, user, subtype)
+    if subtype == "auto":
+        return await SubscriptionService.generate_auto_subscription(None, user)
+    return await SubscriptionService.generate_subscription(None, user, subtype)
+
+
+def count_links(subtype: str, content: str) -> Optional[int]:
+    """Links in a base64 link list (None for structured client configs)"""
+    if subtype in CLIENT_FORMATS:
+        return None
+    decoded = base64.b64decode(content).decode()
+    return len(decoded.split("\n")) if decoded else 0
+
+
+async def bench_render(users: List[User], subtype: str) -> Dict[str, Any]:
+    """Render every user's subscription once and time it"""
+    started = time.perf_counter()
+    outputs = [await render(user, subtype) for user in users]
+    elapsed = time.perf_counter() - started
+
+    links = [count_links(subtype, content) for content in outputs]
+    result = {
+        "subscriptions": len(outputs),
+        "seconds": round(elapsed, 3),
+        "subscriptions_per_second": int(len(outputs) / elapsed) if elapsed else 0,
+        "avg_bytes": sum(len(content) for content in outputs) // max(len(outputs), 1),
+    }
+    if subtype not in CLIENT_FORMATS:
+        total = sum(links)
+        result["links"] = total
+        result["links_per_second"] = int(total / elapsed) if elapsed else 0
+    return result
+
+
+async def bench_alloc(users: List[User], subtype: str, sample: int) -> Dict[str, Any]:
+    """Peak traced bytes of single renders (tracemalloc, first `sample` users)"""
+    # Warm-up render so lazily compiled templates are not attributed to a user
+    await render(users[0], subtype)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for user in users[:sample]:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            await render(user, subtype)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - base)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "sample": len(peaks),
+        "avg_peak_bytes": sum(peaks) // max(len(peaks), 1),
+        "max_peak_bytes": max(peaks, default=0),
+    }
+
+
+class _StubResult:
+    """Result of a stubbed query: always the current user"""
+
+    def __init__(self, user: User):
+        self._user = user
+
+    def scalar_one_or_none(self) -> User:
+        return self._user
+
+
+class _StubSession:
+    """Stands in for AsyncSession; the endpoint only loads the token's user"""
+
+    def __init__(self):
+        self.user: Optional[User] = None
+
+    async def execute(self, statement):
+        return _StubResult(self.user)
+
+
+def bench_e2e(users: List[User], subtypes: List[str], requests: int) -> Dict[str, Any]:
+    """Time GET /link/{token} through the full FastAPI stack"""
+    from fastapi.testclient import TestClient
+    from app.db.replica import get_read_db
+    from app.services.sub_token_service import SubTokenService
+    import main
+
+    session = _StubSession()
+
+    async def stub_db():
+        yield session
+
+    main.app.dependency_overrides[get_read_db] = stub_db
+    # Pre-resolve tokens in the local LRU (no Redis, no link table)
+    tokens = {}
+    for user in users:
+        tokens[user.id] = f"bench{user.id:027d}"
+        SubTokenService._remember(tokens[user.id], user.id)
+
+    results = {}
+    # No context manager: the lifespan (DB, Redis, scheduler) is not started
+    client = TestClient(main.app)
+    try:
+        for subtype in subtypes:
+            started = time.perf_counter()
+            for index in range(requests):
+                user = users[index % len(users)]
+                session.user = user
+                response = client.get(f"/app/api/v0/link/{tokens[user.id]}", params={"subtype": subtype})
+                if response.status_code != 200:
+                    raise SystemExit(f"e2e {subtype}: HTTP {response.status_code} {response.text[:200]}")
+            elapsed = time.perf_counter() - started
+            results[subtype] = {
+                "requests": requests,
+                "seconds": round(elapsed, 3),
+                "requests_per_second": int(requests / elapsed) if elapsed else 0,
+            }
+    finally:
+        main.app.dependency_overrides.pop(get_read_db, None)
+
+    return results
+
+
+def start_profiler(kind: Optional[str]):
+    """Start cProfile or pyinstrument (returns None if profiling is off)"""
+    if kind == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if kind == "pyinstrument":
+        from pyinstrument import Profiler
+        profiler = Profiler(async_mode="disabled")
+        profiler.start()
+        return profiler
+    return None
+
+
+def stop_profiler(kind: Optional[str], profiler, path: str) -> None:
+    """Stop the profiler and write its dump to path"""
+    if profiler is None:
+        return
+    if kind == "cprofile":
+        profiler.disable()
+        profiler.dump_stats(path)
+    else:
+        profiler.stop()
+        with open(path, "w") as f:
+            f.write(profiler.output_html())
+
+
+async def run(args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    nodes, users = build_dataset(rng, args.nodes, args.users)
+    snapshot = pin_node_index(nodes)
+    subtypes = [subtype for subtype in args.subtypes.split(",") if subtype]
+
+    report: Dict[str, Any] = {"nodes": args.nodes, "users": args.users, "render": {}, "alloc": {}}
+
+    # Compile the lazily built client documents before timing
+    for subtype in subtypes:
+        if subtype in CLIENT_FORMATS:
+            for user in users:
+                snapshot.client_config(subtype, user.class_level, user.node_group)
+
+    profiler = start_profiler(args.profile)
+    try:
+        for subtype in subtypes:
+            report["render"][subtype] = await bench_render(users, subtype)
+    finally:
+        stop_profiler(args.profile, profiler, args.profile_out)
+    if profiler is not None:
+        report["profile"] = args.profile_out
+
+    for subtype in subtypes:
+        report["alloc"][subtype] = await bench_alloc(users, subtype, args.alloc_sample)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark subscription generation")
+    parser.add_argument("--nodes", type=int, default=200, help="Number of nodes")
+    parser.add_argument("--users", type=int, default=2000, help="Number of users")
+    parser.add_argument("--subtypes", default=",".join(SUBTYPES), help="Comma-separated subtypes")
+    parser.add_argument("--alloc-sample", type=int, default=200, help="Users traced for allocations")
+    parser.add_argument("--e2e-requests", type=int, default=0, help="TestClient requests per subtype (0 = skip)")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], help="Profile the render phase")
+    parser.add_argument("--profile-out", default="bench_subscription.prof", help="Profile dump path")
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.e2e_requests:
+        rng = random.Random(args.seed)
+        _, users = build_dataset(rng, args.nodes, args.users)
+        subtypes = [subtype for subtype in args.subtypes.split(",") if subtype]
+        report["e2e"] = bench_e2e(users, subtypes, args.e2e_requests)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Scheduled Task Benchmark Harness
+
+Generates a synthetic dataset, runs each scheduled task against it and
+reports wall time, peak RSS, SQL statement count and Redis round trips
+as JSON, so regressions show up as numbers.
+
+Usage (from the backend directory):
+
+    # SQLite + fakeredis stand-in (no services needed)
+    python -m benchmarks.bench_tasks --users 10000
+
+    # Local MySQL/MariaDB + Redis (use a throwaway database!)
+    python -m benchmarks.bench_tasks --users 100000 \\
+        --db-url mysql+aiomysql://root:pw@127.0.0.1/spanel_bench \\
+        --redis-url redis://127.0.0.1:6379/15
+
+Requires aiosqlite and fakeredis for the stand-in mode (uv sync --extra bench).
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from typing import Dict, Any
+
+import redis.asyncio as aioredis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import session as db_session
+from app.db.redis import redis_client
+from app.services import tasks
+from benchmarks.datagen import generate_dataset
+
+# Importing the models registers every table on Base.metadata
+from app.models import user, node, paylist, traffic_log, traffic_rollup, shop, link, ticket  # noqa: F401
+
+TASKS = {
+    "daily": tasks.daily_job,
+    "hourly": tasks.hourly_job,
+    "check": tasks.check_job,
+    "db_clean": tasks.db_clean_job,
+}
+
+
+class Counters:
+    """SQL statement and Redis round-trip counters"""
+
+    def __init__(self):
+        self.statements = 0
+        self.redis_calls = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"statements": self.statements, "redis_calls": self.redis_calls}
+
+
+def _peak_rss_kb() -> int:
+    """Process peak resident set size in KB (high-water mark)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _instrument_redis(client: aioredis.Redis, counters: Counters) -> None:
+    """Count every command sent to Redis (a pipeline counts as one round trip)"""
+    execute_command = client.execute_command
+
+    async def counted(*args, **kwargs):
+        counters.redis_calls += 1
+        return await execute_command(*args, **kwargs)
+
+    client.execute_command = counted
+
+    pipeline = client.pipeline
+
+    def counted_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def counted_execute(*a, **kw):
+            counters.redis_calls += 1
+            return await execute(*a, **kw)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    client.pipeline = counted_pipeline
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    """Generate data, run the selected tasks and collect metrics"""
+    counters = Counters()
+
+    # Database: rebind the session factory used by the scheduled tasks
+    db_url = args.db_url
+    tmp_path = None
+    if db_url is None:
+        fd, tmp_path = tempfile.mkstemp(suffix=".sqlite3", prefix="spanel-bench-")
+        os.close(fd)
+        db_url = f"sqlite+aiosqlite:///{tmp_path}"
+
+    engine = create_async_engine(db_url)
+    db_session.AsyncSessionLocal.configure(bind=engine)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        counters.statements += 1
+
+    async with engine.begin() as conn:
+        await conn.run_sync(db_session.Base.metadata.drop_all)
+        await conn.run_sync(db_session.Base.metadata.create_all)
+
+    # Redis: real server or fakeredis stand-in
+    if args.redis_url:
+        client = aioredis.from_url(args.redis_url, decode_responses=True)
+        await client.flushdb()
+    else:
+        import fakeredis
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    redis_client.redis = client
+    _instrument_redis(client, counters)
+
+    nodes = args.nodes or max(20, args.users // 1000)
+    started = time.perf_counter()
+    rows = await generate_dataset(
+        engine,
+        users=args.users,
+        nodes=nodes,
+        logs_per_user=args.logs_per_user,
+        seed=args.seed,
+    )
+    report = {
+        "db": engine.dialect.name,
+        "redis": "redis" if args.redis_url else "fakeredis",
+        "seed": args.seed,
+        "dataset": rows,
+        "dataset_seconds": round(time.perf_counter() - started, 3),
+        "tasks": {},
+    }
+
+    for name in args.tasks:
+        before = counters.snapshot()
+        rss_before = _peak_rss_kb()
+        if args.tracemalloc:
+            tracemalloc.start()
+
+        started = time.perf_counter()
+        await TASKS[name]()
+        wall = time.perf_counter() - started
+
+        result = {
+            "wall_seconds": round(wall, 4),
+            "statements": counters.statements - before["statements"],
+            "redis_round_trips": counters.redis_calls - before["redis_calls"],
+            "peak_rss_kb": _peak_rss_kb(),
+            "peak_rss_growth_kb": _peak_rss_kb() - rss_before,
+        }
+        if args.tracemalloc:
+            result["python_heap_peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+
+        report["tasks"][name] = result
+
+    await client.aclose()
+    await engine.dispose()
+    if tmp_path:
+        os.unlink(tmp_path)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scheduled tasks on synthetic data")
+    parser.add_argument("--users", type=int, default=10000, help="Number of users (10k-1M)")
+    parser.add_argument("--nodes", type=int, default=None, help="Number of nodes (default users/1000, min 20)")
+    parser.add_argument("--logs-per-user", type=float, default=2.0, help="Traffic log rows per user")
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed")
+    parser.add_argument("--db-url", default=None, help="Async SQLAlchemy URL (default: temporary SQLite)")
+    parser.add_argument("--redis-url", default=None, help="Redis URL (default: fakeredis)")
+    parser.add_argument(
+        "--tasks",
+        default=",".join(TASKS),
+        type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+        help=f"Comma-separated tasks to run ({', '.join(TASKS)})"
+    )
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report Python heap peak (slower)")
+    parser.add_argument("--output", default=None, help="Write JSON report to this file")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.tasks if name not in TASKS]
+    if unknown:
+        parser.error(f"Unknown tasks: {', '.join(unknown)}")
+
+    report = asyncio.run(run_benchmark(args))
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Synthetic Dataset Generator
+
+Fills user, ss_node, paylist and user_traffic_log (optionally bought and
+payback) with realistic, deterministic data (seeded RNG) at a
+configurable scale.
+
+The distributions roughly follow production:
+- ~90% enabled users, ~70% active in the last day
+- ~1% negative balance, ~5% never used, class 0-3, node_group 1-5
+- a share of users with expired class / renew_time, so every
+  scheduled task has work to do
+"""
+
+import time
+import random
+import string
+from decimal import Decimal
+from datetime import datetime, timedelta
+from typing import Dict, Any
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models.user import User
+from app.models.node import Node
+from app.models.paylist import Paylist, Payback
+from app.models.shop import Bought
+from app.models.traffic_log import TrafficLog
+
+GB = 1024 ** 3
+
+
+def _user_row(rng: random.Random, user_id: int, now: int) -> Dict[str, Any]:
+    """Build one synthetic user row"""
+    never_used = rng.random() < 0.05
+    active = not never_used and rng.random() < 0.7
+    class_level = rng.choice([0, 0, 1, 1, 2, 3])
+
+    reg_date = datetime.now() - timedelta(days=rng.randint(1, 720))
+    if class_level and rng.random() < 0.1:
+        class_expire = datetime.now() - timedelta(hours=rng.randint(1, 48))
+    else:
+        class_expire = datetime.now() + timedelta(days=rng.randint(1, 365))
+
+    if never_used:
+        t, u, d = 0, 0, 0
+    else:
+        t = now - (rng.randint(0, 3600) if active else rng.randint(86400, 90 * 86400))
+        u = rng.randint(0, 20 * GB)
+        d = rng.randint(0, 80 * GB)
+
+    money = Decimal(rng.randint(-500, 0) if rng.random() < 0.01 else rng.randint(0, 10000)) / 100
+
+    return {
+        "id": user_id,
+        "user_name": f"user{user_id}",
+        "email": f"user{user_id}@bench.local",
+        "pass": "$2b$12$" + "x" * 53,
+        "passwd": "".join(rng.choices(string.ascii_letters + string.digits, k=16)),
+        "v2ray_uuid": f"{user_id:08x}-0000-4000-8000-{rng.getrandbits(48):012x}",
+        "t": t,
+        "u": u,
+        "d": d,
+        "transfer_enable": 100 * GB,
+        "port": 10000 + user_id % 55000,
+        "method": "aes-256-gcm",
+        "enable": 0 if rng.random() < 0.1 else 1,
+        "money": money,
+        "class": class_level,
+        "class_expire": class_expire,
+        "expire_in": datetime.now() + timedelta(days=rng.randint(-30, 365)),
+        "node_group": rng.randint(1, 5),
+        "rss_count": rng.randint(0, 500),
+        "rss_ips_count": rng.randint(0, 10),
+        "renew_time": now + rng.randint(-86400, 30 * 86400),
+        "reg_date": reg_date,
+        "invite_num": 0,
+    }
+
+
+def _node_row(rng: random.Random, node_id: int, now: int) -> Dict[str, Any]:
+    """Build one synthetic node row"""
+    sort = rng.choice([0, 1, 11, 11, 14])
+    return {
+        "id": node_id,
+        "name": f"Node {node_id}",
+        "type": 1 if rng.random() < 0.95 else 0,
+        "server": f"node{node_id}.bench.local",
+        "method": "aes-256-gcm",
+        "info": "",
+        "status": "ok",
+        "sort": sort,
+        "node_class": rng.randint(0, 3),
+        "node_group": rng.randint(0, 5),
+        "node_heartbeat": now - (rng.randint(0, 120) if rng.random() < 0.9 else 3 * 3600),
+        "node_ip": f"10.0.{node_id // 256}.{node_id % 256}",
+        "node_sort": node_id,
+    }
+
+
+async def _bulk_insert(engine: AsyncEngine, model, rows, chunk_size: int = 5000):
+    """Insert rows with executemany in fixed-size chunks"""
+    for start in range(0, len(rows), chunk_size):
+        async with engine.begin() as conn:
+            await conn.execute(insert(model), rows[start:start + chunk_size])
+
+
+async def generate_dataset(
+    engine: AsyncEngine,
+    users: int,
+    nodes: int,
+    logs_per_user: float = 2.0,
+    orders_per_user: float = 0.5,
+    purchases_per_user: float = 0.0,
+    seed: int = 42
+) -> Dict[str, int]:
+    """
+    Generate a synthetic dataset
+
+    Args:
+        engine: Async engine bound to an empty schema
+        users: Number of users
+        nodes: Number of nodes
+        logs_per_user: Average traffic log rows per user
+        orders_per_user: Average paylist rows per user
+        purchases_per_user: Average bought rows per user (each with a
+            referral payback row)
+        seed: RNG seed (same seed, same data)
+
+    Returns:
+        Row counts per table
+    """
+    rng = random.Random(seed)
+    now = int(time.time())
+
+    node_rows = [_node_row(rng, node_id, now) for node_id in range(1, nodes + 1)]
+    await _bulk_insert(engine, Node, node_rows)
+
+    # Generate users in slices to keep memory flat at 1M scale
+    user_slice = 50000
+    for start in range(1, users + 1, user_slice):
+        end = min(start + user_slice, users + 1)
+        await _bulk_insert(engine, User, [_user_row(rng, uid, now) for uid in range(start, end)])
+
+    # Explicit ids: BIGINT primary keys do not autoincrement on SQLite
+    order_count = int(users * orders_per_user)
+    order_rows = [
+        {
+            "id": i + 1,
+            "userid": rng.randint(1, users),
+            "total": Decimal(rng.randint(100, 10000)) / 100,
+            "status": 0 if rng.random() < 0.2 else 1,
+            "tradeno": f"BENCH-{i}",
+            "datetime": now - rng.randint(0, 7 * 86400),
+        }
+        for i in range(order_count)
+    ]
+    await _bulk_insert(engine, Paylist, order_rows)
+    del order_rows
+
+    # Traffic logs in id order with increasing log_time, like real ingestion
+    log_count = int(users * logs_per_user)
+    log_slice = 50000
+    span = 7 * 86400
+    for start in range(0, log_count, log_slice):
+        end = min(start + log_slice, log_count)
+        rows = []
+        for i in range(start, end):
+            u = rng.randint(0, 50 * 1024 ** 2)
+            d = rng.randint(0, 200 * 1024 ** 2)
+            rows.append({
+                "id": i + 1,
+                "user_id": rng.randint(1, users),
+                "u": u,
+                "d": d,
+                "node_id": rng.randint(1, nodes),
+                "rate": 1.0,
+                "traffic": f"{(u + d) / 1024 ** 2:.2f}MB",
+                "log_time": now - span + int(span * i / max(log_count, 1)),
+            })
+        await _bulk_insert(engine, TrafficLog, rows)
+
+    counts = {
+        "user": users,
+        "ss_node": nodes,
+        "paylist": order_count,
+        "user_traffic_log": log_count,
+    }
+
+    purchase_count = int(users * purchases_per_user)
+    if purchase_count:
+        bought_rows, payback_rows = [], []
+        for i in range(purchase_count):
+            userid = rng.randint(1, users)
+            price = Decimal(rng.randint(100, 10000)) / 100
+            bought_at = now - rng.randint(0, 90 * 86400)
+            bought_rows.append({
+                "id": i + 1,
+                "userid": userid,
+                "shopid": rng.randint(1, 10),
+                "datetime": bought_at,
+                "renew": 0,
+                "coupon": "",
+                "price": price,
+            })
+            payback_rows.append({
+                "id": i + 1,
+                "total": price,
+                "userid": userid,
+                "ref_by": rng.randint(1, users),
+                "ref_get": price / 10,
+                "datetime": bought_at,
+                "callback": 0,
+            })
+        await _bulk_insert(engine, Bought, bought_rows)
+        await _bulk_insert(engine, Payback, payback_rows)
+        counts["bought"] = counts["payback"] = purchase_count
+
+    return counts
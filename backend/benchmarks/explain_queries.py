@@ -0,0 +1,429 @@
+"""
+Query Plan Check
+
+Runs the application's database workload on a synthetic dataset, records
+every statement it issues and EXPLAINs each distinct one (grouped by
+normalized SQL) with the parameters it actually ran with. Statements whose
+plan reads a whole table are flagged:
+
+- MySQL / MariaDB: access type ALL (table scan) or index (full index scan)
+- SQLite: SCAN <table> (with or without USING INDEX)
+
+Workload: the scheduled tasks, payment commission processing and the
+read endpoints (node, user, payment, admin and subscription) called
+through the ASGI app, so the statements are exactly what the code sends.
+
+The indexes of migrations/002_hot_path_indexes.sql and
+003_subscription_tokens.sql are created on the throwaway schema unless --without-indexes is given, so both plans can be
+compared. Table statistics are refreshed (ANALYZE) before the workload
+runs. Scans that are fine are listed as expected instead of flagged:
+statements without a WHERE clause (paginated admin lists), small tables
+(nodes, shop items) and jobs that read every row by design (bitmap and
+queue rebuilds). The exit status is 1 if any statement was flagged.
+
+MySQL prefers table scans on small tables whatever the indexes; use a
+realistic --users when checking against MySQL. On SQLite some writes fail
+(BIGINT keys do not autoincrement, MySQL-only upserts); they are listed
+under errors, the statements issued before them are still checked.
+
+Usage (from the backend directory):
+
+    # SQLite + fakeredis stand-in (no services needed)
+    python -m benchmarks.explain_queries
+    python -m benchmarks.explain_queries --without-indexes
+
+    # Local MySQL/MariaDB + Redis (use a throwaway database!)
+    python -m benchmarks.explain_queries --users 100000 \\
+        --db-url mysql+aiomysql://root:pw@127.0.0.1/spanel_bench \\
+        --redis-url redis://127.0.0.1:6379/15
+
+Requires aiosqlite, fakeredis and httpx for the stand-in mode (uv sync --extra bench).
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+import redis.asyncio as aioredis
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.db import session as db_session
+from app.db.redis import redis_client
+from app.core.config import get_settings
+from app.core.security import create_access_token
+from app.core.sql_trace import normalize_sql
+from app.models.user import User
+from app.models.link import Link
+from app.models.paylist import Paylist
+from app.services import tasks
+from app.services.payment_service import PaymentService
+from app.services.sub_token_service import SubTokenService
+from benchmarks.datagen import generate_dataset
+
+# Importing the models registers every table on Base.metadata
+from app.models import user, node, paylist, traffic_log, traffic_rollup, shop, link, ticket  # noqa: F401
+
+settings = get_settings()
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+MIGRATIONS = (
+    MIGRATIONS_DIR / "002_hot_path_indexes.sql",
+    MIGRATIONS_DIR / "003_subscription_tokens.sql",
+)
+
+TASKS = {
+    "daily": tasks.daily_job,
+    "hourly": tasks.hourly_job,
+    "check": tasks.check_job,
+    "db_clean": tasks.db_clean_job,
+    "traffic_rollup": tasks.traffic_rollup_job,
+    "expiry_rebuild": tasks.expiry_rebuild_job,
+    "port_rebuild": tasks.port_rebuild_job,
+}
+
+# Endpoints called with the user's access token
+USER_ENDPOINTS = [
+    "/app/api/v0/user/info",
+    "/app/api/v0/user/nodes",
+    "/app/api/v0/user/shop",
+    "/app/api/v0/user/bought",
+    "/app/api/v0/user/traffic",
+    "/app/api/v0/user/checkin/status",
+    "/app/api/v0/payment/orders",
+    "/app/api/v0/payment/orders?status=0",
+    "/app/api/v0/admin/users",
+    "/app/api/v0/admin/nodes",
+    "/app/api/v0/admin/traffic/nodes",
+]
+
+# Tables small enough that scanning them is cheaper than an index lookup
+SMALL_TABLES = {"ss_node", "shop"}
+
+# Jobs that read every row by design
+FULL_READ_JOBS = {"expiry_rebuild", "port_rebuild"}
+
+# Statement kinds that are EXPLAINed (inserts never scan)
+EXPLAINED = ("SELECT", "UPDATE", "DELETE")
+
+_SQLITE_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\S+)")
+_PREFIX_LENGTH = re.compile(r"(`\w+`)\(\d+\)")
+
+
+class Recorder:
+    """Distinct statements issued while recording, with their first parameters"""
+
+    def __init__(self):
+        self.source: Optional[str] = None  # None = not recording
+        self.statements = 0
+        self.queries: Dict[str, Dict[str, Any]] = {}
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.source is None or not statement.lstrip().upper().startswith(EXPLAINED):
+            return
+        self.statements += 1
+        key = normalize_sql(statement)
+        query = self.queries.get(key)
+        if query is None:
+            self.queries[key] = query = {
+                "sql": key,
+                "sources": [],
+                "calls": 0,
+                "statement": statement,
+                "parameters": parameters[0] if executemany else parameters,
+            }
+        query["calls"] += 1
+        if self.source not in query["sources"]:
+            query["sources"].append(self.source)
+
+
+recorder = Recorder()
+
+
+def migration_statements(dialect: str, path: Path) -> List[str]:
+    """CREATE INDEX statements of the migration file (comments and data changes dropped)"""
+    lines = [line for line in path.read_text().splitlines() if not line.lstrip().startswith("--")]
+    statements = [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+    statements = [statement for statement in statements if statement.upper().startswith("CREATE INDEX")]
+    if dialect == "sqlite":
+        # SQLite has no prefix indexes: index the whole column
+        statements = [_PREFIX_LENGTH.sub(r"\1", statement) for statement in statements]
+    return statements
+
+
+async def analyze(engine: AsyncEngine) -> None:
+    """Refresh table statistics so plans match a populated database"""
+    async with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            await conn.exec_driver_sql("ANALYZE")
+        else:
+            for table in db_session.Base.metadata.tables:
+                await conn.exec_driver_sql(f"ANALYZE TABLE `{table}`")
+
+
+async def explain(engine: AsyncEngine, statement: str, parameters) -> List[Dict[str, Any]]:
+    """Plan rows of one statement (dialect specific columns)"""
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql(prefix + statement, parameters or None)
+        rows = [dict(row) for row in result.mappings().all()]
+        await conn.rollback()
+    return rows
+
+
+def full_scans(dialect: str, plan: List[Dict[str, Any]]) -> List[str]:
+    """
+    Whole-table reads in a plan, as "<table>: <access>" strings
+
+    Only application tables count: derived tables and subquery results are
+    bounded by the statement itself.
+    """
+    tables = db_session.Base.metadata.tables
+    scans = []
+    for row in plan:
+        if dialect == "sqlite":
+            match = _SQLITE_SCAN.match(row.get("detail", ""))
+            if match and match.group(1) in tables:
+                access = "index scan" if "USING" in row["detail"] else "table scan"
+                scans.append(f"{match.group(1)}: {access}")
+        elif row.get("type") in ("ALL", "index") and row.get("table") in tables:
+            access = "table scan" if row["type"] == "ALL" else "index scan"
+            scans.append(f"{row['table']}: {access}")
+    return scans
+
+
+def expected_reason(query: Dict[str, Any], scans: List[str]) -> Optional[str]:
+    """Why a statement's full scan is acceptable (None: it is not)"""
+    if " WHERE " not in query["sql"].upper():
+        return "no WHERE clause"
+    if all(scan.split(":")[0] in SMALL_TABLES for scan in scans):
+        return "small table"
+    if all(source in FULL_READ_JOBS for source in query["sources"]):
+        return "full read by design"
+    return None
+
+
+async def prepare_user(engine: AsyncEngine, users: int) -> Tuple[int, int]:
+    """
+    Give every user a subscription token and make the first user an
+    enabled admin with a referrer and an unpaid order
+
+    Rows get explicit ids: BIGINT primary keys do not autoincrement on SQLite.
+
+    Args:
+        engine: Engine bound to the generated dataset
+        users: Number of users in the dataset
+
+    Returns:
+        (user ID, order ID)
+    """
+    links = [
+        {
+            "id": user_id, "type": SubTokenService.LINK_TYPE, "address": "", "port": 0,
+            "token": SubTokenService.generate_token(), "ios": 0, "userid": user_id,
+        }
+        for user_id in range(1, users + 1)
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(insert(Link), links)
+        await conn.execute(
+            update(User).where(User.id == 1).values(
+                is_admin=1, enable=1, switch=1, class_level=3, ref_by=2,
+                expire_in=datetime.now() + timedelta(days=365),
+            )
+        )
+        order_id = ((await conn.execute(select(func.max(Paylist.id)))).scalar() or 0) + 1
+        await conn.execute(insert(Paylist).values(
+            id=order_id, userid=1, total=10, status=0, tradeno="EXPLAIN", datetime=int(time.time())
+        ))
+    return 1, order_id
+
+
+async def run_endpoints(app, user_id: int, node_ids: List[int], errors: List[str]) -> None:
+    """Call the read endpoints, node API and subscription links through the ASGI app"""
+    token = create_access_token({"sub": str(user_id), "email": f"user{user_id}@bench.local", "is_admin": True})
+    user_headers = {"Authorization": f"Bearer {token}"}
+    node_headers = {"Key": settings.mu_key.split(",")[0]}
+
+    # (source, method, url, headers, JSON body)
+    calls = [(f"GET {url.split('?')[0]}", "GET", url, user_headers, None) for url in USER_ENDPOINTS]
+    calls.append(("GET /app/api/v0/user/subscribe", "GET", "/app/api/v0/user/subscribe", user_headers, None))
+    for node_id in node_ids:
+        calls += [
+            ("GET /app/api/v0/node/users", "GET", f"/app/api/v0/node/users?node_id={node_id}", node_headers, None),
+            ("GET /app/api/v0/node/info", "GET", f"/app/api/v0/node/info/{node_id}", node_headers, None),
+            ("POST /app/api/v0/node/traffic", "POST", "/app/api/v0/node/traffic", node_headers, {
+                "node_id": node_id, "data": [{"user_id": user_id, "u": 1024, "d": 4096}]
+            }),
+        ]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for source, method, url, headers, body in calls:
+            recorder.source = source
+            try:
+                response = await client.request(method, url, headers=headers, json=body)
+            except Exception as e:
+                errors.append(f"{method} {url}: {str(e)}")
+                continue
+            if response.status_code >= 400:
+                errors.append(f"{method} {url}: HTTP {response.status_code}")
+
+        # Subscription links of the prepared token (cache miss path)
+        async with db_session.AsyncSessionLocal() as db:
+            sub_token = await SubTokenService.get_or_create(db, user_id)
+        for source, url in (
+            ("GET /app/api/v0/link/{token}", f"/app/api/v0/link/{sub_token}?subtype=clash"),
+            ("GET /app/api/v0/link/info/{token}", f"/app/api/v0/link/info/{sub_token}"),
+        ):
+            recorder.source = source
+            try:
+                response = await client.get(url)
+            except Exception as e:
+                errors.append(f"GET {url}: {str(e)}")
+                continue
+            if response.status_code >= 400:
+                errors.append(f"GET {url}: HTTP {response.status_code}")
+
+
+async def run_payments(user_id: int, order_id: int, errors: List[str]) -> None:
+    """Pay the prepared order (referral commission), then recover the commission"""
+    async with db_session.AsyncSessionLocal() as db:
+        recorder.source = "payment_success"
+        success, message = await PaymentService.process_payment_success(order_id, "EXPLAIN", db=db)
+        if not success:
+            errors.append(f"payment_success: {message}")
+
+        recorder.source = "recover_commission"
+        await PaymentService.recover_referral_commission(user_id, db)
+
+
+async def run_check(args) -> Dict[str, Any]:
+    """Generate data, run the workload and EXPLAIN every distinct statement"""
+    db_url = args.db_url
+    tmp_path = None
+    if db_url is None:
+        fd, tmp_path = tempfile.mkstemp(suffix=".sqlite3", prefix="spanel-explain-")
+        os.close(fd)
+        db_url = f"sqlite+aiosqlite:///{tmp_path}"
+
+    engine = create_async_engine(db_url)
+    db_session.AsyncSessionLocal.configure(bind=engine)
+    event.listen(engine.sync_engine, "before_cursor_execute", recorder)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(db_session.Base.metadata.drop_all)
+        await conn.run_sync(db_session.Base.metadata.create_all)
+        if not args.without_indexes:
+            for path in MIGRATIONS:
+                for statement in migration_statements(engine.dialect.name, path):
+                    await conn.exec_driver_sql(statement)
+
+    if args.redis_url:
+        client = aioredis.from_url(args.redis_url, decode_responses=True)
+        binary = aioredis.from_url(args.redis_url, decode_responses=False)
+        await client.flushdb()
+    else:
+        import fakeredis
+        server = fakeredis.FakeServer()
+        client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        binary = fakeredis.FakeAsyncRedis(server=server, decode_responses=False)
+    redis_client.redis, redis_client.binary = client, binary
+
+    rows = await generate_dataset(
+        engine,
+        users=args.users,
+        nodes=args.nodes,
+        purchases_per_user=0.5,
+        seed=args.seed,
+    )
+    user_id, order_id = await prepare_user(engine, args.users)
+    await analyze(engine)
+    errors: List[str] = []
+
+    for name, job in TASKS.items():
+        recorder.source = name
+        try:
+            await job()
+        except Exception as e:
+            errors.append(f"{name}: {str(e)}")
+
+    # Imported here: the app wires every router and service on import
+    import main
+    await run_endpoints(main.app, user_id, list(range(1, min(args.nodes, 3) + 1)), errors)
+    await run_payments(user_id, order_id, errors)
+    recorder.source = None
+
+    report = {
+        "db": engine.dialect.name,
+        "indexes": not args.without_indexes,
+        "dataset": rows,
+        "statements": recorder.statements,
+        "distinct": len(recorder.queries),
+        "flagged": [],
+        "expected": [],
+        "errors": errors,
+    }
+    if args.all:
+        report["queries"] = []
+
+    for query in recorder.queries.values():
+        entry = {"sql": query["sql"], "sources": query["sources"], "calls": query["calls"]}
+        try:
+            plan = await explain(engine, query["statement"], query["parameters"])
+        except Exception as e:
+            errors.append(f"EXPLAIN failed for {query['sql'][:120]}: {str(e)}")
+            continue
+        entry["scans"] = full_scans(engine.dialect.name, plan)
+        if args.all:
+            report["queries"].append(dict(entry, plan=plan))
+        if not entry["scans"]:
+            continue
+        reason = expected_reason(query, entry["scans"])
+        if reason is None:
+            report["flagged"].append(entry)
+        else:
+            report["expected"].append(dict(entry, reason=reason))
+
+    await client.aclose()
+    await binary.aclose()
+    await engine.dispose()
+    if tmp_path:
+        os.unlink(tmp_path)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every statement of the app workload, flag full scans")
+    parser.add_argument("--users", type=int, default=5000, help="Number of users")
+    parser.add_argument("--nodes", type=int, default=20, help="Number of nodes")
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed")
+    parser.add_argument("--db-url", default=None, help="Async SQLAlchemy URL (default: temporary SQLite)")
+    parser.add_argument("--redis-url", default=None, help="Redis URL (default: fakeredis)")
+    parser.add_argument("--without-indexes", action="store_true", help="Do not create the migrations' indexes")
+    parser.add_argument("--all", action="store_true", help="Also report every statement with its plan")
+    parser.add_argument("--output", default=None, help="Write JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_check(args))
+    output = json.dumps(report, indent=2, default=str)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    sys.exit(1 if report["flagged"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ from app.core.config import get_settings
 from app.db.session import init_db, close_db
 from app.db.redis import init_redis, close_redis
 from app.core.scheduler import start_scheduler, stop_scheduler
+from app.core.sql_trace import SQLTraceMiddleware
 from app.api import api_router
 from app.schemas.response import error_response
 
@@ -102,6 +103,9 @@ app.add_middleware(
     allow_headers=settings.cors_allow_headers,
 )
 
+# Per-request SQL statistics (Server-Timing header, slow query log)
+app.add_middleware(SQLTraceMiddleware)
+
 
 # Validation error handler - returns detailed 422 errors
 @app.exception_handler(RequestValidationError)
@@ -0,0 +1,36 @@
+-- Traffic rollup tables (hourly / daily summaries of user_traffic_log)
+--
+-- Additive only: creates new tables, does not touch existing ones.
+-- Apply with:
+--   mysql -u root -p test-spanel-fastapi < migrations/001_traffic_rollup.sql
+
+CREATE TABLE IF NOT EXISTS `user_traffic_hourly` (
+  `user_id` int(11) NOT NULL COMMENT 'User ID',
+  `node_id` int(11) NOT NULL COMMENT 'Node ID',
+  `bucket` int(11) NOT NULL COMMENT 'Hour Start (timestamp)',
+  `u` bigint(20) NOT NULL DEFAULT '0' COMMENT 'Upload Traffic (bytes)',
+  `d` bigint(20) NOT NULL DEFAULT '0' COMMENT 'Download Traffic (bytes)',
+  `charged` bigint(20) NOT NULL DEFAULT '0' COMMENT 'Rate-adjusted Traffic (bytes)',
+  PRIMARY KEY (`user_id`, `node_id`, `bucket`),
+  KEY `idx_hourly_node_bucket` (`node_id`, `bucket`),
+  KEY `idx_hourly_bucket` (`bucket`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `user_traffic_daily` (
+  `user_id` int(11) NOT NULL COMMENT 'User ID',
+  `node_id` int(11) NOT NULL COMMENT 'Node ID',
+  `bucket` int(11) NOT NULL COMMENT 'Day Start (timestamp)',
+  `u` bigint(20) NOT NULL DEFAULT '0' COMMENT 'Upload Traffic (bytes)',
+  `d` bigint(20) NOT NULL DEFAULT '0' COMMENT 'Download Traffic (bytes)',
+  `charged` bigint(20) NOT NULL DEFAULT '0' COMMENT 'Rate-adjusted Traffic (bytes)',
+  PRIMARY KEY (`user_id`, `node_id`, `bucket`),
+  KEY `idx_daily_node_bucket` (`node_id`, `bucket`),
+  KEY `idx_daily_bucket` (`bucket`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `traffic_rollup_watermark` (
+  `name` varchar(64) NOT NULL COMMENT 'Rollup Name',
+  `last_log_id` bigint(20) NOT NULL DEFAULT '0' COMMENT 'Last Processed Log ID',
+  `updated_at` int(11) NOT NULL DEFAULT '0' COMMENT 'Last Update Time',
+  PRIMARY KEY (`name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
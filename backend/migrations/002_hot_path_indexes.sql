@@ -0,0 +1,43 @@
+-- Secondary indexes for hot query predicates (scheduled tasks, node user
+-- lists, order / purchase history, referral commission lookups)
+--
+-- Subscription token indexes are part of 003_subscription_tokens.sql.
+--
+-- Additive only: creates indexes, does not change any column. Optional;
+-- the application works without them, only slower on large tables.
+-- InnoDB builds secondary indexes online (the tables stay writable), but
+-- on a large user table expect it to take a while and extra disk space.
+-- Apply with:
+--   mysql -u root -p test-spanel-fastapi < migrations/002_hot_path_indexes.sql
+-- Re-running stops at the first index that already exists; add --force to
+-- skip those ("Duplicate key name") and create the rest.
+--
+-- Verify the plans with:
+--   python -m benchmarks.explain_queries --db-url mysql+aiomysql://...
+
+-- Node user lists: enable = 1 AND switch = 1 [AND node_group IN (0, ?)]
+CREATE INDEX `idx_user_enable_switch_group` ON `user` (`enable`, `switch`, `node_group`);
+-- Traffic checks and unused-user cleanup (last used time)
+CREATE INDEX `idx_user_t` ON `user` (`t`);
+-- Daily traffic reset: renew_time < now
+CREATE INDEX `idx_user_renew_time` ON `user` (`renew_time`);
+-- Expired class reset: class_expire < now
+CREATE INDEX `idx_user_class_expire` ON `user` (`class_expire`);
+-- Negative balance / empty account cleanup
+CREATE INDEX `idx_user_money` ON `user` (`money`);
+
+-- Unpaid order cleanup: status = 0 AND datetime < timeout
+CREATE INDEX `idx_paylist_status_datetime` ON `paylist` (`status`, `datetime`);
+-- Order history: userid = ? ORDER BY datetime DESC
+CREATE INDEX `idx_paylist_userid_datetime` ON `paylist` (`userid`, `datetime`);
+
+-- Purchase history: userid = ? ORDER BY datetime DESC
+CREATE INDEX `idx_bought_userid_datetime` ON `bought` (`userid`, `datetime`);
+
+-- Referral commission lookups: userid = ? AND ref_by = ?
+CREATE INDEX `idx_payback_userid_ref_by` ON `payback` (`userid`, `ref_by`);
+
+-- Node visibility: type = 1 AND node_class <= ? AND node_group IN (0, ?)
+-- (this application loads all visible nodes into its node index at once;
+-- the index serves the per-user filters of other clients of this schema)
+CREATE INDEX `idx_ss_node_type_class_group` ON `ss_node` (`type`, `node_class`, `node_group`);
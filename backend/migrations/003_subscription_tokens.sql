@@ -0,0 +1,27 @@
+-- Subscription tokens (link type = 11): lookup indexes and a token backfill
+--
+-- Required for random subscription tokens (SubTokenService). Additive only:
+-- creates indexes and inserts one token row per user that has none.
+-- Apply with:
+--   mysql -u root -p test-spanel-fastapi < migrations/003_subscription_tokens.sql
+--
+-- Cutover from the legacy /link/{user_id} URLs:
+--   1. Apply this migration (RANDOM_BYTES needs MySQL 5.6.17+ / MariaDB 10.10+)
+--   2. Restart the application: the startup warm-up loads every token into Redis
+--   3. Users copy their new URL from GET /user/subscribe; old numeric URLs
+--      keep working while SUB_ALLOW_LEGACY_ID_TOKEN=True
+--   4. After the migration window set SUB_ALLOW_LEGACY_ID_TOKEN=False
+
+-- Token issue / reset: userid = ? AND type = ?
+CREATE INDEX `idx_link_userid_type` ON `link` (`userid`, `type`);
+-- Token resolution: token = ? AND type = ?
+-- (token is TEXT: MySQL indexes a prefix, tokens are 32 characters)
+CREATE INDEX `idx_link_token` ON `link` (`token`(32));
+
+-- One random 128-bit token (32 lowercase hex characters) per user without one
+INSERT INTO `link` (`type`, `address`, `port`, `token`, `ios`, `userid`)
+SELECT 11, '', 0, LEFT(SHA2(CONCAT(HEX(RANDOM_BYTES(32)), `u`.`id`), 256), 32), 0, `u`.`id`
+FROM `user` `u`
+WHERE NOT EXISTS (
+  SELECT 1 FROM `link` `l` WHERE `l`.`userid` = `u`.`id` AND `l`.`type` = 11
+);